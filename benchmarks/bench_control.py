@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Denetim soketi üzerinden durum sorgusu ile CLI çağrısının gecikme karşılaştırması.
+
+Sahte CLI ortamında bir ControlServer başlatır; aynı sayıda 'status'
+isteğini soket üzerinden ve 'hotspotshield status' süreci başlatarak
+gönderir, gecikme dağılımlarını JSON olarak yazar.
+
+    python3 benchmarks/bench_control.py --count 200
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# run_benchmarks depo kökünü sys.path'e ekler
+from run_benchmarks import SCENARIOS, Harness
+
+from hotspot_shield_app import ControlClient, ControlServer
+
+
+def _distribution(samples):
+    """Saniye cinsinden örneklerden milisaniyelik özet üretir."""
+    ordered = sorted(samples)
+    return {
+        'mean_ms': round(statistics.mean(ordered) * 1000, 3),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def _timed(func, count):
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--cli', default='hotspotshield',
+                        help="CLI to spawn for the comparison (default: the fake CLI on PATH)")
+    args = parser.parse_args()
+
+    # CLI tarafında yapay gecikme yok: yalnızca süreç başlatma maliyeti ölçülür
+    scenario = {**SCENARIOS['default'], 'delays': {}}
+    with tempfile.TemporaryDirectory(prefix='hotspot-bench-') as workdir:
+        harness = Harness(scenario, workdir)
+        server = ControlServer(harness.controller, f"{workdir}/control.sock").start()
+        try:
+            client = ControlClient(server.path)
+            client.request('status')
+            socket_samples = _timed(lambda: client.request('status'), args.count)
+            cli_samples = _timed(
+                lambda: subprocess.run([args.cli, 'status'], capture_output=True, check=False),
+                args.count
+            )
+        finally:
+            server.close()
+            harness.close()
+
+    socket_stats = _distribution(socket_samples)
+    cli_stats = _distribution(cli_samples)
+    result = {
+        'count': args.count,
+        'socket_status': socket_stats,
+        'cli_status': cli_stats,
+        'speedup_p50': round(cli_stats['p50_ms'] / max(socket_stats['p50_ms'], 1e-6), 1),
+    }
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Olay yolunun durum değişikliği başına arayüz güncellemesi sayısı ve yayın maliyeti.
+
+Uygulamanın abonelerini (durum ekranı, tepsi, bildirim, hata) aynı
+pencerelerle sanal bir saate bağlar, kaydedilmiş geçiş dizilerini oynatır
+ve her abonenin kaç kez çağrıldığını sayar. Bir abone pencere başına
+birden fazla çağrılırsa, bağlan/konum değiştir gibi tek bir işlem birden
+fazla bildirim üretirse ya da beklenen bildirim (ör. kopup yeniden
+bağlanamayan tünel için "bağlantı kesildi") gösterilmezse çıkış kodu 1 olur.
+
+    python3 benchmarks/bench_event_bus.py
+"""
+import argparse
+import heapq
+import itertools
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from hotspot_shield_app import (  # noqa: E402
+    NOTIFY_DEBOUNCE,
+    ConnectionState as S,
+    ErrorRaised,
+    EventBus,
+    HotspotShieldApp,
+    Language,
+    StateChanged,
+)
+
+# (saniye, eski, yeni) geçiş dizileri
+SEQUENCES = {
+    'connect': [(0.0, S.DISCONNECTED, S.CONNECTING), (0.9, S.CONNECTING, S.CONNECTED)],
+    'switch': [(0.0, S.CONNECTED, S.SWITCHING), (1.0, S.SWITCHING, S.CONNECTED)],
+    'disconnect': [(0.0, S.CONNECTED, S.DISCONNECTING), (0.3, S.DISCONNECTING, S.DISCONNECTED)],
+    # Watchdog'un hızlı kopma / yeniden bağlanma döngüleri
+    'flapping': [step for cycle in range(5) for step in (
+        (cycle * 0.4, S.CONNECTED, S.DISCONNECTED),
+        (cycle * 0.4 + 0.1, S.DISCONNECTED, S.CONNECTING),
+        (cycle * 0.4 + 0.3, S.CONNECTING, S.CONNECTED),
+    )],
+    # Kopma ve başarısız yeniden bağlanma tek bildirim penceresinde
+    'drop_failed_reconnect': [(0.0, S.CONNECTED, S.DISCONNECTED),
+                              (0.2, S.DISCONNECTED, S.CONNECTING),
+                              (0.6, S.CONNECTING, S.ERROR)],
+    # 2 saniyede 100 geçiş
+    'burst': [(index * 0.02, S.CONNECTED if index % 2 else S.SWITCHING,
+               S.SWITCHING if index % 2 else S.CONNECTED) for index in range(100)],
+}
+# Tek bir işlem tek bir bildirim üretmeli
+SINGLE_ACTIONS = ('connect', 'switch', 'disconnect')
+# Dizi -> gösterilmesi gereken bildirimin çeviri anahtarı
+EXPECTED_NOTIFICATIONS = {'drop_failed_reconnect': 'connection_lost'}
+
+
+class NotificationSink:
+    """_notify_state'in gösterdiği bildirimleri toplar; masaüstüne bir şey göndermez."""
+
+    def __init__(self):
+        self.lang = Language()
+        self.shown = []
+
+    def show_notification(self, title, message):
+        self.shown.append(message)
+
+    def notify_state(self, event):
+        HotspotShieldApp._notify_state(self, event)
+
+
+class VirtualClock:
+    """EventBus için zamanlayıcı: işleri sanal saate göre sıralar."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+
+    def schedule(self, delay, func):
+        heapq.heappush(self._queue, (self.now + delay, next(self._seq), func))
+
+    def run_until(self, moment):
+        while self._queue and self._queue[0][0] <= moment:
+            self.now, _, func = heapq.heappop(self._queue)
+            func()
+        self.now = moment
+
+
+def replay(name, steps):
+    clock = VirtualClock()
+    bus = EventBus(schedule=clock.schedule)
+    windows = {'status': 0.0, 'tray': HotspotShieldApp.TRAY_DEBOUNCE,
+               'notification': NOTIFY_DEBOUNCE, 'error_dialog': HotspotShieldApp.ERROR_DEBOUNCE}
+    sink = NotificationSink()
+    for subscriber, window in windows.items():
+        if subscriber == 'error_dialog':
+            bus.subscribe(ErrorRaised, lambda event: None, window=window, name=subscriber)
+        elif subscriber == 'notification':
+            bus.subscribe(StateChanged, sink.notify_state, window=window,
+                          merge=StateChanged.merge, name=subscriber)
+        else:
+            bus.subscribe(StateChanged, lambda event: None, window=window, name=subscriber)
+    for moment, old, new in steps:
+        clock.run_until(moment)
+        bus.publish(StateChanged(old, new, 'DE', 'DE'))
+        # Her geçişte bir de hata: iletişim kutusu da birleştirilmeli
+        bus.publish(ErrorRaised('error', name))
+    clock.run_until(steps[-1][0] + 10)
+
+    duration = steps[-1][0] - steps[0][0]
+    stats = bus.stats()
+    violations = []
+    for subscriber, window in windows.items():
+        delivered = stats[subscriber]['delivered']
+        bound = len(steps) if not window else min(len(steps), math.floor(duration / window) + 1)
+        stats[subscriber]['bound'] = bound
+        if delivered > bound:
+            violations.append(f"{subscriber}: {delivered} deliveries > bound {bound}")
+    if name in SINGLE_ACTIONS and len(sink.shown) != 1:
+        violations.append(f"notification: {len(sink.shown)} notifications shown for one action")
+    expected = EXPECTED_NOTIFICATIONS.get(name)
+    if expected is not None and sink.lang.get_text(expected) not in sink.shown:
+        violations.append(f"notification: '{expected}' not shown")
+    return {'transitions': len(steps), 'duration_s': round(duration, 2), 'subscribers': stats,
+            'notifications_shown': sink.shown, 'violations': violations}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    report = {'sequences': {name: replay(name, steps) for name, steps in SEQUENCES.items()}}
+
+    # Yayın maliyeti: zamanlayıcı işi hemen bırakır, yalnızca kilit ve birleştirme ölçülür
+    bus = EventBus(schedule=lambda delay, func: None)
+    for name in ('status', 'tray', 'notification'):
+        bus.subscribe(StateChanged, lambda event: None, name=name)
+    event = StateChanged(S.CONNECTED, S.SWITCHING, 'DE')
+    started = time.perf_counter()
+    for _ in range(args.count):
+        bus.publish(event)
+    report['publish_us'] = round((time.perf_counter() - started) / args.count * 1e6, 3)
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 1 if any(result['violations'] for result in report['sequences'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Bağlantı geçmişi sorgularının 100 bin satırlık yapay geçmişte gecikmesi.
+
+Geçici bir SQLite dosyasına konumlar arasında dağılmış yapay denemeler
+yazar; ardından otomatik bağlantının ve başlangıç ekranının kullandığı
+sorguları tekrar tekrar çalıştırıp gecikme dağılımlarını JSON olarak yazar.
+
+    python3 benchmarks/bench_history.py --rows 100000
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from hotspot_shield_app import ConnectionHistory  # noqa: E402
+
+LOCATIONS = [f"L{index:02d}" for index in range(40)]
+
+
+def populate(history, rows, seed=1):
+    """Konum başına farklı hız ve hata oranlarıyla yapay denemeler yazar; en iyi konumu döndürür."""
+    rng = random.Random(seed)
+    profiles = {location: (rng.uniform(0.8, 6.0), rng.uniform(0.0, 0.4)) for location in LOCATIONS}
+    now = time.time()
+    for index in range(rows):
+        location = rng.choice(LOCATIONS)
+        mean, failure_rate = profiles[location]
+        outcome = 'failed' if rng.random() < failure_rate else 'connected'
+        total = max(0.1, rng.gauss(mean, mean / 5))
+        history.record_attempt('connect', location, outcome,
+                               {'teardown': 0.0, 'establish': total * 0.6, 'verify': total * 0.4},
+                               total, error=None if outcome == 'connected' else outcome,
+                               started_at=now - (rows - index) * 20)
+    # Pencere içindeki profil: beklenen süre = ortalama / başarı oranı
+    return min(profiles, key=lambda location: profiles[location][0] / (1 - profiles[location][1]))
+
+
+def timed(func, count):
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        'p50_ms': round(samples[len(samples) // 2] * 1000, 3),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--count', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='hotspot-bench-') as workdir:
+        history = ConnectionHistory(Path(workdir) / 'history.sqlite3', max_rows=args.rows,
+                                    window=args.rows * 20)
+        started = time.perf_counter()
+        expected = populate(history, args.rows)
+        populate_s = time.perf_counter() - started
+        history.save_state('connected', 'L01', '10.8.0.2')
+
+        best = history.best_location()
+        queries = {
+            'last_state': timed(history.last_state, args.count),
+            'last_good_location': timed(history.last_good_location, args.count),
+            'median_connect_time_location': timed(lambda: history.median_connect_time('L07'),
+                                                  args.count),
+            'median_connect_time_all': timed(history.median_connect_time, args.count),
+            'location_stats': timed(history.location_stats, args.count),
+            'best_location': timed(history.best_location, args.count),
+            'record_attempt': timed(lambda: history.record_attempt(
+                'connect', 'L03', 'connected', {'establish': 1.0, 'verify': 0.5}, 1.5), args.count),
+            'open_and_prune': timed(lambda: ConnectionHistory(
+                history.path, max_rows=args.rows).close(), max(1, args.count // 10)),
+        }
+        size = Path(history.path).stat().st_size
+        history.close()
+
+    json.dump({
+        'rows': args.rows,
+        'populate_s': round(populate_s, 2),
+        'db_bytes': size,
+        'best_location': best,
+        'expected_best_location': expected,
+        'queries': queries,
+    }, sys.stdout, indent=2)
+    print()
+    return 0 if best == expected else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Konum listesi için bellek ve filtreleme gecikmesi ölçümü.
+
+Sentetik bir konum kataloğu üzerinde LocationIndex kurulumunu, her tuş
+vuruşundaki filtre süresini ve satır başına belleği ölçer; sonucu JSON
+olarak yazar.
+
+    python3 benchmarks/bench_locations.py --count 5000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hotspot_shield_app import Gtk, LocationIndex, LocationRecord  # noqa: E402
+
+REGIONS = ['Europe', 'North America', 'South America', 'Asia', 'Africa', 'Oceania']
+QUERIES = ['u', 'un', 'uni', 'unit', 'united', 'united s', 'ger', 'germany', 'zz', 'asia']
+
+
+def synthetic_catalog(count, seed=1):
+    """Tekrarlanabilir sentetik konum kayıtları üretir."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        code = f"{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_uppercase)}{i}"
+        name = ' '.join(
+            ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))).title()
+            for _ in range(rng.randint(1, 3))
+        )
+        if i % 50 == 0:
+            name = f"United {name}"
+        records.append(LocationRecord(code, name, rng.choice(REGIONS)))
+    return records
+
+
+def rss_kib():
+    """Sürecin yerleşik bellek boyutunu KiB olarak döndürür."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def bench_index(records):
+    started = time.perf_counter()
+    index = LocationIndex(records)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    # Bellek ölçümü ayrı bir kurulumla yapılır; tracemalloc süreyi şişirir
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    LocationIndex(records)
+    index_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    latencies = {}
+    for query in QUERIES:
+        samples = []
+        for _ in range(20):
+            started = time.perf_counter()
+            matches = index.search(query)
+            samples.append((time.perf_counter() - started) * 1e6)
+        latencies[query] = {
+            'matches': len(matches),
+            'median_us': round(statistics.median(samples), 1),
+            'max_us': round(max(samples), 1),
+        }
+    return {
+        'build_ms': round(build_ms, 2),
+        'index_bytes_per_record': round(index_bytes / len(records), 1),
+        'filter_latency': latencies,
+    }
+
+
+def bench_store(records):
+    """ListStore satır başına bellek maliyetini ölçer (widget oluşturmaz)."""
+    before = rss_kib()
+    # Uygulamadaki sütunlar: kod, etiket, görünür, gecikme metni
+    store = Gtk.ListStore(str, str, bool, str)
+    started = time.perf_counter()
+    for record in records:
+        store.append([record.code, record.label, True, '42 ms'])
+    fill_ms = (time.perf_counter() - started) * 1000
+    delta = rss_kib() - before
+    return {
+        'fill_ms': round(fill_ms, 2),
+        'rss_bytes_per_row': round(delta * 1024 / len(records), 1),
+        'rows': len(store),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=2000)
+    args = parser.parse_args()
+
+    records = synthetic_catalog(args.count)
+    result = {'count': args.count, 'index': bench_index(records)}
+    if Gtk is None:
+        print("PyGObject (GTK 3) is not installed, skipping the ListStore measurement", file=sys.stderr)
+        result['store'] = None
+    else:
+        result['store'] = bench_store(records)
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
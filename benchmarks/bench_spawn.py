@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Komut başlatma yollarının gecikmesi ve bellek etkisi: doğrudan subprocess ve yardımcı süreç.
+
+Yardımcıyı süreç henüz küçükken başlatır, ardından GTK'nın yüklediği belleği
+taklit eden bir yük ayırır ve her boyutta üç yolu ölçer: doğrudan subprocess
+(Linux'ta Python 3.10+ için vfork), zorla fork kullanan subprocess (eski
+Python sürümlerinin yolu) ve posix_spawn kullanan yardımcı. Başlatma ve
+başlat + bitir sürelerini, yardımcının RSS/PSS değerini JSON olarak yazar.
+Yardımcının çıktısı, çıkış kodu ya da süre sınırı davranışı doğrudan yoldan
+farklıysa çıkış kodu 1 olur.
+
+    python3 benchmarks/bench_spawn.py --count 300 --ballast-mb 0,200,800
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from hotspot_shield_app import CommandBroker, SpawnHelper  # noqa: E402
+
+CHECKS = [
+    (['sh', '-c', 'echo out; echo err >&2; exit 3'], None),
+    (['cat'], 'user@example.com\r\nsecret\n'),
+    (['sh', '-c', 'printf "%s" "$PATH"'], None),
+]
+
+
+def memory(pid='self'):
+    """Sürecin RSS ve (varsa) PSS değerlerini KiB olarak döndürür."""
+    values = {}
+    for name, key in (('status', 'VmRSS:'), ('smaps_rollup', 'Pss:')):
+        try:
+            with open(f'/proc/{pid}/{name}') as f:
+                for line in f:
+                    if line.startswith(key):
+                        values[key.rstrip(':').lower() + '_kib'] = int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return values
+
+
+def run(spawner, args, input=None, timeout=None):
+    process = spawner.spawn(args, input)
+    try:
+        stdout, stderr = process.communicate(input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        CommandBroker._kill(process)
+        process.communicate()
+        return 'timeout'
+    return stdout, stderr, process.returncode
+
+
+def measure(spawner, count, force_fork=False):
+    """Başlatma ve başlat + bitir sürelerinin ortanca ve p95 değerlerini ms olarak döndürür."""
+    use_vfork = getattr(subprocess, '_USE_VFORK', None)
+    if force_fork and use_vfork is not None:
+        subprocess._USE_VFORK = False
+    try:
+        spawn, total = [], []
+        for _ in range(count):
+            started = time.perf_counter()
+            process = spawner.spawn(['true'])
+            spawned = time.perf_counter()
+            process.communicate()
+            total.append(time.perf_counter() - started)
+            spawn.append(spawned - started)
+    finally:
+        if use_vfork is not None:
+            subprocess._USE_VFORK = use_vfork
+
+    def summary(samples):
+        samples.sort()
+        return {'median_ms': round(statistics.median(samples) * 1e3, 3),
+                'p95_ms': round(samples[int(len(samples) * 0.95) - 1] * 1e3, 3)}
+    return {'spawn': summary(spawn), 'spawn_and_exit': summary(total)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=300)
+    parser.add_argument('--ballast-mb', default='0,200',
+                        help="comma separated process sizes to simulate (MiB allocated after helper start)")
+    args = parser.parse_args()
+
+    before = memory()
+    helper = SpawnHelper(enabled=True).start()
+    direct = SpawnHelper(enabled=False)
+    report = {
+        'python': sys.version.split()[0],
+        'vfork_available': getattr(subprocess, '_USE_VFORK', None),
+        'parent_rss_kib_before_helper': before.get('vmrss_kib'),
+        'parent_rss_kib_after_helper': memory().get('vmrss_kib'),
+        'sizes': {},
+        'mismatches': [],
+    }
+
+    for args_, input in CHECKS:
+        expected, got = run(direct, args_, input), run(helper, args_, input)
+        if expected != got:
+            report['mismatches'].append({'args': args_, 'direct': expected, 'helper': got})
+    started = time.perf_counter()
+    outcome = run(helper, ['sh', '-c', 'sleep 5 & sleep 5'], timeout=0.2)
+    if outcome != 'timeout' or time.perf_counter() - started > 2:
+        report['mismatches'].append({'args': 'timeout', 'helper': outcome})
+
+    ballast = []
+    for size in sorted(int(value) for value in args.ballast_mb.split(',')):
+        grow = (size << 20) - sum(len(block) for block in ballast)
+        if grow > 0:
+            block = bytearray(grow)
+            block[::4096] = b'\x01' * len(range(0, grow, 4096))  # Sayfaları gerçekten ayır
+            ballast.append(block)
+        report['sizes'][f'{size}MiB'] = {
+            'parent_rss_kib': memory().get('vmrss_kib'),
+            'direct': measure(direct, args.count),
+            'direct_fork': measure(direct, args.count, force_fork=True),
+            'helper': measure(helper, args.count),
+        }
+    report['helper_memory'] = memory(helper.pid)
+    helper.stop()
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Kaydedilmiş 'hotspotshield status' çıktılarıyla durum ayrıştırıcısının doğruluğu ve hızı.
+
+fixtures/status_outputs.json içindeki her çıktıyı VpnStatus.parse ile
+ayrıştırır, beklenen alanlarla karşılaştırır ve çıktı başına ayrıştırma
+süresini JSON olarak yazar. Beklenmeyen bir sonuç varsa çıkış kodu 1 olur.
+
+    python3 benchmarks/bench_status_parser.py --count 20000
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from hotspot_shield_app import VpnStatus  # noqa: E402
+
+FIXTURES = BENCH_DIR / 'fixtures' / 'status_outputs.json'
+
+
+def check(fixture):
+    """Ayrıştırma sonucunu beklenen alanlarla karşılaştırır; farkları döndürür."""
+    status = VpnStatus.parse(fixture['output'])
+    return {key: {'expected': expected, 'got': getattr(status, key)}
+            for key, expected in fixture['expect'].items()
+            if getattr(status, key) != expected}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000, help="parses per fixture")
+    parser.add_argument('--fixtures', default=str(FIXTURES))
+    args = parser.parse_args()
+
+    fixtures = json.loads(Path(args.fixtures).read_text())
+    # Tanınmayan çıktılar için yazılan uyarılar ölçümü bozmasın
+    logging.disable(logging.WARNING)
+    mismatches = {}
+    results = {}
+    for fixture in fixtures:
+        diff = check(fixture)
+        if diff:
+            mismatches[fixture['name']] = diff
+        output = fixture['output']
+        started = time.perf_counter()
+        for _ in range(args.count):
+            VpnStatus.parse(output)
+        elapsed = time.perf_counter() - started
+        results[fixture['name']] = {
+            'us_per_parse': round(elapsed / args.count * 1e6, 2),
+            'parses_per_second': int(args.count / elapsed),
+        }
+    logging.disable(logging.NOTSET)
+
+    json.dump({'count': args.count, 'fixtures': results, 'mismatches': mismatches},
+              sys.stdout, indent=2)
+    print()
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
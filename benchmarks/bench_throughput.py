@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Sahte /proc/net/dev sayaçlarıyla tünel trafiği örnekleyicisinin doğruluğu ve maliyeti.
+
+Geçici bir dosyaya bilinen hızlarla artan tun0 sayaçları yazar,
+ThroughputMonitor.sample ile hızları hesaplar ve beklenenle karşılaştırır;
+ardından örnek ve küçük grafik başına süreyi JSON olarak yazar. Hesaplanan
+hızlar beklenenden saparsa çıkış kodu 1 olur.
+
+    python3 benchmarks/bench_throughput.py --count 20000
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from hotspot_shield_app import ThroughputMonitor  # noqa: E402
+
+HEADER = ("Inter-|   Receive                                                |  Transmit\n"
+          " face |bytes    packets errs drop fifo frame compressed multicast|"
+          "bytes    packets errs drop fifo colls carrier compressed\n")
+
+
+def proc_net_dev(rx, tx, extra_interfaces=3):
+    """Bir VPN arayüzü ve birkaç ilgisiz arayüz içeren /proc/net/dev metni üretir."""
+    lines = ["    lo: 9000 90 0 0 0 0 0 0 9000 90 0 0 0 0 0 0"]
+    for index in range(extra_interfaces):
+        lines.append(f"  eth{index}: 123456 789 0 0 0 0 0 0 654321 987 0 0 0 0 0 0")
+    lines.append(f"  tun0: {rx} 100 0 0 0 0 0 0 {tx} 100 0 0 0 0 0 0")
+    return HEADER + '\n'.join(lines) + '\n'
+
+
+def check(path, steps):
+    """(saniye, rx artışı, tx artışı) adımlarını besler; hesaplanan hızların sapmalarını döndürür."""
+    monitor = ThroughputMonitor(proc_path=str(path), prefixes=('tun',), history=8)
+    rx = tx = 0
+    now = 0.0
+    path.write_text(proc_net_dev(rx, tx))
+    monitor.sample(now=now)
+    errors = []
+    for elapsed, rx_delta, tx_delta in steps:
+        rx += rx_delta
+        tx += tx_delta
+        now += elapsed
+        path.write_text(proc_net_dev(rx, tx))
+        rates = monitor.sample(now=now)
+        expected = (rx_delta / elapsed, tx_delta / elapsed)
+        if rates is None or any(abs(got - want) > 1e-6 for got, want in zip(rates, expected)):
+            errors.append({'expected': expected, 'got': rates})
+    # Sayaç sıfırlanması (arayüz yeniden oluşturuldu) negatif hız üretmemeli
+    path.write_text(proc_net_dev(0, 0))
+    if monitor.sample(now=now + 1) != (0.0, 0.0):
+        errors.append({'expected': 'zero after counter reset'})
+    # Arayüz kaybolunca geçmiş temizlenmeli
+    path.write_text(HEADER)
+    if monitor.sample(now=now + 2) is not None or len(monitor.rx):
+        errors.append({'expected': 'history cleared when the interface disappears'})
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='hotspot-bench-') as workdir:
+        path = Path(workdir) / 'net_dev'
+        steps = [(1.0, 125000, 25000), (0.5, 5000000, 100000), (2.0, 0, 0)] * 4
+        errors = check(path, steps)
+
+        path.write_text(proc_net_dev(10 ** 9, 10 ** 8))
+        monitor = ThroughputMonitor(proc_path=str(path), prefixes=('tun',), history=60)
+        started = time.perf_counter()
+        for tick in range(args.count):
+            monitor.sample(now=float(tick))
+        sample_us = (time.perf_counter() - started) / args.count * 1e6
+
+        values = monitor.rx.values()
+        started = time.perf_counter()
+        for _ in range(args.count):
+            ThroughputMonitor.sparkline(values, width=30)
+        sparkline_us = (time.perf_counter() - started) / args.count * 1e6
+
+    json.dump({
+        'count': args.count,
+        'sample_us': round(sample_us, 2),
+        'sparkline_us': round(sparkline_us, 2),
+        'errors': errors,
+    }, sys.stdout, indent=2)
+    print()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Kıyaslama ve deneme için sahte 'hotspotshield' komutu.
+
+Gerçek CLI'nin status, connect [konum], disconnect, locations ve
+account signin/signout/status alt komutlarını taklit eder. Durum
+FAKE_HOTSPOT_STATE dosyasında, senaryo FAKE_HOTSPOT_SCENARIO JSON
+dosyasında tutulur; her çağrı FAKE_HOTSPOT_LOG dosyasına bir satır
+olarak eklenir.
+
+Senaryo alanları:
+    delays       alt komut -> saniye gecikme ("connect": 1.5)
+    fail         alt komut -> kaç çağrının başarısız olacağı (true: hepsi)
+    signed_in    başlangıçta oturum açık mı (varsayılan true)
+    connect_lag  connect döndükten sonra durumun "Connected" olması için geçen süre
+    locations    [kod, ad, bölge] listesi
+    drop_after   bağlandıktan kaç saniye sonra tünelin kendiliğinden kopacağı
+    drops        kaç bağlantının kopacağı (varsayılan 1)
+    fail_after_drop  kopmadan sonra kaç connect çağrısının başarısız olacağı
+    direct_switch  false ise bağlıyken connect reddedilir (önce disconnect gerekir)
+    location_names  kod -> status çıktısında yazılacak konum adı ("DE": "Germany - Frankfurt")
+    status_failures  bağlandıktan sonra kaç status çağrısının hata vereceği (tünel açık kalır)
+    status_failures_after  hataların bağlantıdan kaç saniye sonra başlayacağı (varsayılan 0)
+
+Kopmanın gerçek zamanı durum dosyasındaki last_drop_at alanına yazılır.
+"""
+import fcntl
+import json
+import os
+import sys
+import time
+
+DEFAULT_LOCATIONS = [
+    ['US', 'United States', 'North America'],
+    ['DE', 'Germany', 'Europe'],
+    ['GB', 'United Kingdom', 'Europe'],
+    ['JP', 'Japan', 'Asia'],
+    ['BR', 'Brazil', 'South America'],
+]
+
+
+def load_scenario():
+    path = os.environ.get('FAKE_HOTSPOT_SCENARIO')
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+class State:
+    """Dosya kilidiyle korunan sahte istemci durumu."""
+
+    def __init__(self, path, scenario):
+        self._file = open(path, 'a+')
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        self._file.seek(0)
+        raw = self._file.read()
+        self.data = json.loads(raw) if raw.strip() else {
+            'connected_at': None,
+            'location': None,
+            'signed_in': scenario.get('signed_in', True),
+            'account': scenario.get('account', 'user@example.com'),
+            'failures': {},
+            'drop_at': None,
+            'drops_done': 0,
+            'last_drop_at': None,
+            'connect_failures_left': 0,
+        }
+
+    def save(self):
+        self._file.seek(0)
+        self._file.truncate()
+        json.dump(self.data, self._file)
+        self._file.flush()
+
+    def close(self):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+    @property
+    def connected(self):
+        connected_at = self.data['connected_at']
+        return connected_at is not None and time.time() >= connected_at
+
+    def apply_drop(self, scenario):
+        """Kopma zamanı geçtiyse bağlantıyı düşürür ve sonraki connect hatalarını ayarlar."""
+        drop_at = self.data.get('drop_at')
+        if drop_at is None or time.time() < drop_at:
+            return False
+        self.data['connected_at'] = None
+        self.data['drop_at'] = None
+        self.data['drops_done'] = self.data.get('drops_done', 0) + 1
+        self.data['last_drop_at'] = drop_at
+        self.data['connect_failures_left'] = scenario.get('fail_after_drop', 0)
+        return True
+
+
+def should_fail(state, scenario, name):
+    """Senaryoya göre bu çağrının başarısız olup olmayacağını belirler."""
+    budget = scenario.get('fail', {}).get(name)
+    if budget is True:
+        return True
+    if not budget:
+        return False
+    used = state.data['failures'].get(name, 0)
+    if used < budget:
+        state.data['failures'][name] = used + 1
+        return True
+    return False
+
+
+def main(argv):
+    scenario = load_scenario()
+    name = ' '.join(argv[:2]) if argv[:1] == ['account'] else (argv[0] if argv else '')
+
+    log_path = os.environ.get('FAKE_HOTSPOT_LOG')
+    if log_path:
+        with open(log_path, 'a') as log:
+            log.write(f"{time.time():.6f} {' '.join(argv)}\n")
+
+    time.sleep(scenario.get('delays', {}).get(name, 0.0))
+
+    state_path = os.environ.get('FAKE_HOTSPOT_STATE', '/tmp/fake-hotspotshield-state.json')
+    state = State(state_path, scenario)
+    try:
+        if state.apply_drop(scenario):
+            state.save()
+        if name == 'status':
+            if (state.connected and state.data.get('status_failures_left') and time.time()
+                    >= state.data['connected_at'] + scenario.get('status_failures_after', 0.0)):
+                state.data['status_failures_left'] -= 1
+                state.save()
+                print("Error: daemon is not responding", file=sys.stderr)
+                return 1
+            if state.connected:
+                print("Status: Connected")
+                location = state.data['location']
+                print(f"Location: {scenario.get('location_names', {}).get(location, location)}")
+                print("Virtual IP: 10.8.0.2")
+                print(f"Session duration: {int(time.time() - state.data['connected_at'])}s")
+            else:
+                print("Status: Not connected")
+            return 0
+
+        if name == 'connect':
+            if not state.data['signed_in']:
+                print("Error: not signed in", file=sys.stderr)
+                return 1
+            if state.data.get('connect_failures_left'):
+                state.data['connect_failures_left'] -= 1
+                state.save()
+                print("Error: connection failed", file=sys.stderr)
+                return 1
+            if should_fail(state, scenario, name):
+                state.save()
+                print("Error: connection failed", file=sys.stderr)
+                return 1
+            if state.connected and not scenario.get('direct_switch', True):
+                print("Error: already connected, disconnect first", file=sys.stderr)
+                return 1
+            location = argv[1] if len(argv) > 1 else 'US'
+            state.data['location'] = location
+            state.data['connected_at'] = time.time() + scenario.get('connect_lag', 0.0)
+            state.data['drop_at'] = None
+            state.data['status_failures_left'] = scenario.get('status_failures', 0)
+            if ('drop_after' in scenario
+                    and state.data.get('drops_done', 0) < scenario.get('drops', 1)):
+                state.data['drop_at'] = state.data['connected_at'] + scenario['drop_after']
+            state.save()
+            print(f"Connecting to {location}...")
+            return 0
+
+        if name == 'disconnect':
+            state.data['connected_at'] = None
+            state.data['drop_at'] = None
+            state.save()
+            print("Disconnected")
+            return 0
+
+        if name == 'locations':
+            print("ID      COUNTRY                 REGION")
+            print("------  ----------------------  ------------")
+            for code, country, region in scenario.get('locations', DEFAULT_LOCATIONS):
+                print(f"{code:<6}  {country:<22}  {region}")
+            return 0
+
+        if name == 'account signin':
+            lines = sys.stdin.read().split('\n')
+            username = lines[0].strip() if lines else ''
+            if not username or should_fail(state, scenario, name):
+                state.save()
+                print("Error: invalid credentials", file=sys.stderr)
+                return 1
+            state.data['signed_in'] = True
+            state.data['account'] = username
+            state.save()
+            print("Signed in")
+            return 0
+
+        if name == 'account signout':
+            state.data['signed_in'] = False
+            state.data['connected_at'] = None
+            state.save()
+            print("Signed out")
+            return 0
+
+        if name == 'account status':
+            if state.data['signed_in']:
+                print(f"Signed in as {state.data['account']}")
+            else:
+                print("Not signed in")
+            return 0
+
+        print(f"Unknown command: {' '.join(argv)}", file=sys.stderr)
+        return 2
+    finally:
+        state.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
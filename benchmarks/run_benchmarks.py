@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""Sahte 'hotspotshield' komutuyla uygulama eylemlerinin kıyaslaması.
+
+Sahte CLI'yi PATH'in başına koyar, VpnController'ı GTK olmadan sürer ve
+her eylem için duvar saati süresini, CLI çağrı sayısını ve ana döngüdeki
+en uzun callback süresini JSON olarak yazar.
+
+    python3 benchmarks/run_benchmarks.py --output bench_output.txt
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from hotspot_shield_app import (  # noqa: E402
+    SPAWN_HELPER,
+    SWITCH_MODE,
+    CommandExecutor,
+    ConnectionHistory,
+    LatencyProber,
+    LocationCatalog,
+    ReachabilityProbe,
+    TunnelReadinessDetector,
+    VpnController,
+)
+
+SCENARIOS = {
+    'default': {
+        'delays': {'status': 0.05, 'connect': 0.5, 'disconnect': 0.2, 'locations': 0.1},
+        'connect_lag': 0.3,
+    },
+    'not_signed_in': {
+        'delays': {'status': 0.05, 'connect': 0.3, 'disconnect': 0.2,
+                   'account signin': 0.4, 'account signout': 0.1, 'account status': 0.05},
+        'connect_lag': 0.3,
+        'signed_in': False,
+    },
+    # Bağlandıktan 1 sn sonra tünel kopar; watchdog algılayıp yeniden bağlanmalı
+    'drop': {
+        'delays': {'status': 0.05, 'connect': 0.5, 'disconnect': 0.2, 'locations': 0.1},
+        'connect_lag': 0.3,
+        'drop_after': 1.0,
+    },
+    # disconnect kapanış süresinden uzun sürer: kapanış süre sınırında bitmeli
+    'slow_disconnect': {
+        'delays': {'status': 0.05, 'connect': 0.5, 'disconnect': 30.0, 'locations': 0.1},
+        'connect_lag': 0.3,
+    },
+    # Bağlıyken iki status çağrısı hata verir; tünel açık olduğu için olay ve yeniden bağlanma olmamalı
+    'status_flaky': {
+        'delays': {'status': 0.05, 'connect': 0.5, 'disconnect': 0.2, 'locations': 0.1},
+        'connect_lag': 0.3,
+        'status_failures': 2,
+        'status_failures_after': 0.5,
+        'watchdog': True,
+    },
+    # Bağlıyken hesap değiştirme tüneli düşürür; watchdog bunu kopma sayıp yeniden bağlanmamalı
+    'account_swap': {
+        'delays': {'status': 0.05, 'connect': 0.5, 'disconnect': 0.2, 'locations': 0.1,
+                   'account signin': 0.2, 'account signout': 0.1, 'account status': 0.05},
+        'connect_lag': 0.3,
+        'watchdog': True,
+    },
+    # CLI konumu kod yerine şehirli adla yazar; konum değiştirme beklemeden doğrulanmalı
+    'location_names': {
+        'delays': {'status': 0.05, 'connect': 0.5, 'disconnect': 0.2, 'locations': 0.1},
+        'connect_lag': 0.3,
+        'location_names': {'US': 'United States - New York', 'DE': 'Germany - Frankfurt'},
+    },
+    # Kopmadan sonraki ilk iki connect başarısız olur: geri çekilme ve yeniden deneme ölçülür
+    'drop_flaky': {
+        'delays': {'status': 0.05, 'connect': 0.5, 'disconnect': 0.2, 'locations': 0.1},
+        'connect_lag': 0.3,
+        'drop_after': 1.0,
+        'fail_after_drop': 2,
+    },
+}
+
+# Kıyaslamada watchdog'un beklemeleri kısaltılır
+WATCHDOG_SETTINGS = {'interval': 0.2, 'backoff': 0.2, 'backoff_max': 1.0, 'attempts': 5}
+
+
+class MainLoop:
+    """GTK ana döngüsünün yerine geçen ve her callback'in süresini ölçen kuyruk döngüsü."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.max_stall = 0.0
+
+    def dispatch(self, callback, *args):
+        self._queue.put((callback, args))
+
+    def run_until(self, done, timeout):
+        deadline = time.monotonic() + timeout
+        while not done.is_set():
+            if time.monotonic() > deadline:
+                raise TimeoutError('action did not finish in time')
+            try:
+                callback, args = self._queue.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            started = time.perf_counter()
+            callback(*args)
+            self.max_stall = max(self.max_stall, time.perf_counter() - started)
+
+
+class Harness:
+    """Tek bir senaryo için sahte CLI ortamını ve denetleyiciyi hazırlar."""
+
+    def __init__(self, scenario, workdir):
+        self.workdir = Path(workdir)
+        bin_dir = self.workdir / 'bin'
+        bin_dir.mkdir()
+        stub = bin_dir / 'hotspotshield'
+        stub.symlink_to(BENCH_DIR / 'fake_hotspotshield.py')
+        fake = BENCH_DIR / 'fake_hotspotshield.py'
+        fake.chmod(fake.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+        scenario_path = self.workdir / 'scenario.json'
+        scenario_path.write_text(json.dumps(scenario))
+        self.log_path = self.workdir / 'spawns.log'
+        self.log_path.touch()
+        os.environ['PATH'] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+        os.environ['FAKE_HOTSPOT_SCENARIO'] = str(scenario_path)
+        os.environ['FAKE_HOTSPOT_STATE'] = str(self.workdir / 'state.json')
+        os.environ['FAKE_HOTSPOT_LOG'] = str(self.log_path)
+
+        # Erişilebilirlik ve gecikme testleri yerel bir dinleyiciye yönlendirilir
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(64)
+        port = self.listener.getsockname()[1]
+
+        self.loop = MainLoop()
+        self.controller = VpnController(
+            executor=CommandExecutor(dispatch=self.loop.dispatch),
+            reachability=ReachabilityProbe(tcp_targets=[('127.0.0.1', port)],
+                                           dns_names=[], icmp_hosts=[]),
+            catalog=LocationCatalog(path=self.workdir / 'locations.json'),
+            latency=LatencyProber(resolver=lambda record: ('127.0.0.1', port)),
+            history=ConnectionHistory(self.workdir / 'history.sqlite3'),
+        )
+        # Gerçek arayüzler yerine boş bir sysfs dizini: algılama durum sorgusuna düşer
+        (self.workdir / 'net').mkdir()
+        self.controller.readiness = TunnelReadinessDetector(
+            lambda: self.controller.status_cache.get(force=True),
+            prefixes=('hsbench',), sys_net=str(self.workdir / 'net')
+        )
+        self.state_path = self.workdir / 'state.json'
+        if 'drop_after' in scenario or scenario.get('watchdog'):
+            self.controller.enable_watchdog(**WATCHDOG_SETTINGS)
+
+    def incidents(self):
+        """Watchdog olaylarını, sahte CLI'nin kaydettiği gerçek kopma zamanıyla birlikte döndürür."""
+        if self.controller.watchdog is None:
+            return []
+        dropped_at = json.loads(self.state_path.read_text()).get('last_drop_at')
+        incidents = self.controller.watchdog.snapshot()
+        for incident in incidents:
+            if dropped_at is not None:
+                incident['true_time_to_detect'] = round(incident['detected_at'] - dropped_at, 3)
+        return incidents
+
+    def close(self):
+        if self.controller.watchdog is not None:
+            self.controller.watchdog.stop()
+        self.controller.executor.shutdown()
+        self.controller.history.close()
+        self.listener.close()
+
+    def measure(self, name, *calls):
+        """Verilen çağrıları paralel çalıştırır, hepsi bitene kadar döngüyü çevirir ve ölçer."""
+        self.log_path.write_text('')
+        self.loop.max_stall = 0.0
+        done = threading.Event()
+        outcomes = [None] * len(calls)
+        remaining = [len(calls)]
+
+        def finished(index, value):
+            outcomes[index] = value
+            remaining[0] -= 1
+            if not remaining[0]:
+                done.set()
+
+        started = time.perf_counter()
+        for index, (func, *args) in enumerate(calls):
+            self.controller.executor.call(
+                func, *args, callback=lambda value, index=index: finished(index, value)
+            )
+        self.loop.run_until(done, timeout=120)
+        wall = time.perf_counter() - started
+
+        commands = Counter()
+        for line in self.log_path.read_text().splitlines():
+            argv = line.split()[1:]
+            commands[' '.join(argv[:2]) if argv[:1] == ['account'] else argv[0]] += 1
+        return {
+            'action': name,
+            'wall_ms': round(wall * 1000, 1),
+            'spawns': sum(commands.values()),
+            'commands': dict(commands),
+            'max_stall_ms': round(self.loop.max_stall * 1000, 3),
+            'outcome': [_summarize(outcome) for outcome in outcomes],
+        }
+
+
+def _summarize(value):
+    """Eylem sonucunu JSON'a uygun kısa bir biçime çevirir."""
+    if isinstance(value, (str, bool, int, float, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_summarize(item) if not isinstance(item, (list, tuple)) else len(item)
+                for item in value]
+    return type(value).__name__
+
+
+def _sequence(*calls):
+    """Çağrıları sırayla çalıştıran ve sonuçlarını döndüren tek bir çağrı üretir."""
+    return lambda: [func(*args) for func, *args in calls]
+
+
+def _connect_and_recover(controller, timeout=30.0):
+    """Bağlanır ve watchdog'un ilk kopma olayını sonuçlandırmasını bekler."""
+    outcome = controller.connect()
+    deadline = time.monotonic() + timeout
+    while not controller.watchdog.snapshot():
+        if time.monotonic() > deadline:
+            return [outcome, 'no incident']
+        time.sleep(0.05)
+    return [outcome, controller.watchdog.snapshot()[0]['outcome']]
+
+
+def _connect_and_hold(controller, hold=2.0):
+    """Bağlanır, watchdog birkaç denetim yapana kadar bekler; olay sayısını ve son durumu döndürür."""
+    outcome = controller.connect()
+    time.sleep(hold)
+    return [outcome, len(controller.watchdog.snapshot()), controller.state.state]
+
+
+def _login_and_hold(controller, username, hold=1.5):
+    """Giriş yapar, watchdog birkaç denetim yapana kadar bekler; olay sayısını ve son durumu döndürür."""
+    outcome = controller.login(username, 'secret')
+    time.sleep(hold)
+    return [outcome, len(controller.watchdog.snapshot()), controller.state.state]
+
+
+def _after(delay, func, *args):
+    """Çağrıyı gecikmeyle çalıştırır; süren bir işlemin ortasında kapanışı ölçmek için."""
+    time.sleep(delay)
+    return func(*args)
+
+
+def actions_for(name, controller):
+    """Senaryoya göre çalıştırılacak (ad, çağrılar) dizisini döndürür."""
+    startup = ('startup', (controller.check_internet,), (controller.status_cache.get,),
+               (controller.refresh_locations,))
+    if name.startswith('drop'):
+        return [
+            startup,
+            ('drop_recover', (_connect_and_recover, controller)),
+            ('disconnect', (controller.disconnect,)),
+        ]
+    if name == 'status_flaky':
+        return [
+            startup,
+            ('connect_hold', (_connect_and_hold, controller)),
+            ('disconnect', (controller.disconnect,)),
+        ]
+    if name == 'account_swap':
+        return [
+            startup,
+            ('connect', (controller.connect,)),
+            ('swap_account', (_login_and_hold, controller, 'other@example.com')),
+            # Kısa ya da boş ad açık hesapla eşleşmemeli
+            ('login_partial_name', (controller.login, 'other', 'secret')),
+            ('login_empty_name', (controller.login, '', 'secret')),
+        ]
+    if name == 'slow_disconnect':
+        return [
+            startup,
+            ('connect', (controller.connect,)),
+            ('shutdown', (controller.shutdown,)),
+        ]
+    if name == 'not_signed_in':
+        return [
+            startup,
+            ('connect_not_signed_in', (controller.connect,)),
+            ('login', (controller.login, 'user@example.com', 'secret')),
+            ('login_again', (controller.login, 'user@example.com', 'secret')),
+            ('connect', (controller.connect,)),
+            ('disconnect', (controller.disconnect,)),
+        ]
+    return [
+        startup,
+        ('auto_connect', (controller.auto_connect,)),
+        ('status_cached', (controller.is_connected,)),
+        ('switch_location', (controller.connect, 'DE')),
+        ('disconnect', (controller.disconnect,)),
+        ('connect', (controller.connect,)),
+        ('disconnect_again', (controller.disconnect,)),
+        ('connect_switch_disconnect', (_sequence((controller.connect,),
+                                                 (controller.connect, 'GB'),
+                                                 (controller.disconnect,)),)),
+        ('repeat_actions', (controller.disconnect,), (controller.disconnect,)),
+        # Süren bir kesmenin ortasında gelen ikinci istek 'busy' almalı, ikinci teardown olmamalı
+        ('connect_again', (controller.connect,)),
+        ('parallel_disconnect', (controller.disconnect,), (_after, 0.1, controller.disconnect)),
+        ('connect_before_shutdown', (controller.connect,)),
+        ('shutdown', (controller.shutdown,)),
+        ('shutdown_during_connect', (controller.connect,),
+         (_after, 0.2, controller.shutdown)),
+    ]
+
+
+def run_scenario(name, scenario):
+    with tempfile.TemporaryDirectory(prefix='hotspot-bench-') as workdir:
+        harness = Harness(scenario, workdir)
+        # Konum değiştirme yolu senaryo dosyasında 'switch_mode' ile seçilebilir
+        harness.controller.direct_switch = scenario.get('switch_mode', SWITCH_MODE) == 'direct'
+        try:
+            actions = [harness.measure(action, *calls)
+                       for action, *calls in actions_for(name, harness.controller)]
+            incidents = harness.incidents()
+            switches = list(harness.controller.switches)
+        finally:
+            harness.close()
+    return {
+        'scenario': scenario,
+        'actions': actions,
+        'total_wall_ms': round(sum(a['wall_ms'] for a in actions), 1),
+        'total_spawns': sum(a['spawns'] for a in actions),
+        'max_stall_ms': max(a['max_stall_ms'] for a in actions),
+        'incidents': incidents,
+        'switches': switches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="scenario to run (default: all)")
+    parser.add_argument('--scenario-file', help="JSON file merged into every scenario")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    # Uygulamadaki gibi: HOTSPOT_SPAWN_HELPER açıksa komutlar yardımcı süreçten başlatılır
+    SPAWN_HELPER.start()
+
+    overrides = json.loads(Path(args.scenario_file).read_text()) if args.scenario_file else {}
+    original_env = dict(os.environ)
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'spawn_helper': SPAWN_HELPER.running,
+        'scenarios': {},
+    }
+    for name in args.scenario or sorted(SCENARIOS):
+        report['scenarios'][name] = run_scenario(name, {**SCENARIOS[name], **overrides})
+        os.environ.clear()
+        os.environ.update(original_env)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
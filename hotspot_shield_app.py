@@ -1,172 +1,3607 @@
 #!/usr/bin/env python3
-import gi
+import time
+
+# Başlangıç izleme için süreç başlangıç zamanı (ağır importlardan önce alınır)
+_PROCESS_START = time.monotonic()
+
+import argparse
+import array
+import atexit
+import bisect
+import errno
+import functools
+import importlib
+import ipaddress
+import itertools
+import json
+import locale
 import subprocess
 import os
 import logging
+import logging.handlers
+import queue
+import random
+import re
+import select
+import selectors
+import shutil
+import signal
+import socket
+import sqlite3
+import struct
 import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
-# Create a log file in the user's home directory
-log_file = str(Path.home() / '.hotspot-indicator.log')
+# Create a log file in the user's home directory
+log_file = str(Path.home() / '.hotspot-indicator.log')
+
+
+def _env_float(name, default):
+    """Ortam değişkeninden ondalıklı bir ayar okur, geçersizse varsayılanı döndürür."""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        logging.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+# Durum önbelleğinin geçerlilik süresi (saniye)
+STATUS_CACHE_TTL = _env_float('HOTSPOT_STATUS_TTL', 3.0)
+# Tünelin ayağa kalkması / kapanması için beklenecek en uzun süre (saniye)
+TUNNEL_WAIT_TIMEOUT = _env_float('HOTSPOT_TUNNEL_TIMEOUT', 20.0)
+# Konum değiştirme yolu: 'direct' bağlıyken doğrudan 'connect <konum>' çalıştırır (CLI eski
+# tüneli kendisi kapatır), 'teardown' önce 'disconnect' çalıştırır
+SWITCH_MODE = os.environ.get('HOTSPOT_SWITCH_MODE', 'direct')
+# Çıkışta bağlantıyı kesmek için tanınan süre; dolunca uygulama yine de kapanır (saniye)
+SHUTDOWN_TIMEOUT = _env_float('HOTSPOT_SHUTDOWN_TIMEOUT', 5.0)
+# İnternet erişimi için yarıştırılan TCP hedefleri (host:port, virgülle ayrılmış)
+REACHABILITY_TCP_TARGETS = os.environ.get(
+    'HOTSPOT_REACHABILITY_TARGETS', '1.1.1.1:443,8.8.8.8:53,9.9.9.9:443'
+)
+# DNS çözümlemesiyle denenecek isimler ve isteğe bağlı ICMP (ping) hedefleri
+REACHABILITY_DNS_NAMES = os.environ.get('HOTSPOT_REACHABILITY_DNS', 'cloudflare.com')
+REACHABILITY_ICMP_HOSTS = os.environ.get('HOTSPOT_REACHABILITY_ICMP', '')
+REACHABILITY_TIMEOUT = _env_float('HOTSPOT_REACHABILITY_TIMEOUT', 3.0)
+REACHABILITY_TTL = _env_float('HOTSPOT_REACHABILITY_TTL', 30.0)
+# Konum kataloğunun disk önbelleğinde geçerli kalacağı süre (saniye)
+LOCATIONS_CACHE_TTL = _env_float('HOTSPOT_LOCATIONS_TTL', 24 * 3600.0)
+# Konum uç noktası şablonu ({code}/{code_lower} yer tutucuları, host:port). CLI sunucu
+# adreslerini bildirmez; şablon ayarlanmadıkça gecikme ölçülmez ve "En Hızlı Konum" gizlenir
+LOCATION_ENDPOINT_TEMPLATE = os.environ.get('HOTSPOT_LOCATION_ENDPOINT', '')
+LATENCY_PROBE_TIMEOUT = _env_float('HOTSPOT_LATENCY_TIMEOUT', 2.0)
+LATENCY_CACHE_TTL = _env_float('HOTSPOT_LATENCY_TTL', 600.0)
+LATENCY_WORKERS = int(_env_float('HOTSPOT_LATENCY_WORKERS', 8))
+# Uygulamanın önbellek dizini
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'hotspot-shield-gui'
+# Bağlantı geçmişi: SQLite dosyası, saklanan en fazla deneme ve konum seçiminde bakılan süre (saniye)
+HISTORY_ENABLED = os.environ.get('HOTSPOT_HISTORY', '1') != '0'
+HISTORY_DB = os.environ.get('HOTSPOT_HISTORY_DB') or str(CACHE_DIR / 'history.sqlite3')
+HISTORY_MAX_ROWS = int(_env_float('HOTSPOT_HISTORY_MAX_ROWS', 100000))
+HISTORY_WINDOW = _env_float('HOTSPOT_HISTORY_WINDOW', 30 * 24 * 3600.0)
+# Giriş akışının (durum, çıkış, giriş, doğrulama) toplam süre sınırı (saniye)
+LOGIN_TIMEOUT = _env_float('HOTSPOT_LOGIN_TIMEOUT', 60.0)
+# Çeviri kataloglarının dizini (dil başına bir JSON dosyası) ve başlangıç dili
+LOCALES_DIR = os.environ.get('HOTSPOT_LOCALES_DIR') or str(Path(__file__).resolve().parent / 'locales')
+DEFAULT_LANGUAGE = os.environ.get('HOTSPOT_LANGUAGE', 'tr')
+# Denetim soketi: --daemon ya da ilk açılan GUI sunar, betikler ve diğer GUI'ler istemci olur.
+# XDG_RUNTIME_DIR yoksa /tmp altında yalnızca kullanıcıya açık (0700) bir dizin kullanılır
+CONTROL_SOCKET_FALLBACK_DIR = f'/tmp/hotspot-shield-{os.getuid()}'
+CONTROL_SOCKET_PATH = os.environ.get('HOTSPOT_CONTROL_SOCKET') or (
+    str(Path(os.environ['XDG_RUNTIME_DIR']) / 'hotspot-shield.sock')
+    if os.environ.get('XDG_RUNTIME_DIR') else f'{CONTROL_SOCKET_FALLBACK_DIR}/control.sock'
+)
+# VPN arayüzlerinin isim önekleri (virgülle ayrılmış)
+VPN_INTERFACE_PREFIXES = tuple(
+    p.strip() for p in os.environ.get('HOTSPOT_VPN_INTERFACES', 'hss,hydra,tun').split(',') if p.strip()
+)
+
+# Bağlantı koptuğunda yeniden bağlanma: denetim aralığı, deneme sayısı, toplam süre ve geri çekilme
+WATCHDOG_ENABLED = os.environ.get('HOTSPOT_WATCHDOG', '1') != '0'
+WATCHDOG_INTERVAL = _env_float('HOTSPOT_WATCHDOG_INTERVAL', 10.0)
+RECONNECT_ATTEMPTS = int(_env_float('HOTSPOT_RECONNECT_ATTEMPTS', 5))
+RECONNECT_BUDGET = _env_float('HOTSPOT_RECONNECT_BUDGET', 300.0)
+RECONNECT_BACKOFF = _env_float('HOTSPOT_RECONNECT_BACKOFF', 1.0)
+RECONNECT_BACKOFF_MAX = _env_float('HOTSPOT_RECONNECT_BACKOFF_MAX', 60.0)
+# Bağlıyken art arda bu kadar durum sorgusu başarısız olursa (hata, zaman aşımı, anlaşılmayan çıktı) kopma sayılır
+PROBE_FAILURE_LIMIT = int(_env_float('HOTSPOT_PROBE_FAILURES', 3))
+# Ölçüm dışa aktarımı: Prometheus metin dosyası ve/veya yerel HTTP ucu (boş / 0 ise kapalı)
+METRICS_FILE = os.environ.get('HOTSPOT_METRICS_FILE', '')
+METRICS_FILE_INTERVAL = _env_float('HOTSPOT_METRICS_FILE_INTERVAL', 15.0)
+METRICS_PORT = int(_env_float('HOTSPOT_METRICS_PORT', 0))
+# GTK ana döngüsü gecikme ölçümü: örnekleme aralığı ve takılma eşiği (saniye)
+MAINLOOP_PROBE_INTERVAL = _env_float('HOTSPOT_MAINLOOP_INTERVAL', 0.25)
+MAINLOOP_STALL_THRESHOLD = _env_float('HOTSPOT_STALL_THRESHOLD', 0.1)
+# Aynı pencerede art arda gelen durum bildirimleri tek bildirimde birleştirilir (saniye)
+NOTIFY_DEBOUNCE = _env_float('HOTSPOT_NOTIFY_DEBOUNCE', 1.0)
+# Tünel trafiği: /proc/net/dev örnekleme aralığı (saniye), saklanan örnek sayısı ve okunacak dosya
+THROUGHPUT_INTERVAL = _env_float('HOTSPOT_THROUGHPUT_INTERVAL', 1.0)
+THROUGHPUT_HISTORY = int(_env_float('HOTSPOT_THROUGHPUT_HISTORY', 60))
+PROC_NET_DEV = os.environ.get('HOTSPOT_PROC_NET_DEV', '/proc/net/dev')
+# Komut başlatma yardımcısı: 'auto' (vfork kullanamayan Python sürümlerinde açık), '1' ya da '0'
+SPAWN_HELPER_MODE = os.environ.get('HOTSPOT_SPAWN_HELPER', 'auto')
+SPAWN_HELPER_TIMEOUT = _env_float('HOTSPOT_SPAWN_HELPER_TIMEOUT', 5.0)
+# Günlük ayarları: seviye, dosya boyutu / yaş sınırı ve saklanacak eski dosya sayısı
+LOG_LEVEL = os.environ.get('HOTSPOT_LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(_env_float('HOTSPOT_LOG_MAX_BYTES', 1024 * 1024))
+LOG_ROTATE_INTERVAL = _env_float('HOTSPOT_LOG_ROTATE_INTERVAL', 24 * 3600.0)
+LOG_BACKUP_COUNT = int(_env_float('HOTSPOT_LOG_BACKUPS', 3))
+
+
+class SizeOrAgeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Dosya boyutu ya da yaşı sınırı aştığında döndürülen günlük dosyası."""
+
+    def __init__(self, filename, max_bytes, interval, backup_count):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.interval = interval
+        try:
+            self._opened_at = os.path.getmtime(filename)
+        except OSError:
+            self._opened_at = time.time()
+
+    def shouldRollover(self, record):
+        if self.interval > 0 and time.time() - self._opened_at >= self.interval:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._opened_at = time.time()
+
+
+class DeduplicatingHandler(logging.Handler):
+    """Art arda gelen aynı mesajları tek satıra ve bir tekrar sayacına indirger."""
+
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+        self._last = None
+        self._last_key = None
+        self._repeats = 0
+
+    def _flush_repeats(self):
+        if self._repeats:
+            summary = logging.makeLogRecord(self._last.__dict__)
+            summary.msg = f"Last message repeated {self._repeats} more times"
+            summary.args = None
+            summary.exc_info = summary.exc_text = None
+            self.target.handle(summary)
+            self._repeats = 0
+
+    def emit(self, record):
+        key = (record.levelno, record.name, record.getMessage())
+        if key == self._last_key and record.exc_info is None:
+            self._repeats += 1
+            self._last = record
+            return
+        self._flush_repeats()
+        self._last, self._last_key = record, key
+        self.target.handle(record)
+
+    def flush(self):
+        self._flush_repeats()
+        self.target.flush()
+
+    def close(self):
+        self.flush()
+        self.target.close()
+        super().close()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Kaydı biçimlendirmeden kuyruğa koyar; biçimlendirme ve yazma dinleyici iş parçacığında yapılır."""
+
+    def prepare(self, record):
+        return record
+
+
+def configure_logging(path=None, level=None):
+    """Kök günlükçüyü kuyruk üzerinden arka planda yazan, döndürülen ve tekrarları birleştiren hatta bağlar."""
+    file_handler = SizeOrAgeRotatingFileHandler(
+        path or log_file, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT
+    )
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, DeduplicatingHandler(file_handler))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    listener.start()
+    try:
+        set_log_level(level or LOG_LEVEL)
+    except ValueError:
+        set_log_level('INFO')
+        logging.warning(f"Invalid log level {level or LOG_LEVEL}, using INFO")
+    # Çıkışta önce kuyruk boşaltılır, ardından bekleyen tekrar sayacı yazılır (atexit ters sırada çalışır)
+    atexit.register(listener.handlers[0].flush)
+    atexit.register(listener.stop)
+    return listener
+
+
+def set_log_level(level):
+    """Günlük seviyesini çalışma sırasında değiştirir; geçersiz bir ad için ValueError verir."""
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"unknown log level: {level}")
+    logging.getLogger().setLevel(value)
+    return logging.getLevelName(value)
+
+
+_resolved_binaries = {}
+
+
+def resolve_binary(name):
+    """Komut adını PATH'te bir kez arar; aynı PATH için sonraki çağrılar önbellekten döner."""
+    if os.sep in name:
+        return name
+    search_path = os.environ.get('PATH', os.defpath)
+    path = _resolved_binaries.get((name, search_path))
+    if path is None:
+        path = shutil.which(name, path=search_path)
+        # Bulunamayan komut önbelleğe alınmaz; sonradan kurulursa yeniden aranır
+        if path is not None:
+            _resolved_binaries[(name, search_path)] = path
+    return path
+
+
+# Yardımcının yok saydığı sinyaller; başlattığı komutlarda bunlar ve SIGPIPE varsayılana döner
+_HELPER_IGNORED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+_HELPER_DEFAULT_SIGNALS = _HELPER_IGNORED_SIGNALS + tuple(
+    getattr(signal, name) for name in ('SIGPIPE', 'SIGXFSZ') if hasattr(signal, name))
+_HELPER_MESSAGE_SIZE = 1 << 18
+
+
+def _spawn_helper_main(sock):
+    """Yardımcı süreç döngüsü: istekleri okur, komutları posix_spawn ile başlatır, çıkış kodlarını bildirir."""
+    # Ctrl+C ve SIGTERM ana sürece bırakılır; kapanıştaki disconnect yardımcıya hâlâ ihtiyaç duyar
+    for signum in _HELPER_IGNORED_SIGNALS:
+        signal.signal(signum, signal.SIG_IGN)
+    send_lock = threading.Lock()
+    env = dict(os.environ)
+
+    def reply(message, fds=()):
+        data = json.dumps(message).encode()
+        with send_lock:
+            try:
+                socket.send_fds(sock, [data], list(fds))
+            except OSError:
+                pass  # Ana süreç kapandı
+
+    def reap(request_id, pid):
+        _, status = os.waitpid(pid, 0)
+        reply({'id': request_id, 'exit': os.waitstatus_to_exitcode(status)})
+
+    while True:
+        try:
+            data = sock.recv(_HELPER_MESSAGE_SIZE)
+        except OSError:
+            break
+        if not data:
+            break
+        request = json.loads(data)
+        env = request.get('env', env)
+        stdin_r, stdin_w = os.pipe() if request['stdin'] else (None, None)
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        actions = [(os.POSIX_SPAWN_DUP2, stdin_r, 0) if stdin_r is not None
+                   else (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+                   (os.POSIX_SPAWN_DUP2, stdout_w, 1),
+                   (os.POSIX_SPAWN_DUP2, stderr_w, 2)]
+        parent_fds = [fd for fd in (stdin_w, stdout_r, stderr_r) if fd is not None]
+        try:
+            # Yeni oturum: süre dolduğunda tüm grup öldürülebilir (start_new_session gibi)
+            pid = os.posix_spawn(request['path'], request['args'], env, file_actions=actions,
+                                 setsid=True, setsigdef=_HELPER_DEFAULT_SIGNALS)
+        except OSError as e:
+            pid = None
+            reply({'id': request['id'], 'errno': e.errno, 'error': e.strerror or str(e)})
+        else:
+            reply({'id': request['id'], 'pid': pid}, parent_fds)
+            threading.Thread(target=reap, args=(request['id'], pid), daemon=True).start()
+        finally:
+            for fd in parent_fds + [stdin_r, stdout_w, stderr_w]:
+                if fd is not None:
+                    os.close(fd)
+    os._exit(0)
+
+
+class HelperProcess:
+    """Yardımcının başlattığı bir komut; CommandBroker'ın kullandığı Popen arayüzünün alt kümesi."""
+
+    def __init__(self, args):
+        self.args = args
+        self.pid = None
+        self.returncode = None
+        self.spawned = threading.Event()
+        self.exited = threading.Event()
+        self.error = None
+        self._stdin = None
+        self._streams = {}
+        self._chunks = {}
+
+    def deliver(self, message, fds):
+        """Yardımcıdan gelen yanıtı işler (okuyucu iş parçacığında çağrılır)."""
+        if 'pid' in message:
+            self.pid = message['pid']
+            if len(fds) == 3:
+                self._stdin = fds.pop(0)
+            for name, fd in zip(('stdout', 'stderr'), fds):
+                self._streams[fd] = name
+                self._chunks[name] = []
+            self.spawned.set()
+            return
+        for fd in fds:
+            os.close(fd)
+        if 'exit' in message:
+            self.returncode = message['exit']
+        else:
+            self.error = message
+            self.spawned.set()
+        self.exited.set()
+
+    def communicate(self, input=None, timeout=None):
+        """Girdiyi yazar, çıktıları sona kadar okur ve çıkışı bekler; süre dolarsa TimeoutExpired verir."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        encoding = locale.getpreferredencoding(False)
+        if self._stdin is not None:
+            try:
+                if input:
+                    os.write(self._stdin, input.encode(encoding))
+            except BrokenPipeError:
+                pass
+            finally:
+                os.close(self._stdin)
+                self._stdin = None
+        with selectors.DefaultSelector() as selector:
+            for fd in self._streams:
+                selector.register(fd, selectors.EVENT_READ)
+            while self._streams:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+                for key, _ in selector.select(remaining):
+                    data = os.read(key.fd, 32768)
+                    if data:
+                        self._chunks[self._streams[key.fd]].append(data)
+                        continue
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+                    del self._streams[key.fd]
+        if not self.exited.wait(None if deadline is None else max(0.0, deadline - time.monotonic())):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        # text=True ile açılan Popen gibi: yerel kodlama ve evrensel satır sonları
+        return tuple(b''.join(self._chunks.get(name, ())).decode(encoding, 'replace')
+                     .replace('\r\n', '\n').replace('\r', '\n') for name in ('stdout', 'stderr'))
+
+
+class SpawnHelper:
+    """Komutları, süreç henüz küçükken çatallanan bir yardımcı süreç üzerinden başlatır.
+
+    İstekler bir soket çifti üzerinden gider; yardımcı komutu posix_spawn ile
+    başlatır, çıktı borularını dosya tanıtıcısı olarak geri gönderir ve çıkış
+    kodunu bildirir. Yardımcı kapalıysa ya da düştüyse komutlar doğrudan
+    subprocess ile başlatılır.
+    """
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            # Linux'ta Python 3.10+ subprocess zaten vfork kullanır; yardımcı yalnızca fork'a düşen sürümlerde açılır
+            enabled = SPAWN_HELPER_MODE == '1' or (SPAWN_HELPER_MODE == 'auto' and not (
+                sys.platform.startswith('linux') and sys.version_info >= (3, 10)))
+        self.enabled = enabled and hasattr(os, 'posix_spawn') and hasattr(socket, 'send_fds')
+        self.pid = None
+        self._sock = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count()
+        self._env = None
+
+    @property
+    def running(self):
+        return self._sock is not None
+
+    def start(self):
+        """Yardımcıyı çatallar; GTK yüklenmeden ve iş parçacıkları başlamadan çağrılmalıdır."""
+        if not self.enabled or self._sock is not None:
+            return self
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                parent.close()
+                _spawn_helper_main(child)
+            finally:
+                os._exit(0)
+        child.close()
+        self.pid, self._sock = pid, parent
+        threading.Thread(target=self._read_replies, args=(parent,), name='hotspot-spawn',
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        """Yardımcıyı kapatır; çalışan komutlar etkilenmez."""
+        with self._lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+                os.waitpid(self.pid, 0)
+            except (OSError, ChildProcessError):
+                pass
+
+    def _read_replies(self, sock):
+        while True:
+            try:
+                data, fds, _, _ = socket.recv_fds(sock, _HELPER_MESSAGE_SIZE, 3)
+            except OSError:
+                break
+            if not data:
+                break
+            message = json.loads(data)
+            with self._lock:
+                process = self._pending.get(message['id'])
+                if 'pid' not in message:
+                    self._pending.pop(message['id'], None)
+            if process is None:
+                for fd in fds:
+                    os.close(fd)
+                continue
+            process.deliver(message, fds)
+        with self._lock:
+            lost = self._sock is sock
+            if lost:
+                self._sock = None
+            pending, self._pending = list(self._pending.values()), {}
+        sock.close()
+        for process in pending:
+            process.deliver({'lost': True}, [])
+        if lost:
+            logging.warning("Spawn helper exited, starting commands directly")
+            try:
+                os.waitpid(self.pid, 0)
+            except ChildProcessError:
+                pass
+
+    def _via_helper(self, executable, args, stdin):
+        env = dict(os.environ)
+        process = HelperProcess(args)
+        with self._lock:
+            if self._sock is None:
+                return None
+            request = {'id': next(self._ids), 'path': executable, 'args': list(args), 'stdin': stdin}
+            # Ortam yalnızca değiştiğinde gönderilir
+            if env != self._env:
+                request['env'] = env
+            try:
+                self._sock.send(json.dumps(request).encode())
+            except OSError as e:
+                logging.warning(f"Spawn helper request failed: {str(e)}")
+                return None
+            self._env = env
+            self._pending[request['id']] = process
+        if not process.spawned.wait(SPAWN_HELPER_TIMEOUT):
+            # Komut yine de başlamış olabilir; ikinci kez çalıştırmamak için hata verilir
+            with self._lock:
+                self._pending.pop(request['id'], None)
+            raise OSError(errno.ETIMEDOUT, "spawn helper did not answer")
+        if process.error is None:
+            return process
+        if process.error.get('lost'):
+            return None
+        raise OSError(process.error['errno'], f"{process.error['error']}: {args[0]!r}")
+
+    def spawn(self, args, input=None):
+        """Komutu başlatır ve Popen benzeri bir nesne döndürür; çıktılar metin olarak okunur."""
+        executable = resolve_binary(args[0])
+        if executable is None:
+            raise FileNotFoundError(errno.ENOENT, f"No such file or directory: {args[0]!r}")
+        process = self._via_helper(executable, args, input is not None) if self.running else None
+        if process is None:
+            process = subprocess.Popen(
+                args,
+                executable=executable,
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True  # Süre dolduğunda tüm grubu öldürebilmek için
+            )
+        return process
+
+
+# Yardımcı, GTK ve günlük iş parçacığı yüklenmeden önce, süreç henüz küçükken çatallanır
+SPAWN_HELPER = SpawnHelper()
+if __name__ == '__main__' and '--control' not in sys.argv[1:]:
+    SPAWN_HELPER.start()
+
+
+configure_logging()
+
+try:
+    import gi
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('AppIndicator3', '0.1')
+    gi.require_version('Notify', '0.7')
+    from gi.repository import Gtk, GLib
+except (ImportError, ValueError):
+    # GTK yoksa yalnızca arayüzsüz bileşenler (VpnController, kıyaslama araçları) kullanılabilir
+    gi = Gtk = GLib = None
+
+
+def _gi_module(name):
+    """gi.repository'den bir modülü ilk kullanımda yükler (AppIndicator3, Notify)."""
+    return importlib.import_module(f'gi.repository.{name}')
+
+
+class Language:
+    """Uygulamanın dilini yönetir; çeviri katalogları ilk kullanımda dosyadan yüklenir."""
+
+    # Bir anahtar geçerli dilde yoksa bu dilin metni kullanılır
+    FALLBACK = 'en'
+
+    def __init__(self, locales_dir=None, default=None):
+        self.locales_dir = Path(locales_dir or LOCALES_DIR)
+        # Yalnızca dosya adları okunur; kataloglar seçilene kadar yüklenmez
+        self.available = sorted(path.stem for path in self.locales_dir.glob('*.json')) or ['en']
+        default = default or DEFAULT_LANGUAGE
+        self.current_lang = default if default in self.available else self.available[0]
+        self._catalogs = {}
+        self._bindings = []
+
+    def _catalog(self, lang):
+        catalog = self._catalogs.get(lang)
+        if catalog is None:
+            try:
+                with open(self.locales_dir / f'{lang}.json', encoding='utf-8') as f:
+                    catalog = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Translation catalog error ({lang}): {str(e)}")
+                catalog = {}
+            self._catalogs[lang] = catalog
+        return catalog
+
+    def get_text(self, key):
+        """Belirtilen anahtar için çeviri metnini döndürür."""
+        text = self._catalog(self.current_lang).get(key)
+        if text is None and self.current_lang != self.FALLBACK:
+            text = self._catalog(self.FALLBACK).get(key)
+        return key if text is None else text
+
+    def bind(self, key, setter, template='{}'):
+        """Bir metin ayarlayıcısını çeviri anahtarına bağlar ve geçerli metinle hemen çağırır."""
+        self._bindings.append((key, setter, template))
+        setter(template.format(self.get_text(key)))
+
+    def relabel(self):
+        """Bağlı tüm metinleri geçerli dile göre yeniden ayarlar."""
+        for key, setter, template in self._bindings:
+            setter(template.format(self.get_text(key)))
+
+    def switch_language(self):
+        """Uygulama dilini sıradaki dile geçirir."""
+        index = self.available.index(self.current_lang)
+        self.current_lang = self.available[(index + 1) % len(self.available)]
+
+
+class MetricsRegistry:
+    """Sayaç, histogram ve anlık değerleri tutan ve Prometheus metin biçiminde yazan kayıt."""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._values = {}
+        self._gauges = {}
+
+    def describe(self, name, kind, help_text, buckets=None):
+        """Bir ölçümü türü ('counter' / 'histogram') ve açıklamasıyla tanımlar."""
+        with self._lock:
+            self._meta[name] = (kind, help_text, tuple(buckets or self.DEFAULT_BUCKETS))
+            self._values.setdefault(name, {})
+
+    def gauge(self, name, help_text, callback):
+        """Dışa aktarım sırasında callback() ile okunan bir anlık değer ekler ({etiketler: değer} ya da sayı)."""
+        with self._lock:
+            self._meta[name] = ('gauge', help_text, ())
+            self._gauges[name] = callback
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        buckets = self._meta[name][2]
+        with self._lock:
+            series = self._values[name].get(key)
+            if series is None:
+                # Kova sayıları, ardından toplam ve adet
+                series = self._values[name][key] = [0] * (len(buckets) + 2)
+            series[bisect.bisect_left(buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def value(self, name, **labels):
+        """Bir sayacın ya da histogram adedinin geçerli değerini döndürür."""
+        with self._lock:
+            series = self._values.get(name, {}).get(tuple(sorted(labels.items())), 0)
+        return series[-1] if isinstance(series, list) else series
+
+    @staticmethod
+    def _labels(pairs):
+        if not pairs:
+            return ''
+        parts = []
+        for key, value in pairs:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{key}="{value}"')
+        return '{' + ','.join(parts) + '}'
+
+    def render(self):
+        """Tüm ölçümleri Prometheus metin biçiminde döndürür."""
+        with self._lock:
+            meta = dict(self._meta)
+            values = {name: {k: (list(v) if isinstance(v, list) else v) for k, v in series.items()}
+                      for name, series in self._values.items()}
+            gauges = dict(self._gauges)
+        lines = []
+        for name in sorted(meta):
+            kind, help_text, buckets = meta[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'gauge':
+                try:
+                    current = gauges[name]()
+                except Exception as e:
+                    logging.error(f"Metrics gauge error ({name}): {str(e)}")
+                    continue
+                if not isinstance(current, dict):
+                    current = {(): current}
+                for key, number in sorted(current.items()):
+                    lines.append(f"{name}{self._labels(key)} {number}")
+                continue
+            for key, series in sorted(values.get(name, {}).items()):
+                if kind == 'counter':
+                    lines.append(f"{name}{self._labels(key)} {series}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float('inf'),), series[:-2]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{self._labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(key)} {series[-2]:.6f}")
+                lines.append(f"{name}_count{self._labels(key)} {series[-1]}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+METRICS.describe('hotspot_cli_duration_seconds', 'histogram',
+                 "Duration of hotspotshield invocations by subcommand and exit code")
+METRICS.describe('hotspot_cli_spawns_total', 'counter',
+                 "hotspotshield processes started, by the user action that caused them")
+METRICS.describe('hotspot_action_duration_seconds', 'histogram',
+                 "Duration of controller actions")
+METRICS.describe('hotspot_actions_total', 'counter', "Controller actions by outcome")
+METRICS.describe('hotspot_switch_phase_seconds', 'histogram',
+                 "Duration of location switch phases (teardown, establish, verify)",
+                 buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+METRICS.describe('hotspot_switch_duration_seconds', 'histogram',
+                 "End-to-end location switch duration by mode and outcome",
+                 buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+METRICS.describe('hotspot_mainloop_lag_seconds', 'histogram',
+                 "Delay of the GTK main loop probe timer beyond its interval",
+                 buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+METRICS.describe('hotspot_mainloop_stalls_total', 'counter',
+                 "GTK main loop stalls longer than the stall threshold")
+
+# Geçerli iş parçacığında çalışan kullanıcı eylemi; CLI çağrıları bu eyleme yazılır
+_action_context = threading.local()
+
+
+def current_action():
+    """Geçerli iş parçacığındaki eylemin adını döndürür; eylem dışındaysa 'background'."""
+    return getattr(_action_context, 'name', None) or 'background'
+
+
+def metered_action(name):
+    """Metodu bir eylem olarak ölçer: süre, sonuç ve eylem sırasında başlatılan CLI süreçleri.
+
+    İç içe çağrılarda dıştaki eylem geçerli kalır (connect -> switch gibi).
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_action_context, 'name', None) is not None:
+                return func(*args, **kwargs)
+            _action_context.name = name
+            started = time.monotonic()
+            outcome = 'error'
+            try:
+                result = func(*args, **kwargs)
+                outcome = result if isinstance(result, str) else str(bool(result)).lower()
+                return result
+            finally:
+                _action_context.name = None
+                METRICS.observe('hotspot_action_duration_seconds',
+                                time.monotonic() - started, action=name)
+                METRICS.inc('hotspot_actions_total', action=name, outcome=outcome)
+        return wrapper
+    return decorate
+
+
+class StatusCache:
+    """VPN durum sorgusunu kısa bir süre önbellekte tutar ve eşzamanlı çağrıları tek sorguda birleştirir."""
+
+    def __init__(self, probe, ttl=STATUS_CACHE_TTL):
+        self._probe = probe
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._timestamp = 0.0
+        self._generation = 0
+        self._inflight = None
+
+    def get(self, force=False):
+        """Önbellekteki durumu döndürür; süresi dolmuşsa tek bir sorgu başlatır."""
+        with self._lock:
+            if (not force and self._timestamp and
+                    time.monotonic() - self._timestamp < self.ttl):
+                return self._value
+            inflight = self._inflight
+            owner = inflight is None
+            if owner:
+                inflight = self._inflight = {'event': threading.Event(), 'value': None}
+                generation = self._generation
+
+        if not owner:
+            # Devam eden sorgunun sonucunu bekle
+            inflight['event'].wait()
+            return inflight['value']
+
+        value = None
+        succeeded = False
+        try:
+            value = self._probe()
+            succeeded = True
+        finally:
+            with self._lock:
+                if self._inflight is inflight:
+                    self._inflight = None
+                # Sorgu sırasında önbellek geçersiz kılındıysa sonucu saklama
+                if succeeded and generation == self._generation:
+                    self._value = value
+                    self._timestamp = time.monotonic()
+            inflight['value'] = value
+            inflight['event'].set()
+        return value
+
+    def invalidate(self):
+        """Önbelleği geçersiz kılar; bir sonraki okuma yeni bir sorgu başlatır."""
+        with self._lock:
+            self._generation += 1
+            self._timestamp = 0.0
+            self._inflight = None
+
+
+class CommandResult:
+    """Çalıştırılan bir komutun sonucunu ve süresini tutar."""
+    __slots__ = ('args', 'returncode', 'stdout', 'stderr', 'duration', 'error')
+
+    def __init__(self, args):
+        self.args = args
+        self.returncode = None
+        self.stdout = ''
+        self.stderr = ''
+        self.duration = 0.0
+        self.error = None
+
+    @property
+    def ok(self):
+        """Komut hatasız ve sıfır çıkış koduyla bittiyse True döndürür."""
+        return self.error is None and self.returncode == 0
+
+    def contains(self, text):
+        """Metnin stdout veya stderr içinde geçip geçmediğini (büyük/küçük harf duyarsız) kontrol eder."""
+        text = text.lower()
+        return text in self.stdout.lower() or text in self.stderr.lower()
+
+
+# Komut öncelikleri: küçük sayı önce çalışır
+PRIORITY_HIGH = 0    # disconnect, çıkış
+PRIORITY_NORMAL = 1  # connect, hesap işlemleri, konum listesi
+PRIORITY_LOW = 2     # durum sorguları
+
+# Alt komut başına varsayılan süre sınırları (saniye)
+COMMAND_TIMEOUTS = {
+    'status': 10,
+    'connect': 60,
+    'disconnect': 30,
+    'locations': 30,
+    'account signin': 30,
+    'account signout': 30,
+    'account status': 15,
+}
+DEFAULT_COMMAND_TIMEOUT = 30
+
+
+class CancelToken:
+    """Bekleyen ya da çalışan bir işlemin iptal edilmesini sağlar."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """İptal işaretini koyar ve kayıtlı callback'leri çağırır."""
+        with self._lock:
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """İptalde çağrılacak bir callback ekler; zaten iptal edildiyse hemen çağırır."""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+class _CommandTicket:
+    """Aracıdaki tek bir komut isteği."""
+    __slots__ = ('args', 'key', 'name', 'priority', 'seq', 'mutating',
+                 'queued_at', 'done', 'result')
+
+    def __init__(self, args, key, name, priority, seq, mutating):
+        self.args = args
+        self.key = key
+        self.name = name
+        self.priority = priority
+        self.seq = seq
+        self.mutating = mutating
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+
+
+class CommandBroker:
+    """Tüm CLI çağrılarının sahibi: okumaları birleştirir, değiştiren komutları sıraya koyar.
+
+    Aynı anda çalışan özdeş okuma komutları tek bir süreci paylaşır; connect,
+    disconnect ve hesap işlemleri tek tek ve öncelik sırasıyla çalışır. Bekleyen
+    bir disconnect varken yeni durum sorguları bekletilir. Her komutun bir süre
+    sınırı vardır ve süre dolduğunda süreç grubu öldürülür.
+    """
+
+    READ_COMMANDS = frozenset({'status', 'locations', 'account status'})
+    MUTATING_COMMANDS = frozenset({'connect', 'disconnect', 'account signin', 'account signout'})
+
+    def __init__(self, read_slots=2, spawner=None):
+        self.read_slots = read_slots
+        self.spawner = spawner or SPAWN_HELPER
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._inflight = {}
+        self._running_reads = 0
+        self._mutation_running = False
+        self._seq = itertools.count()
+        self._stats = {}
+        # Bekleyen ve çalışan komutların iptal işaretleri (cancel_pending için)
+        self._active = set()
+
+    @staticmethod
+    def command_name(args):
+        """Komutun alt komut adını döndürür ('status', 'account signin' gibi)."""
+        if not args:
+            return ''
+        if os.path.basename(args[0]) != 'hotspotshield':
+            return os.path.basename(args[0])
+        if args[1:2] == ['account']:
+            return ' '.join(args[1:3])
+        return args[1] if len(args) > 1 else ''
+
+    @staticmethod
+    def default_priority(name):
+        if name == 'disconnect':
+            return PRIORITY_HIGH
+        if name in ('status', 'account status'):
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    def _stat(self, name):
+        return self._stats.setdefault(name, {
+            'count': 0, 'coalesced': 0, 'cancelled': 0, 'timeouts': 0,
+            'wait_total': 0.0, 'wait_max': 0.0, 'run_total': 0.0,
+        })
+
+    def snapshot(self):
+        """Kuyruk derinliğini ve komut başına bekleme/çalışma istatistiklerini döndürür."""
+        with self._cond:
+            return {
+                'queue_depth': len(self._waiting),
+                'running': self._running_reads + int(self._mutation_running),
+                'commands': {name: dict(stat) for name, stat in self._stats.items()},
+            }
+
+    def _can_start(self, ticket):
+        if ticket.mutating:
+            if self._mutation_running:
+                return False
+            best = min((t for t in self._waiting if t.mutating), key=lambda t: (t.priority, t.seq))
+            return best is ticket
+        if self._running_reads >= self.read_slots:
+            return False
+        # Bekleyen yüksek öncelikli bir komut varsa düşük öncelikli okumalar beklesin
+        if ticket.priority > PRIORITY_HIGH and any(
+                t.mutating and t.priority == PRIORITY_HIGH for t in self._waiting):
+            return False
+        best = min((t for t in self._waiting if not t.mutating), key=lambda t: (t.priority, t.seq))
+        return best is ticket
+
+    def _admit(self, ticket, cancel):
+        """Komutun çalışma sırası gelene kadar bekler; iptal edilirse False döndürür."""
+        wake = self._wake
+        if cancel is not None:
+            cancel.add_callback(wake)
+        try:
+            with self._cond:
+                while True:
+                    if cancel is not None and cancel.cancelled:
+                        self._waiting.remove(ticket)
+                        self._cond.notify_all()
+                        return False
+                    if self._can_start(ticket):
+                        self._waiting.remove(ticket)
+                        if ticket.mutating:
+                            self._mutation_running = True
+                        else:
+                            self._running_reads += 1
+                        return True
+                    self._cond.wait()
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(wake)
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def cancel_pending(self):
+        """Sıradaki ve çalışan tüm komutları iptal eder (süreçler öldürülür); iptal sayısını döndürür."""
+        with self._cond:
+            tokens = list(self._active)
+        for token in tokens:
+            token.cancel()
+        return len(tokens)
+
+    @staticmethod
+    def _kill(process):
+        """Sürecin tüm grubunu öldürür."""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _execute(self, args, input, timeout, cancel, result):
+        try:
+            process = self.spawner.spawn(args, input)
+        except (OSError, ValueError) as e:
+            result.error = str(e)
+            logging.error(f"Command failed to start: {' '.join(args)}: {str(e)}")
+            return
+        kill = partial(self._kill, process)
+        if cancel is not None:
+            cancel.add_callback(kill)
+        try:
+            result.stdout, result.stderr = process.communicate(input, timeout=timeout)
+            result.returncode = process.returncode
+            if cancel is not None and cancel.cancelled:
+                result.error = 'cancelled'
+        except subprocess.TimeoutExpired:
+            self._kill(process)
+            process.communicate()
+            result.error = 'timeout'
+            logging.error(f"Command timed out after {timeout}s: {' '.join(args)}")
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(kill)
+
+    def run(self, args, input=None, timeout=None, priority=None, cancel=None):
+        """Komutu aracı üzerinden çalıştırır ve CommandResult döndürür."""
+        name = self.command_name(args)
+        is_cli = bool(args) and os.path.basename(args[0]) == 'hotspotshield'
+        mutating = is_cli and name not in self.READ_COMMANDS
+        if timeout is None:
+            timeout = COMMAND_TIMEOUTS.get(name, DEFAULT_COMMAND_TIMEOUT)
+        if priority is None:
+            priority = self.default_priority(name)
+        key = (tuple(args), input) if is_cli and not mutating else None
+
+        with self._cond:
+            stat = self._stat(name)
+            leader = self._inflight.get(key) if key is not None else None
+            if leader is not None:
+                stat['coalesced'] += 1
+            else:
+                ticket = _CommandTicket(args, key, name, priority, next(self._seq), mutating)
+                self._waiting.append(ticket)
+                if key is not None:
+                    self._inflight[key] = ticket
+
+        if leader is not None:
+            # Aynı okuma zaten çalışıyor; onun sonucunu paylaş
+            leader.done.wait()
+            return leader.result
+
+        # Çağıranın iptali ve cancel_pending aynı işarete bağlanır
+        token = CancelToken()
+        if cancel is not None:
+            cancel.add_callback(token.cancel)
+        with self._cond:
+            self._active.add(token)
+        result = CommandResult(args)
+        admitted = False
+        waited = 0.0
+        try:
+            admitted = self._admit(ticket, token)
+            waited = time.monotonic() - ticket.queued_at
+            if admitted:
+                started = time.monotonic()
+                self._execute(args, input, timeout, token, result)
+                result.duration = time.monotonic() - started
+            else:
+                result.error = 'cancelled'
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(token.cancel)
+            with self._cond:
+                self._active.discard(token)
+                if admitted:
+                    if mutating:
+                        self._mutation_running = False
+                    else:
+                        self._running_reads -= 1
+                if key is not None and self._inflight.get(key) is ticket:
+                    del self._inflight[key]
+                stat['count'] += 1
+                stat['wait_total'] += waited
+                stat['wait_max'] = max(stat['wait_max'], waited)
+                stat['run_total'] += result.duration
+                stat['cancelled'] += int(result.error == 'cancelled')
+                stat['timeouts'] += int(result.error == 'timeout')
+                depth = len(self._waiting)
+                self._cond.notify_all()
+            ticket.result = result
+            ticket.done.set()
+        if admitted and is_cli:
+            exit_code = (result.error if result.error in ('timeout', 'cancelled')
+                         else result.returncode if result.returncode is not None else 'spawn_error')
+            METRICS.observe('hotspot_cli_duration_seconds', result.duration,
+                            command=name, exit_code=exit_code)
+            METRICS.inc('hotspot_cli_spawns_total', action=current_action())
+        logging.info(f"Command '{' '.join(args)}' finished in {result.duration:.3f}s after waiting "
+                     f"{waited:.3f}s (exit code: {result.returncode}, error: {result.error}, "
+                     f"queue depth: {depth})")
+        return result
+
+
+class CommandExecutor:
+    """Komutları GTK ana döngüsü dışında çalıştırır ve sonuçları ana döngüye geri iletir."""
+
+    def __init__(self, max_workers=4, dispatch=None, broker=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hotspot-cmd')
+        self._dispatch = dispatch or self._idle_dispatch
+        self.broker = broker or CommandBroker()
+
+    @staticmethod
+    def _idle_dispatch(callback, *args):
+        """Callback'i GLib.idle_add ile ana döngüde çalıştırır; GLib yoksa hemen çalıştırır."""
+        def _run():
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"Main loop callback error: {str(e)}")
+            return False
+        if GLib is None:
+            _run()
+        else:
+            GLib.idle_add(_run)
+
+    def run(self, args, input=None, timeout=None, priority=None, cancel=None):
+        """Komutu aracı üzerinden çağıran iş parçacığında çalıştırır; ana döngüden çağrılmamalıdır."""
+        return self.broker.run(args, input=input, timeout=timeout, priority=priority, cancel=cancel)
+
+    def call(self, func, *args, callback=None):
+        """Fonksiyonu arka planda çalıştırır, dönüş değerini ana döngüde callback'e iletir."""
+        def _task():
+            try:
+                value = func(*args)
+            except Exception as e:
+                logging.error(f"Background task error: {str(e)}")
+                value = None
+            if callback is not None:
+                self._dispatch(callback, value)
+            return value
+        return self._pool.submit(_task)
+
+    def submit(self, args, callback=None, input=None, timeout=None):
+        """Komutu arka planda çalıştırır, CommandResult'ı ana döngüde callback'e iletir."""
+        return self.call(self.run, args, input, timeout, callback=callback)
+
+    def dispatch(self, callback, *args):
+        """Callback'i ana döngüde çalıştırılmak üzere sıraya koyar."""
+        self._dispatch(callback, *args)
+
+    def shutdown(self):
+        """Bekleyen işleri iptal eder ve iş parçacıklarını serbest bırakır."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _split_list(value):
+    """Virgülle ayrılmış bir ayarı boş olmayan öğelerden oluşan bir listeye çevirir."""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_host_port(value):
+    """'host:port' biçimindeki bir hedefi (host, port) ikilisine çevirir."""
+    host, _, port = value.rpartition(':')
+    return host.strip('[]'), int(port)
+
+
+class ReachabilityProbe:
+    """Birden fazla erişilebilirlik testini paralel yarıştırır ve ilk başarılı sonucu önbelleğe alır."""
+
+    # İptal isteğinin fark edilmesi için en uzun bekleme
+    CANCEL_POLL = 0.1
+
+    def __init__(self, tcp_targets=None, dns_names=None, icmp_hosts=None,
+                 timeout=REACHABILITY_TIMEOUT, ttl=REACHABILITY_TTL, route_file='/proc/net/route'):
+        if tcp_targets is None:
+            tcp_targets = [_parse_host_port(t) for t in _split_list(REACHABILITY_TCP_TARGETS)]
+        self.tcp_targets = list(tcp_targets)
+        self.dns_names = list(_split_list(REACHABILITY_DNS_NAMES) if dns_names is None else dns_names)
+        self.icmp_hosts = list(_split_list(REACHABILITY_ICMP_HOSTS) if icmp_hosts is None else icmp_hosts)
+        self.timeout = timeout
+        self.route_file = route_file
+        self._cache = StatusCache(self._race, ttl=ttl)
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Sürmekte olan yarışı bırakır ve yenilerini başlatmaz; kapanışta çağrılır."""
+        self._cancel.set()
+
+    def _network_fingerprint(self):
+        """Yönlendirme tablosunun bir özetini döndürür; ağ değiştiğinde özet de değişir."""
+        try:
+            with open(self.route_file) as f:
+                return hash(f.read())
+        except OSError:
+            return None
+
+    def _tcp(self, host, port):
+        with socket.create_connection((host, port), timeout=self.timeout):
+            return True
+
+    def _dns(self, name):
+        # getaddrinfo kesilemez; sıradaki test iptalden sonra hiç başlamaz
+        if self._cancel.is_set():
+            return False
+        return bool(socket.getaddrinfo(name, None))
+
+    def _icmp(self, host):
+        process = SPAWN_HELPER.spawn(['ping', '-c', '1', '-W', str(max(1, int(self.timeout))), host])
+        try:
+            process.communicate(timeout=self.timeout + 1)
+        except subprocess.TimeoutExpired:
+            CommandBroker._kill(process)
+            process.communicate()
+            raise
+        return process.returncode == 0
+
+    def _race(self):
+        """Tüm testleri paralel başlatır, ilk başarılı testte True döndürür."""
+        probes = ([(self._tcp, target) for target in self.tcp_targets] +
+                  [(self._dns, (name,)) for name in self.dns_names] +
+                  [(self._icmp, (host,)) for host in self.icmp_hosts])
+        if not probes:
+            return True
+        if self._cancel.is_set():
+            return False
+        started = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix='hotspot-reach')
+        try:
+            pending = {pool.submit(func, *args): (func.__name__, args) for func, args in probes}
+            deadline = started + self.timeout
+            while pending and not self._cancel.is_set():
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                done, _ = wait(pending, timeout=min(left, self.CANCEL_POLL),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, args = pending.pop(future)
+                    try:
+                        if future.result():
+                            logging.info(f"Reachability {name}{args} succeeded in "
+                                         f"{time.monotonic() - started:.3f}s")
+                            return True
+                    except Exception as e:
+                        logging.debug(f"Reachability {name}{args} failed: {str(e)}")
+            if self._cancel.is_set():
+                logging.info("Reachability check cancelled")
+            else:
+                logging.warning(f"No reachability probe succeeded within {self.timeout}s")
+            return False
+        finally:
+            # Geride kalan testleri bekleme; kendi zaman aşımlarıyla biterler
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def check(self):
+        """İnternete erişilebiliyorsa True döndürür; başarılı sonuç ağ değişene kadar önbellekte kalır."""
+        fingerprint = self._network_fingerprint()
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._fingerprint = fingerprint
+                self._cache.invalidate()
+        reachable = self._cache.get()
+        if not reachable:
+            # Olumsuz sonucu saklama; kullanıcı ağı düzelttiğinde hemen yeniden denensin
+            self._cache.invalidate()
+        return reachable
+
+    def invalidate(self):
+        """Önbellekteki sonucu düşürür."""
+        self._cache.invalidate()
+
+
+class LocationRecord:
+    """Tek bir VPN konumunun ayrıştırılmış kaydı."""
+    __slots__ = ('code', 'name', 'region')
+
+    def __init__(self, code, name, region=''):
+        self.code = code
+        self.name = name
+        self.region = region
+
+    def __eq__(self, other):
+        return (isinstance(other, LocationRecord) and
+                (self.code, self.name, self.region) == (other.code, other.name, other.region))
+
+    def __repr__(self):
+        return f"LocationRecord({self.code!r}, {self.name!r}, {self.region!r})"
+
+    @property
+    def label(self):
+        """Listede gösterilecek metni döndürür."""
+        parts = [self.code, self.name, self.region]
+        return '  '.join(part for part in parts if part)
+
+
+class LocationCatalog:
+    """'hotspotshield locations' çıktısını ayrıştırır ve kullanıcının önbellek dizininde saklar."""
+
+    def __init__(self, path=None, ttl=LOCATIONS_CACHE_TTL):
+        self.path = Path(path) if path else CACHE_DIR / 'locations.json'
+        self.ttl = ttl
+        self.fetched_at = 0.0
+        self._records = {}
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, code):
+        """Koda göre kaydı döndürür."""
+        return self._records.get(code)
+
+    @staticmethod
+    def parse(output):
+        """CLI çıktısını LocationRecord listesine çevirir; başlık ve ayraç satırlarını atlar."""
+        records = []
+        lines = output.strip().split('\n')
+        # İlk iki satır başlık ve ayraçtır
+        for line in lines[2:]:
+            columns = re.split(r'\s{2,}|\t+', line.strip())
+            if not columns or not columns[0]:
+                continue
+            code = columns[0].split()[0]
+            if len(columns) == 1:
+                # Sütunlar tek boşlukla ayrılmışsa kodu metnin geri kalanından ayır
+                rest = columns[0][len(code):].strip()
+                columns = [code, rest] if rest else [code]
+            name = columns[1] if len(columns) > 1 else code
+            region = ' '.join(columns[2:])
+            records.append(LocationRecord(code, name, region))
+        return records
+
+    def is_stale(self):
+        """Katalog boşsa ya da süresi dolmuşsa True döndürür."""
+        return not self._records or time.time() - self.fetched_at > self.ttl
+
+    def load(self):
+        """Kataloğu diskten yükler; başarılıysa True döndürür."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            records = [LocationRecord(*item) for item in data['locations']]
+            self.fetched_at = float(data['fetched_at'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.info(f"Location cache not loaded: {str(e)}")
+            return False
+        self._records = {record.code: record for record in records}
+        return True
+
+    def save(self):
+        """Kataloğu diske atomik olarak yazar."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'fetched_at': self.fetched_at,
+                    'locations': [[r.code, r.name, r.region] for r in self]
+                }, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Location cache save error: {str(e)}")
+
+    def update(self, records):
+        """Yeni kayıtları uygular, diske yazar ve (eklenen, silinen, değişen) farkını döndürür."""
+        new = {record.code: record for record in records}
+        added = [r for code, r in new.items() if code not in self._records]
+        removed = [r for code, r in self._records.items() if code not in new]
+        changed = [r for code, r in new.items()
+                   if code in self._records and self._records[code] != r]
+        self._records = new
+        self.fetched_at = time.time()
+        self.save()
+        return added, removed, changed
+
+
+class LocationIndex:
+    """Konum kodu, adı ve bölgesi üzerinde önceden hesaplanmış n-gram dizini."""
+
+    GRAM = 3
+
+    def __init__(self, records):
+        self.records = list(records)
+        self._keys = []
+        self._grams = {}
+        for position, record in enumerate(self.records):
+            # Alanlar sekmeyle birleştirilir; sorgu alanlar arasında eşleşmez
+            key = '\t'.join((record.code, record.name, record.region)).lower()
+            self._keys.append(key)
+            seen = set()
+            for field in key.split('\t'):
+                for size in range(1, self.GRAM + 1):
+                    for start in range(len(field) - size + 1):
+                        gram = field[start:start + size]
+                        if gram not in seen:
+                            seen.add(gram)
+                            self._grams.setdefault(gram, []).append(position)
+
+    def search(self, query):
+        """Sorguyu içeren kayıtları liste sırasıyla döndürür."""
+        query = query.strip().lower()
+        if not query:
+            return self.records
+        if len(query) <= self.GRAM:
+            return [self.records[p] for p in self._grams.get(query, ())]
+        # En kısa trigram listesini aday olarak al ve yalnızca adayları doğrula
+        candidates = min(
+            (self._grams.get(query[i:i + self.GRAM], ())
+             for i in range(len(query) - self.GRAM + 1)),
+            key=len
+        )
+        return [self.records[p] for p in candidates if query in self._keys[p]]
+
+
+def template_endpoint_resolver(record, template=None):
+    """Konum kaydından şablona göre (host, port) uç noktasını üretir."""
+    endpoint = (template or LOCATION_ENDPOINT_TEMPLATE).format(
+        code=record.code, code_lower=record.code.lower()
+    )
+    return _parse_host_port(endpoint)
+
+
+class LatencyProber:
+    """Konum uç noktalarına TCP bağlantı süresini sınırlı bir iş havuzuyla paralel ölçer."""
+
+    # İptal isteğinin fark edilmesi için en uzun bekleme
+    CANCEL_POLL = 0.1
+
+    def __init__(self, resolver=template_endpoint_resolver, probe=None,
+                 max_workers=LATENCY_WORKERS, timeout=LATENCY_PROBE_TIMEOUT, ttl=LATENCY_CACHE_TTL):
+        self.resolver = resolver
+        # Varsayılan çözümleyici yalnızca kullanıcı geçerli bir uç nokta şablonu verdiyse kullanılır
+        self.enabled = resolver is not template_endpoint_resolver or self._valid_template()
+        self.probe = probe or self.tcp_rtt
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.ttl = ttl
+        self._results = {}
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Sıradaki ölçümleri bırakır ve rank'in beklemeden dönmesini sağlar; kapanışta çağrılır."""
+        self._cancel.set()
+
+    @staticmethod
+    def _valid_template():
+        """HOTSPOT_LOCATION_ENDPOINT şablonunu örnek bir kayıtla dener; hatalıysa ölçümü kapatır."""
+        if not LOCATION_ENDPOINT_TEMPLATE:
+            return False
+        try:
+            template_endpoint_resolver(LocationRecord('US', 'United States'))
+        except (KeyError, IndexError, ValueError) as e:
+            logging.warning(f"Invalid HOTSPOT_LOCATION_ENDPOINT {LOCATION_ENDPOINT_TEMPLATE!r} "
+                            f"({type(e).__name__}: {str(e)}), latency probing disabled")
+            return False
+        return True
+
+    def tcp_rtt(self, host, port):
+        """TCP bağlantı kurulum süresini saniye olarak döndürür."""
+        started = time.perf_counter()
+        with socket.create_connection((host, port), timeout=self.timeout):
+            return time.perf_counter() - started
+
+    def _measure(self, record):
+        if self._cancel.is_set():
+            return None
+        try:
+            host, port = self.resolver(record)
+            return self.probe(host, port)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Latency probe for {record.code} failed: {str(e)}")
+            return None
+
+    def cached(self, code):
+        """Süresi dolmamış ölçümü döndürür; ölçüm yoksa ya da başarısızsa None döndürür."""
+        with self._lock:
+            entry = self._results.get(code)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def is_fresh(self, records):
+        """Tüm kayıtlar için süresi dolmamış bir ölçüm varsa True döndürür."""
+        now = time.monotonic()
+        with self._lock:
+            return all(r.code in self._results and now - self._results[r.code][1] <= self.ttl
+                       for r in records)
+
+    def rank(self, records):
+        """Kayıtları ölçer ve (kayıt, rtt) listesini en hızlıdan yavaşa sıralı döndürür."""
+        records = list(records)
+        started = time.monotonic()
+        if records and self.enabled and not self._cancel.is_set():
+            pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(records)),
+                                      thread_name_prefix='hotspot-latency')
+            try:
+                futures = [pool.submit(self._measure, record) for record in records]
+                pending = set(futures)
+                while pending and not self._cancel.is_set():
+                    _, pending = wait(pending, timeout=self.CANCEL_POLL)
+            finally:
+                # İptalde sıradaki ölçümler atılır; sürenler kendi zaman aşımlarıyla biter
+                pool.shutdown(wait=False, cancel_futures=True)
+            if self._cancel.is_set():
+                logging.info(f"Latency ranking cancelled after {time.monotonic() - started:.2f}s")
+                return self.ranking(records)
+            now = time.monotonic()
+            with self._lock:
+                for record, future in zip(records, futures):
+                    self._results[record.code] = (future.result(), now)
+        logging.info(f"Ranked {len(records)} locations in {time.monotonic() - started:.2f}s")
+        return self.ranking(records)
+
+    def ranking(self, records):
+        """Önbellekteki ölçümlere göre sıralı (kayıt, rtt) listesini döndürür; ölçümsüzler sonda."""
+        ranked = [(record, self.cached(record.code)) for record in records]
+        ranked.sort(key=lambda item: (item[1] is None, item[1] or 0.0))
+        return ranked
+
+    def fastest(self, records):
+        """En düşük gecikmeli kaydı döndürür; önbellek eskiyse yeniden ölçer."""
+        records = list(records)
+        ranked = self.ranking(records) if self.is_fresh(records) else self.rank(records)
+        if ranked and ranked[0][1] is not None:
+            return ranked[0][0]
+        return None
+
+
+class TunnelReadinessDetector:
+    """Tünel durumunu netlink olaylarıyla izler; netlink yoksa artan aralıklarla durum sorgular."""
+
+    # rtnetlink çoklu yayın grupları: bağlantı ve adres değişiklikleri
+    RTMGRP_LINK = 0x1
+    RTMGRP_IPV4_IFADDR = 0x10
+    RTMGRP_IPV6_IFADDR = 0x100
+    IFF_UP = 0x1
+
+    INITIAL_BACKOFF = 0.2
+    MAX_BACKOFF = 2.0
+
+    def __init__(self, probe, prefixes=VPN_INTERFACE_PREFIXES, sys_net='/sys/class/net'):
+        self._probe = probe
+        self.prefixes = prefixes
+        self.sys_net = sys_net
+        self.last_elapsed = None
+
+    def interface_up(self):
+        """Önekle eşleşen ve UP bayrağı taşıyan bir arayüz varsa True döndürür."""
+        try:
+            names = os.listdir(self.sys_net)
+        except OSError:
+            return False
+        for name in names:
+            if not name.startswith(self.prefixes):
+                continue
+            try:
+                with open(os.path.join(self.sys_net, name, 'flags')) as f:
+                    flags = int(f.read().strip(), 16)
+            except (OSError, ValueError):
+                continue
+            if flags & self.IFF_UP:
+                return True
+        return False
+
+    def _open_netlink(self):
+        """Bağlantı/adres olaylarını dinleyen bir netlink soketi açar; desteklenmiyorsa None döndürür."""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        except (AttributeError, OSError):
+            return None
+        try:
+            sock.bind((0, self.RTMGRP_LINK | self.RTMGRP_IPV4_IFADDR | self.RTMGRP_IPV6_IFADDR))
+            sock.setblocking(False)
+            return sock
+        except OSError:
+            sock.close()
+            return None
+
+    @staticmethod
+    def _drain(sock):
+        """Soketteki bekleyen tüm netlink mesajlarını okuyup atar."""
+        try:
+            while sock.recv(65536):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def wait_for(self, connected=True, timeout=TUNNEL_WAIT_TIMEOUT, cancel=None, probe=None):
+        """Tünel istenen duruma gelene, süre dolana ya da iptal edilene kadar bekler; sonucu döndürür.
+
+        probe verilirse durum sorgusu yerine o çağrılır (örneğin konumu da doğrulamak için).
+        """
+        probe = probe or self._probe
+        started = time.monotonic()
+        deadline = started + timeout
+        sock = self._open_netlink()
+        delay = self.INITIAL_BACKOFF
+        next_probe = started
+        was_up = None
+        reached = False
+        try:
+            while cancel is None or not cancel.cancelled:
+                now = time.monotonic()
+                up = self.interface_up()
+                # Arayüz değişikliği ya da geri çekilme süresinin dolması bir durum sorgusunu tetikler
+                if (up != was_up and up == connected) or now >= next_probe:
+                    if bool(probe()) == connected:
+                        reached = True
+                        break
+                    next_probe = time.monotonic() + delay
+                    delay = min(delay * 2, self.MAX_BACKOFF)
+                was_up = up
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait = max(0.0, min(next_probe - time.monotonic(), remaining))
+                if sock is not None:
+                    readable, _, _ = select.select([sock], [], [], wait)
+                    if readable:
+                        self._drain(sock)
+                else:
+                    time.sleep(wait)
+        finally:
+            if sock is not None:
+                sock.close()
+        self.last_elapsed = time.monotonic() - started
+        logging.info(f"Tunnel {'up' if connected else 'down'} wait "
+                     f"{'succeeded' if reached else 'timed out'} after {self.last_elapsed:.2f}s "
+                     f"({'netlink' if sock is not None else 'polling'})")
+        return reached
+
+
+class ConnectionState:
+    """Bağlantı durumlarının adları."""
+    UNKNOWN = 'unknown'
+    DISCONNECTED = 'disconnected'
+    CONNECTING = 'connecting'
+    CONNECTED = 'connected'
+    DISCONNECTING = 'disconnecting'
+    SWITCHING = 'switching'
+    ERROR = 'error'
+
+    # Bir işlem sürerken durum sorgularıyla değiştirilmeyen ara durumlar
+    TRANSITIONAL = frozenset({CONNECTING, DISCONNECTING, SWITCHING})
+
+
+class ConnectionHistory:
+    """Bağlantı denemelerinin SQLite geçmişi: konum, aşama süreleri, sonuç ve oturum uzunluğu.
+
+    Sorgular indekslerden yanıtlanır; son bilinen durum başlangıçta anında
+    gösterilmek üzere ayrı bir satırda tutulur. Hatalar günlüğe yazılır,
+    bağlantı işlemlerini asla durdurmaz.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS attempts (
+            id INTEGER PRIMARY KEY,
+            started_at REAL NOT NULL,
+            kind TEXT NOT NULL,
+            location TEXT,
+            outcome TEXT NOT NULL,
+            error TEXT,
+            total REAL,
+            teardown REAL,
+            establish REAL,
+            verify REAL,
+            session REAL
+        );
+        CREATE INDEX IF NOT EXISTS attempts_started ON attempts (started_at);
+        CREATE INDEX IF NOT EXISTS attempts_location
+            ON attempts (location, outcome, total, started_at);
+        CREATE INDEX IF NOT EXISTS attempts_outcome ON attempts (outcome, total);
+        -- Konum ve gün başına özet; konum seçimi tüm satırları taramadan buradan yapılır
+        CREATE TABLE IF NOT EXISTS daily (
+            location TEXT NOT NULL,
+            day INTEGER NOT NULL,
+            attempts INTEGER NOT NULL,
+            successes INTEGER NOT NULL,
+            success_time REAL NOT NULL,
+            PRIMARY KEY (location, day)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS attempts_daily AFTER INSERT ON attempts
+        WHEN NEW.location IS NOT NULL AND NEW.outcome IN ('connected', 'failed')
+        BEGIN
+            INSERT INTO daily (location, day, attempts, successes, success_time)
+            VALUES (NEW.location, CAST(NEW.started_at / 86400 AS INTEGER), 1,
+                    NEW.outcome = 'connected',
+                    CASE WHEN NEW.outcome = 'connected' THEN IFNULL(NEW.total, 0) ELSE 0 END)
+            ON CONFLICT (location, day) DO UPDATE SET
+                attempts = attempts + 1,
+                successes = successes + excluded.successes,
+                success_time = success_time + excluded.success_time;
+        END;
+        CREATE TABLE IF NOT EXISTS last_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            state TEXT NOT NULL,
+            location TEXT,
+            ip TEXT,
+            updated_at REAL NOT NULL
+        );
+    """
+    def __init__(self, path=None, max_rows=None, window=None):
+        self.path = str(path or HISTORY_DB)
+        self.max_rows = HISTORY_MAX_ROWS if max_rows is None else max_rows
+        self.window = HISTORY_WINDOW if window is None else window
+        self._lock = threading.Lock()
+        self._session = None
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(self.SCHEMA)
+        self.prune()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _write(self, sql, params=()):
+        try:
+            with self._lock:
+                return self._db.execute(sql, params).lastrowid
+        except sqlite3.Error as e:
+            logging.error(f"History write error: {str(e)}")
+            return None
+
+    def _query(self, sql, params=()):
+        try:
+            with self._lock:
+                return self._db.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"History query error: {str(e)}")
+            return []
+
+    def prune(self):
+        """max_rows'tan eski denemeleri ve pencere dışına düşen günlük özetleri siler."""
+        if self.max_rows:
+            self._write('DELETE FROM attempts WHERE id <= '
+                        '(SELECT id FROM attempts ORDER BY id DESC LIMIT 1 OFFSET ?)', (self.max_rows,))
+        self._write('DELETE FROM daily WHERE day < ?', (int((time.time() - self.window) // 86400),))
+
+    def record_attempt(self, kind, location, outcome, phases=None, total=None, error=None,
+                       started_at=None):
+        """Bir bağlantı denemesini yazar; başarılıysa oturum süresi için açık tutar."""
+        phases = phases or {}
+        row = self._write(
+            'INSERT INTO attempts (started_at, kind, location, outcome, error, total, teardown, '
+            'establish, verify) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (time.time() if started_at is None else started_at, kind, location, outcome, error,
+             total, phases.get('teardown'), phases.get('establish'), phases.get('verify'))
+        )
+        if outcome == 'connected' and row is not None:
+            self._session = (row, time.monotonic())
+        return row
+
+    def end_session(self):
+        """Açık oturumun uzunluğunu son başarılı denemeye yazar."""
+        session, self._session = self._session, None
+        if session is not None:
+            self._write('UPDATE attempts SET session = ? WHERE id = ?',
+                        (time.monotonic() - session[1], session[0]))
+
+    def save_state(self, state, location=None, ip=None):
+        self._write('INSERT OR REPLACE INTO last_state (id, state, location, ip, updated_at) '
+                    'VALUES (1, ?, ?, ?, ?)', (state, location, ip, time.time()))
+
+    def last_state(self):
+        """Son kaydedilen durumu sözlük olarak döndürür; yoksa None."""
+        rows = self._query('SELECT state, location, ip, updated_at FROM last_state WHERE id = 1')
+        if not rows:
+            return None
+        return dict(zip(('state', 'location', 'ip', 'updated_at'), rows[0]))
+
+    def last_good_location(self):
+        """En son başarıyla bağlanılan konumu döndürür."""
+        # Satırlar zaman sırasıyla eklenir; sondan taramak outcome indeksiyle sıralamaktan hızlıdır
+        rows = self._query("SELECT location FROM attempts NOT INDEXED WHERE outcome = 'connected' "
+                           "AND location IS NOT NULL ORDER BY id DESC LIMIT 1")
+        return rows[0][0] if rows else None
+
+    def median_connect_time(self, location=None):
+        """Başarılı denemelerin ortanca süresi; konum verilmezse tüm denemeler."""
+        where, params = ("location = ? AND ", (location,)) if location is not None else ('', ())
+        rows = self._query(f"SELECT COUNT(*) FROM attempts WHERE {where}outcome = 'connected' "
+                           "AND total IS NOT NULL", params)
+        count = rows[0][0] if rows else 0
+        if not count:
+            return None
+        rows = self._query(f"SELECT total FROM attempts WHERE {where}outcome = 'connected' "
+                           "AND total IS NOT NULL ORDER BY total LIMIT 1 OFFSET ?",
+                           params + ((count - 1) // 2,))
+        return rows[0][0] if rows else None
+
+    def location_stats(self, since=None):
+        """Konum başına deneme, başarısızlık oranı ve ortalama bağlanma süresi (son window saniye).
+
+        Günlük özetlerden hesaplanır; pencere gün sınırına yuvarlanır.
+        """
+        since = time.time() - self.window if since is None else since
+        rows = self._query(
+            'SELECT location, SUM(attempts), SUM(successes), SUM(success_time) FROM daily '
+            'WHERE day >= ? GROUP BY location', (int(since // 86400),)
+        )
+        return {
+            location: {'attempts': attempts, 'failure_rate': 1 - successes / attempts,
+                       'mean_connect': success_time / successes if successes else None}
+            for location, attempts, successes, success_time in rows
+        }
+
+    def best_location(self, min_attempts=3):
+        """Beklenen bağlanma süresi (ortalama süre / başarı oranı) en düşük konumu döndürür."""
+        best, best_cost = None, None
+        for location, stats in self.location_stats().items():
+            success_rate = 1 - stats['failure_rate']
+            if stats['attempts'] < min_attempts or not success_rate or stats['mean_connect'] is None:
+                continue
+            cost = stats['mean_connect'] / success_rate
+            if best_cost is None or cost < best_cost:
+                best, best_cost = location, cost
+        return best
+
+
+class VpnStatus:
+    """Tek bir 'hotspotshield status' çıktısından ayrıştırılan durum kaydı."""
+    __slots__ = ('state', 'location', 'ip', 'session', 'fields', 'probed_at')
+
+    # CLI sürümlerine göre değişen alan adları; anahtarlar küçük harfe indirgenir
+    STATE_KEYS = ('status', 'state', 'connection status', 'vpn status', 'connection state',
+                  'vpn connection state')
+    LOCATION_KEYS = ('location', 'current location', 'server location', 'connected to',
+                     'country', 'server')
+    IP_KEYS = ('virtual ip', 'vpn ip', 'assigned ip', 'ip address', 'ip', 'local ip',
+               'client ip')
+    SESSION_KEYS = ('session duration', 'duration', 'connected for', 'connection time',
+                    'session time', 'session uptime', 'uptime', 'session')
+
+    _LINE = re.compile(r'^\s*([A-Za-z][\w ./()-]*?)\s*[:=]\s*(.*?)\s*$')
+    _LEGACY_LOCATION = re.compile(r'^connected\s+to\s+(.+?)[.!]?$', re.IGNORECASE)
+    _CLOCK = re.compile(r'(?:(\d+)\s*(?:d|days?)[,\s]+)?(?:(\d+):)?(\d{1,2}):(\d{2})(?:\.\d+)?$')
+    _UNIT = re.compile(r'(\d+(?:\.\d+)?)\s*(d|days?|h|hrs?|hours?|m|mins?|minutes?'
+                       r'|s|secs?|seconds?)\b', re.IGNORECASE)
+    _UNIT_SECONDS = {'d': 86400, 'h': 3600, 'm': 60, 's': 1}
+
+    def __init__(self, state=ConnectionState.UNKNOWN, location=None, ip=None, session=None,
+                 fields=None, probed_at=None):
+        self.state = state
+        self.location = location
+        self.ip = ip
+        self.session = session
+        self.fields = fields or {}
+        self.probed_at = time.monotonic() if probed_at is None else probed_at
+
+    def __repr__(self):
+        return (f"VpnStatus({self.state!r}, location={self.location!r}, ip={self.ip!r}, "
+                f"session={self.session!r})")
+
+    @property
+    def connected(self):
+        return self.state == ConnectionState.CONNECTED
+
+    def session_now(self):
+        """Oturum süresini sorgudan bu yana geçen süreyle ilerletilmiş olarak döndürür."""
+        if self.session is None or not self.connected:
+            return None
+        return self.session + int(time.monotonic() - self.probed_at)
+
+    def to_dict(self):
+        """Denetim soketi yanıtları için JSON'a uygun biçim."""
+        return {'state': self.state, 'location': self.location, 'ip': self.ip,
+                'session': self.session_now(), 'fields': self.fields}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('state', ConnectionState.UNKNOWN), data.get('location'),
+                   data.get('ip'), data.get('session'), data.get('fields'))
+
+    @classmethod
+    def parse(cls, output):
+        """Çıktıyı kayda çevirir; tanınmayan satırlar yalnızca fields sözlüğünde kalır."""
+        fields = {}
+        loose = []
+        for line in output.splitlines():
+            if not line.strip() or set(line.strip()) <= set('-=*#'):
+                continue
+            match = cls._LINE.match(line)
+            if match:
+                key = ' '.join(match.group(1).replace('_', ' ').lower().split())
+                # Aynı anahtar tekrar ederse ilk değer geçerlidir
+                fields.setdefault(key, match.group(2))
+            else:
+                loose.append(line.strip())
+
+        state = cls._parse_state(cls._first(fields, cls.STATE_KEYS))
+        legacy_location = None
+        if state is None:
+            # Eski sürümler durumu anahtarsız bir satırda yazar ("Connected to US")
+            for line in loose:
+                state = cls._parse_state(line)
+                if state is not None:
+                    match = cls._LEGACY_LOCATION.match(line)
+                    legacy_location = match.group(1) if match else None
+                    break
+        if state is None:
+            logging.warning(f"Unexpected status output: {output.strip()}")
+            state = ConnectionState.UNKNOWN
+
+        ip = cls._parse_ip(cls._first(fields, cls.IP_KEYS))
+        session = cls.parse_duration(cls._first(fields, cls.SESSION_KEYS))
+        location = cls._first(fields, cls.LOCATION_KEYS) or legacy_location
+        if state != ConnectionState.CONNECTED:
+            location = ip = session = None
+        return cls(state, location, ip, session, fields)
+
+    @staticmethod
+    def _first(fields, keys):
+        for key in keys:
+            if fields.get(key):
+                return fields[key]
+        return None
+
+    @staticmethod
+    def _parse_state(text):
+        """Durum metnini ConnectionState adına çevirir; tanınmazsa None döndürür."""
+        if not text:
+            return None
+        words = text.lower().replace('-', ' ').split()
+        if not words:
+            return None
+        if words[0] in ('not', 'no') or 'disconnected' in words or 'inactive' in words:
+            return ConnectionState.DISCONNECTED
+        if words[0] == 'disconnecting':
+            return ConnectionState.DISCONNECTING
+        if words[0] == 'connecting':
+            return ConnectionState.CONNECTING
+        if words[0] in ('connected', 'active', 'on', 'up'):
+            return ConnectionState.CONNECTED
+        return None
+
+    @staticmethod
+    def _parse_ip(text):
+        """Değerdeki ilk geçerli IPv4/IPv6 adresini döndürür."""
+        if not text:
+            return None
+        for token in re.split(r'[\s,;()]+', text):
+            token = token.split('/')[0]
+            try:
+                return str(ipaddress.ip_address(token))
+            except ValueError:
+                continue
+        return None
+
+    @classmethod
+    def parse_duration(cls, text):
+        """'1h 2m 3s', '01:02:03', '1 day, 02:03:04' ve '93s' biçimlerini saniyeye çevirir."""
+        if not text:
+            return None
+        text = text.strip()
+        if text.isdigit():
+            return int(text)
+        match = cls._CLOCK.search(text)
+        if match:
+            days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+            return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+        total = 0.0
+        found = False
+        for amount, unit in cls._UNIT.findall(text):
+            total += float(amount) * cls._UNIT_SECONDS[unit[0].lower()]
+            found = True
+        return int(total) if found else None
+
+    @staticmethod
+    def format_duration(seconds):
+        """Saniyeyi 'S:DD:SS' biçiminde gösterir."""
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class ConnectionStateMachine:
+    """Geçerli bağlantı durumunun ve konumun tek sahibi; değişiklikleri dinleyicilere bildirir."""
+
+    _KEEP = object()
+
+    S = ConnectionState
+    TRANSITIONS = {
+        S.UNKNOWN: {S.DISCONNECTED, S.CONNECTED, S.CONNECTING, S.DISCONNECTING, S.ERROR},
+        S.DISCONNECTED: {S.CONNECTING, S.CONNECTED, S.ERROR},
+        S.CONNECTING: {S.CONNECTED, S.DISCONNECTED, S.DISCONNECTING, S.ERROR},
+        S.CONNECTED: {S.SWITCHING, S.DISCONNECTING, S.DISCONNECTED, S.ERROR},
+        S.DISCONNECTING: {S.DISCONNECTED, S.CONNECTED, S.ERROR},
+        S.SWITCHING: {S.CONNECTED, S.DISCONNECTED, S.DISCONNECTING, S.ERROR},
+        S.ERROR: {S.CONNECTING, S.DISCONNECTING, S.DISCONNECTED, S.CONNECTED},
+    }
+    del S
+
+    def __init__(self):
+        # Dinleyiciler de kilit altında çağrılır, böylece olaylar geçiş sırasıyla iletilir
+        self._lock = threading.RLock()
+        self.state = ConnectionState.UNKNOWN
+        self.location = None
+        self.error = None
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """listener(eski_durum, yeni_durum, konum) biçiminde bir dinleyici ekler."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def snapshot(self):
+        """(durum, konum, hata) üçlüsünü döndürür."""
+        with self._lock:
+            return self.state, self.location, self.error
+
+    def transition(self, new_state, location=_KEEP, error=None, expect=None):
+        """Geçiş izinliyse (ve durum expect içindeyse) uygular; uygulandıysa True döndürür."""
+        with self._lock:
+            old_state, old_location = self.state, self.location
+            if expect is not None and old_state not in expect:
+                return False
+            if new_state != old_state and new_state not in self.TRANSITIONS[old_state]:
+                logging.warning(f"Rejected state transition {old_state} -> {new_state}")
+                return False
+            self._set(new_state, old_location if location is self._KEEP else location, error)
+        return True
+
+    def apply(self, state, location=None, error=None):
+        """Başka bir kaynaktan bildirilen durumu geçiş kurallarına bakmadan uygular."""
+        with self._lock:
+            self._set(state, location, error)
+
+    def _set(self, new_state, location, error):
+        old_state, old_location = self.state, self.location
+        self.state, self.location, self.error = new_state, location, error
+        if (old_state, old_location) == (new_state, location):
+            return
+        logging.info(f"Connection state {old_state} -> {new_state} ({location})")
+        for listener in list(self._listeners):
+            try:
+                listener(old_state, new_state, location)
+            except Exception as e:
+                logging.error(f"State listener error: {str(e)}")
+
+    def sync(self, connected, location=_KEEP):
+        """Durum sorgusunun sonucunu, bir geçiş sürmüyorsa duruma yansıtır."""
+        with self._lock:
+            if self.state in ConnectionState.TRANSITIONAL:
+                return
+        if connected:
+            self.transition(ConnectionState.CONNECTED, location=location,
+                            expect=(ConnectionState.UNKNOWN, ConnectionState.DISCONNECTED,
+                                    ConnectionState.CONNECTED, ConnectionState.ERROR))
+        else:
+            self.transition(ConnectionState.DISCONNECTED, location=None,
+                            expect=(ConnectionState.UNKNOWN, ConnectionState.DISCONNECTED,
+                                    ConnectionState.CONNECTED, ConnectionState.ERROR))
+
+
+class VpnController:
+    """GTK'dan bağımsız bağlantı mantığı; metotlar arka plan iş parçacıklarında çağrılmalıdır."""
+
+    # Bağlantının sahibi bu süreçtir; çıkarken bağlantı kesilir
+    owns_connection = True
+    # Saklanan konum değiştirme kaydı sayısı
+    SWITCH_HISTORY = 50
+    # Bağlantı denemeleri bu süreçte kaydedilir (istemci modunda sunucu kaydeder)
+    records_history = True
+
+    def __init__(self, executor=None, reachability=None, catalog=None, latency=None,
+                 readiness=None, history=None):
+        # Tüm hotspotshield komutları ana döngü dışında çalışır
+        self.executor = executor or CommandExecutor()
+        # Tüm durum okuyucuları (tray, pencere, bildirimler) bu önbelleği kullanır
+        self.status_cache = StatusCache(self.probe_status)
+        # Son durum sorgusunun ayrıştırılmış kaydı (konum, IP, oturum süresi)
+        self.status = VpnStatus()
+        self.readiness = readiness or TunnelReadinessDetector(
+            lambda: self.status_cache.get(force=True)
+        )
+        self.reachability = reachability or ReachabilityProbe()
+        if catalog is None:
+            catalog = LocationCatalog()
+            catalog.load()
+        self.catalog = catalog
+        self.latency = latency or LatencyProber()
+        # Kullanıcının iptal edebileceği bekleyen bağlantı
+        self._connect_token = None
+        # Bağlantı durumunun tek kaynağı; pencere, tepsi ve bildirimler buna abone olur
+        self.state = ConnectionStateMachine()
+        # Her kullanıcı isteğinde artar; watchdog yeniden bağlanmadan önce bununla karşılaştırır
+        self.intent = 0
+        self.watchdog = None
+        # Art arda başarısız durum sorgusu sayısı; açık bir yanıt gelince sıfırlanır
+        self.probe_failures = 0
+        # Giriş sürerken watchdog durur: hesap değiştirme tüneli bilerek düşürür
+        self.login_active = False
+        # Son konum değiştirmelerinin aşama süreleri (en eskisi başta)
+        self.switches = []
+        self.direct_switch = SWITCH_MODE == 'direct'
+        # Denemelerin kalıcı geçmişi: otomatik bağlantı konumu ve başlangıçtaki son durum buradan gelir
+        if history is None and self.records_history and HISTORY_ENABLED:
+            try:
+                history = ConnectionHistory()
+            except (OSError, sqlite3.Error) as e:
+                logging.error(f"History store unavailable: {str(e)}")
+        self.history = history
+        if self.history is not None:
+            self.state.add_listener(self._remember_state)
+        METRICS.gauge('hotspot_connection_state', "1 for the current connection state",
+                      lambda: {(('state', self.state.state),): 1})
+        METRICS.gauge('hotspot_cli_queue_depth', "hotspotshield commands waiting for the broker",
+                      lambda: self.executor.broker.snapshot()['queue_depth'])
+
+    def check_internet(self):
+        """İnternet bağlantısını kontrol eder."""
+        return self.reachability.check()
+
+    def is_connected(self, force=False):
+        """VPN'in bağlı olup olmadığını önbellek üzerinden döndürür."""
+        return bool(self.status_cache.get(force=force))
+
+    @metered_action('status')
+    def probe_status(self):
+        """'hotspotshield status' komutunu çalıştırarak bağlantı durumunu sorgular.
+
+        Başarısız ya da belirsiz bir sorgu (zaman aşımı, anlaşılmayan çıktı, CONNECTING)
+        bağlı durumu bozmaz; art arda PROBE_FAILURE_LIMIT kez olursa kopma sayılır.
+        """
+        try:
+            result = self.executor.run(['hotspotshield', 'status'], timeout=10)
+            logging.debug(f"VPN Status Output: {result.stdout.strip()}")
+            # Tek sorgudan konum, IP ve oturum süresi birlikte ayrıştırılır
+            status = VpnStatus.parse(result.stdout) if result.error is None else None
+        except Exception as e:
+            logging.error(f"Connection status check error: {str(e)}")
+            status = None
+        if status is None or status.state not in (ConnectionState.CONNECTED,
+                                                   ConnectionState.DISCONNECTED):
+            self.probe_failures += 1
+            logging.warning(f"Status probe failed ({self.probe_failures} in a row): "
+                            f"{status.state if status is not None else 'no answer'}")
+            if (self.state.state == ConnectionState.CONNECTED
+                    and self.probe_failures < PROBE_FAILURE_LIMIT):
+                return True
+            status = status or VpnStatus(ConnectionState.DISCONNECTED)
+        else:
+            self.probe_failures = 0
+        self.status = status
+        if status.connected and status.location:
+            self.state.sync(True, location=self._location_code(status.location))
+        else:
+            self.state.sync(status.connected)
+        return status.connected
+
+    # "Germany - Frankfurt", "Germany, Frankfurt" ya da "Germany (Frankfurt)" gibi şehir ekleri
+    _LOCATION_SUFFIX = re.compile(r'\s+[-–]\s+|\s*[,(]')
+
+    def _location_code(self, location):
+        """CLI'nin yazdığı konumu katalogdaki koda çevirir; bulunamazsa olduğu gibi döndürür."""
+        if self.catalog.get(location) is not None:
+            return location
+        wanted = location.strip().lower()
+        head = self._LOCATION_SUFFIX.split(wanted, 1)[0]
+        for candidate in (wanted, head):
+            for record in self.catalog:
+                if candidate in (record.code.lower(), record.name.lower()):
+                    return record.code
+        return location
+
+    def _known_state(self):
+        """Durum bilinmiyorsa tek bir sorguyla öğrenir ve geçerli durumu döndürür."""
+        if self.state.state in (ConnectionState.UNKNOWN, ConnectionState.ERROR):
+            self.status_cache.get()
+        return self.state.state
+
+    def cancel_connect(self):
+        """Bekleyen ya da çalışan bağlantı girişimini iptal eder."""
+        token = self._connect_token
+        if token is None:
+            return False
+        token.cancel()
+        return True
+
+    def _establish(self, command, probe=None, phases=None):
+        """Bağlantı komutunu iptal edilebilir şekilde çalıştırır ve tüneli bekler.
+
+        phases verilirse komutun ('establish') ve doğrulamanın ('verify') süreleri yazılır.
+        """
+        token = self._connect_token = CancelToken()
+        phases = {} if phases is None else phases
+        try:
+            started = time.monotonic()
+            result = self.executor.run(command, cancel=token)
+            self.status_cache.invalidate()
+            phases['establish'] = time.monotonic() - started
+            if token.cancelled:
+                return 'cancelled'
+            # Eğer giriş yapılmamışsa
+            if result.contains('not signed in'):
+                return 'not_signed_in'
+            if not result.ok:
+                return 'failed'
+            # Tünelin ayağa kalkmasını bekle
+            started = time.monotonic()
+            reached = self.readiness.wait_for(connected=True, cancel=token, probe=probe)
+            phases['verify'] = time.monotonic() - started
+            if reached:
+                return 'connected'
+            return 'cancelled' if token.cancelled else 'failed'
+        finally:
+            if self._connect_token is token:
+                self._connect_token = None
+
+    def _finish_connect(self, outcome, location):
+        """Bağlantı sonucunu durum makinesine yansıtır; durum başka bir işlemce alındıysa dokunmaz."""
+        active = (ConnectionState.CONNECTING, ConnectionState.SWITCHING)
+        if outcome == 'connected':
+            self.state.transition(ConnectionState.CONNECTED, location=location, expect=active)
+        elif outcome == 'failed':
+            self.state.transition(ConnectionState.ERROR, location=None,
+                                  error='connection_failed', expect=active)
+        else:
+            self.state.transition(ConnectionState.DISCONNECTED, location=None, expect=active)
+        return outcome
+
+    @metered_action('auto_connect')
+    def auto_connect(self):
+        """Otomatik bağlantı adımlarını çalıştırır ve sonucu döndürür."""
+        self.intent += 1
+        if self._known_state() == ConnectionState.CONNECTED:
+            return 'connected'
+        if not self.state.transition(ConnectionState.CONNECTING, expect=(
+                ConnectionState.DISCONNECTED, ConnectionState.ERROR)):
+            return 'busy'
+        # Geçmişte en hızlı ve en güvenilir konumu dene; olmazsa CLI'nin varsayılanına bağlan
+        location = self.history.best_location() if self.history is not None else None
+        outcome = self._attempt(location)
+        if outcome == 'failed' and location is not None:
+            logging.warning(f"Preferred location {location} failed, connecting to the default location")
+            location = None
+            outcome = self._attempt(None)
+        return self._finish_connect(outcome, location)
+
+    @metered_action('connect')
+    def connect(self, location=None):
+        """Bağlantı adımlarını çalıştırır ve sonucu döndürür; bağlıyken konum verilirse konum değiştirir."""
+        self.intent += 1
+        return self._connect(location)
+
+    @metered_action('reconnect')
+    def reconnect(self, location, intent):
+        """Watchdog'un yeniden bağlanma girişimi; arada kullanıcı bir işlem başlattıysa 'superseded' döndürür."""
+        if intent != self.intent:
+            return 'superseded'
+        return self._connect(location)
+
+    def _connect(self, location):
+        state = self._known_state()
+        if state == ConnectionState.CONNECTED:
+            if location is None or location == self.state.location:
+                logging.info("Already connected, skipping connection attempt")
+                return 'already_connected'
+            return self.switch(location)
+        if not self.state.transition(ConnectionState.CONNECTING, expect=(
+                ConnectionState.DISCONNECTED, ConnectionState.ERROR)):
+            logging.info(f"Connect rejected while {state}")
+            return 'busy'
+        # İnternet bağlantısını kontrol et
+        if not self.check_internet():
+            return self._finish_connect('no_internet', None)
+        return self._finish_connect(self._attempt(location), location)
+
+    def _attempt(self, location):
+        """Tek bir connect denemesini çalıştırır ve aşama süreleriyle geçmişe yazar."""
+        started = time.monotonic()
+        phases = {}
+        command = ['hotspotshield', 'connect'] + ([location] if location else [])
+        outcome = self._establish(command, phases=phases)
+        self._remember(current_action(), location, outcome, phases, time.monotonic() - started)
+        return outcome
+
+    def _remember(self, kind, location, outcome, phases, total):
+        if self.history is not None:
+            self.history.record_attempt(kind, location, outcome, phases, total,
+                                        error=None if outcome == 'connected' else outcome)
+
+    def _remember_state(self, old, new, location):
+        """Oturum süresini kapatır ve kararlı durumları başlangıçta gösterilmek üzere saklar."""
+        if old == ConnectionState.CONNECTED and new != ConnectionState.CONNECTED:
+            self.history.end_session()
+        if new in (ConnectionState.CONNECTED, ConnectionState.DISCONNECTED):
+            ip = self.status.ip if new == ConnectionState.CONNECTED else None
+            self.history.save_state(new, location, ip)
+
+    @metered_action('switch')
+    def switch(self, location):
+        """Bağlı durumdayken başka bir konuma geçer; aşama süreleri switches listesine yazılır."""
+        self.intent += 1
+        if not self.state.transition(ConnectionState.SWITCHING, expect=(ConnectionState.CONNECTED,)):
+            return 'busy'
+        if not self.check_internet():
+            self.state.transition(ConnectionState.CONNECTED, expect=(ConnectionState.SWITCHING,))
+            return 'no_internet'
+        started = time.monotonic()
+        phases = {}
+        mode = 'direct' if self.direct_switch else 'teardown'
+        previous = self.state.location
+        outcome = None
+        if self.direct_switch:
+            # CLI bağlıyken verilen 'connect <konum>' ile eski tüneli kendisi kapatır;
+            # tünel zaten açık olduğundan doğrulama eski konumdan ayrılmayı da bekler
+            phases['teardown'] = 0.0
+            outcome = self._establish(['hotspotshield', 'connect', location],
+                                      probe=lambda: self._at_location(location, previous),
+                                      phases=phases)
+            if outcome == 'failed' and 'verify' not in phases:
+                # Komut reddedildi (desteklenmiyor ya da geçici hata); bu deneme ayrık yolla sürer
+                logging.warning("Direct location switch rejected by the CLI, "
+                                "falling back to disconnect + connect")
+                mode = 'fallback'
+                phases['rejected'] = phases.pop('establish')
+                outcome = None
+        if outcome is None:
+            mark = time.monotonic()
+            teardown = self._teardown()
+            phases['teardown'] = phases.get('teardown', 0.0) + time.monotonic() - mark
+            if teardown != 'disconnected':
+                self.state.transition(ConnectionState.ERROR, error='disconnect_error',
+                                      expect=(ConnectionState.SWITCHING,))
+                return self._record_switch(location, mode, phases, 'failed', started)
+            outcome = self._establish(['hotspotshield', 'connect', location], phases=phases)
+        self._finish_connect(outcome, location)
+        return self._record_switch(location, mode, phases, outcome, started)
+
+    def _at_location(self, location, previous=None):
+        """Taze bir durum sorgusuyla tünelin eski konumdan ayrılıp bağlı olup olmadığını döndürür."""
+        if not self.status_cache.get(force=True):
+            return False
+        # Konumunu yazmayan CLI sürümlerinde bağlı olmak yeterli sayılır
+        reported = self.status.location
+        if reported is None:
+            return True
+        code = self._location_code(reported)
+        if code == location:
+            return True
+        if previous is not None and code == previous:
+            # Eski tünel henüz kapanmadı
+            return False
+        logging.warning(f"Switched to {location} but the CLI reports {reported}, accepting")
+        return True
+
+    def _record_switch(self, location, mode, phases, outcome, started):
+        """Konum değiştirme aşamalarının sürelerini ölçümlere ve geçmişe yazar; sonucu döndürür."""
+        total = time.monotonic() - started
+        for phase, seconds in phases.items():
+            METRICS.observe('hotspot_switch_phase_seconds', seconds, phase=phase, mode=mode)
+        METRICS.observe('hotspot_switch_duration_seconds', total, mode=mode, outcome=outcome)
+        record = {'location': location, 'mode': mode, 'outcome': outcome,
+                  'total': round(total, 3),
+                  **{phase: round(seconds, 3) for phase, seconds in phases.items()}}
+        logging.info(f"Switch to {location} {outcome} in {total:.2f}s ({mode}: " + ', '.join(
+            f"{phase} {seconds:.2f}s" for phase, seconds in phases.items()) + ")")
+        self.switches.append(record)
+        del self.switches[:-self.SWITCH_HISTORY]
+        self._remember('switch', location, outcome, phases, total)
+        return outcome
+
+    def _teardown(self):
+        """'hotspotshield disconnect' komutunu çalıştırır ve tünelin kapanmasını bekler."""
+        result = self.executor.run(['hotspotshield', 'disconnect'], timeout=30)
+        self.status_cache.invalidate()
+        if result.error == 'timeout':
+            return 'timeout'
+        # Bağlantının kesilmesini bekle
+        if self.readiness.wait_for(connected=False):
+            return 'disconnected'
+        logging.error("Disconnect command executed but VPN is still connected.")
+        return 'still_connected'
+
+    @metered_action('disconnect')
+    def disconnect(self):
+        """Bağlantı kesme adımlarını çalıştırır ve sonucu döndürür."""
+        self.intent += 1
+        # Bekleyen bir bağlantı girişimi (watchdog'unki dahil) varsa önce onu iptal et
+        self.cancel_connect()
+        # Bağlantı durumunu kontrol et
+        if self._known_state() == ConnectionState.DISCONNECTED:
+            logging.info("Already disconnected, skipping disconnection attempt")
+            return 'already_disconnected'
+        # Süren bir kesme varsa ikinci bir teardown başlatılmaz
+        if not self.state.transition(ConnectionState.DISCONNECTING, expect=(
+                ConnectionState.UNKNOWN, ConnectionState.CONNECTING, ConnectionState.CONNECTED,
+                ConnectionState.SWITCHING, ConnectionState.ERROR)):
+            logging.info(f"Disconnect rejected while {self.state.state}")
+            return 'busy'
+        outcome = self._teardown()
+        if outcome == 'disconnected':
+            self.state.transition(ConnectionState.DISCONNECTED, location=None)
+        elif outcome == 'still_connected':
+            self.state.transition(ConnectionState.CONNECTED, error='disconnect_error')
+        else:
+            self.state.transition(ConnectionState.ERROR, error='disconnect_error')
+        return outcome
+
+    @metered_action('shutdown')
+    def shutdown(self, timeout=None, disconnect=True):
+        """Çıkış yolu: bekleyen işleri iptal eder ve bağlantıyı süre sınırı içinde keser.
+
+        'disconnected', 'not_connected', 'skipped' ya da 'timeout' döndürür.
+        """
+        deadline = time.monotonic() + (SHUTDOWN_TIMEOUT if timeout is None else timeout)
+        # Watchdog ve bekleyen işler çıkışla yarışmasın
+        self.intent += 1
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.cancel_connect()
+        self.latency.cancel()
+        self.reachability.cancel()
+        cancelled = self.executor.broker.cancel_pending()
+        logging.info(f"Shutdown started, cancelled {cancelled} pending commands")
+        if not disconnect:
+            return 'skipped'
+
+        def remaining():
+            return max(0.0, deadline - time.monotonic())
+
+        state = self.state.state
+        if state in (ConnectionState.UNKNOWN, ConnectionState.ERROR):
+            # Durum bilinmiyorsa süre sınırı içinde tek bir sorgu yapılır
+            result = self.executor.run(['hotspotshield', 'status'], timeout=remaining(),
+                                       priority=PRIORITY_HIGH)
+            if result.error == 'timeout':
+                return 'timeout'
+            state = VpnStatus.parse(result.stdout).state
+        if state == ConnectionState.DISCONNECTED:
+            return 'not_connected'
+        self.state.transition(ConnectionState.DISCONNECTING)
+        result = self.executor.run(['hotspotshield', 'disconnect'], timeout=remaining())
+        self.status_cache.invalidate()
+        if result.error == 'timeout' or not remaining():
+            outcome = 'timeout'
+        elif self.readiness.wait_for(connected=False, timeout=remaining()):
+            outcome = 'disconnected'
+        else:
+            outcome = 'timeout'
+        if outcome == 'disconnected':
+            self.state.transition(ConnectionState.DISCONNECTED, location=None)
+        else:
+            self.state.transition(ConnectionState.ERROR, error='disconnect_error')
+        return outcome
+
+    def enable_watchdog(self, **kwargs):
+        """Beklenmeyen kopmaları izleyip yeniden bağlanan watchdog'u başlatır."""
+        if self.watchdog is None:
+            self.watchdog = ConnectionWatchdog(self, **kwargs).start()
+        return self.watchdog
+
+    @metered_action('refresh_locations')
+    def refresh_locations(self):
+        """Konum kataloğunu CLI'dan yeniler ve (eklenen, silinen, değişen) farkını döndürür."""
+        result = self.executor.run(['hotspotshield', 'locations'], timeout=30)
+        if not result.ok:
+            raise RuntimeError(result.error or result.stderr)
+        records = LocationCatalog.parse(result.stdout)
+        if not records:
+            raise RuntimeError('empty location list')
+        added, removed, changed = self.catalog.update(records)
+        logging.info(f"Locations refreshed: {len(added)} added, {len(removed)} removed, "
+                     f"{len(changed)} changed")
+        return added, removed, changed
+
+    @staticmethod
+    def _signed_in_account(result):
+        """'account status' çıktısından açık oturumun hesap bilgisini döndürür; oturum yoksa None."""
+        text = result.stdout.strip()
+        if not result.ok or not text or 'not signed in' in text.lower():
+            return None
+        return text
+
+    # "Signed in as x", "Account: x" gibi satırlardaki hesap kimliği
+    ACCOUNT_ID_PATTERN = re.compile(
+        r'(?:(?:signed|logged)\s+in\s+as|^\s*(?:account|e-?mail|user(?:name)?|login)\s*[:=])\s*:?\s*(\S+)',
+        re.IGNORECASE | re.MULTILINE
+    )
+
+    @classmethod
+    def _account_id(cls, account):
+        """'account status' metnindeki hesap kimliğini küçük harfle döndürür; bulunamazsa None."""
+        match = cls.ACCOUNT_ID_PATTERN.search(account or '')
+        return match.group(1).strip('\'"<>.,;').lower() if match else None
+
+    def account_status(self):
+        """Açık oturumun hesap bilgisini tek bir durum okumasıyla döndürür; oturum yoksa None."""
+        return self._signed_in_account(self.executor.run(['hotspotshield', 'account', 'status']))
+
+    @metered_action('login')
+    def login(self, username, password, cancel=None):
+        """Hesaba giriş yapar; doğru hesap zaten açıksa signout/signin atlanır.
+
+        Sonuç: 'already_signed_in', 'signed_in', 'failed', 'timeout' ya da 'cancelled'.
+        """
+        username = username.strip()
+        if not username:
+            logging.error("Login rejected: empty username")
+            return 'failed'
+        wanted = username.lower()
+        # Oturum kapatma tüneli düşürebilir; watchdog bunu kopma saymamalı
+        self.intent += 1
+        self.login_active = True
+        deadline = time.monotonic() + LOGIN_TIMEOUT
+
+        def step(args, input=None):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result = CommandResult(args)
+                result.error = 'timeout'
+                return result
+            timeout = min(COMMAND_TIMEOUTS.get(CommandBroker.command_name(args), DEFAULT_COMMAND_TIMEOUT),
+                          remaining)
+            return self.executor.run(args, input=input, timeout=timeout, cancel=cancel)
+
+        try:
+            status = step(['hotspotshield', 'account', 'status'])
+            if status.error in ('timeout', 'cancelled'):
+                return status.error
+            account = self._signed_in_account(status)
+            if account is not None and self._account_id(account) == wanted:
+                logging.info("Requested account is already signed in, skipping sign-in")
+                return 'already_signed_in'
+            if account is not None:
+                # Başka bir hesap açık; önce çıkış yap
+                result = step(['hotspotshield', 'account', 'signout'])
+                self.status_cache.invalidate()
+                if result.error in ('timeout', 'cancelled'):
+                    return result.error
+            # Giriş komutunu çalıştır, kullanıcı adı ve şifreyi gönder
+            result = step(['hotspotshield', 'account', 'signin'], input=f"{username}\n{password}\n")
+            if result.error in ('timeout', 'cancelled'):
+                return result.error
+            # Giriş durumunu kontrol et
+            status = step(['hotspotshield', 'account', 'status'])
+            if status.error in ('timeout', 'cancelled'):
+                return status.error
+            account = self._signed_in_account(status)
+            signed_in_as = self._account_id(account)
+            if account is not None and signed_in_as in (wanted, None):
+                if signed_in_as is None:
+                    # Önceki oturum kapatıldı; CLI hesabı yazmıyorsa açık oturum bu girişe aittir
+                    logging.warning("Account status does not name the account, assuming sign-in worked")
+                logging.info("Login successful")
+                return 'signed_in'
+            logging.error(f"Login failed. Status output: {status.stdout}")
+            logging.error(f"Login stderr: {result.stderr}")
+            return 'failed'
+        except Exception as e:
+            logging.error(f"Login exception: {str(e)}")
+            return 'failed'
+        finally:
+            self.login_active = False
+
+    @metered_action('check_login_status')
+    def check_login_status(self):
+        """Kullanıcının oturum açıp açmadığını bağlantı denemesi yapmadan kontrol eder."""
+        try:
+            return self.account_status() is not None
+        except Exception as e:
+            logging.error(f"Login status check error: {str(e)}")
+            return False
+
+
+class ConnectionWatchdog:
+    """Bağlı durumdaki beklenmeyen kopmaları algılar ve son konuma geri çekilmeli olarak yeniden bağlanır.
+
+    Her olay için algılama ve kurtarma süreleri incidents listesinde tutulur.
+    """
+
+    def __init__(self, controller, interval=None, attempts=None, budget=None,
+                 backoff=None, backoff_max=None, history=50):
+        self.controller = controller
+        self.interval = WATCHDOG_INTERVAL if interval is None else interval
+        self.attempts = RECONNECT_ATTEMPTS if attempts is None else attempts
+        self.budget = RECONNECT_BUDGET if budget is None else budget
+        self.backoff = RECONNECT_BACKOFF if backoff is None else backoff
+        self.backoff_max = RECONNECT_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.incidents = []
+        self._history = history
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = None
+        self._last_ok = None
+        # Tünelin en son sağlam görüldüğü andaki kullanıcı isteği sayacı
+        self._ok_intent = None
+        self._location = None
+        self._thread = None
+
+    def start(self):
+        """İzleme iş parçacığını başlatır."""
+        self.controller.state.add_listener(self._on_state)
+        self._thread = threading.Thread(target=self._run, name='hotspot-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """İzlemeyi ve süren kurtarmayı durdurur."""
+        self._stop.set()
+        self._wake.set()
+        self.controller.state.remove_listener(self._on_state)
+
+    def snapshot(self):
+        """Kayıtlı olayların kopyasını döndürür."""
+        with self._lock:
+            return [dict(incident) for incident in self.incidents]
+
+    def delay(self, attempt):
+        """attempt. yeniden denemeden önceki bekleme: üst sınırlı üstel artış ve yarı rastgele titreşim."""
+        if attempt <= 0:
+            return 0.0
+        ceiling = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def _on_state(self, old, new, location):
+        # Durum kilidi altında çağrılır: yalnızca kayıt tutar, işi izleme iş parçacığı yapar
+        if new == ConnectionState.CONNECTED:
+            self._location = location
+            self._last_ok = time.monotonic()
+            self._ok_intent = self.controller.intent
+        elif old == ConnectionState.CONNECTED and new in (
+                ConnectionState.DISCONNECTED, ConnectionState.ERROR):
+            # Kullanıcı kesmesi DISCONNECTING, konum değişikliği SWITCHING üzerinden geçer
+            if self.controller.login_active or self._ok_intent != self.controller.intent:
+                # Tünel son sağlam görüldüğünden beri kullanıcı bir işlem başlattı (ör. hesap değiştirme)
+                logging.info("VPN dropped after a user action, not reconnecting")
+                return
+            now = time.monotonic()
+            self._pending = {
+                'location': self._location,
+                'detected_at': time.time(),
+                # Kopmanın kendisi gözlenemez; son başarılı sorgudan bu yana geçen süre kaydedilir
+                'since_last_ok': round(now - self._last_ok, 3) if self._last_ok else None,
+                'time_to_recover': None,
+                'attempts': 0,
+                'outcome': 'pending',
+                '_detected': now,
+                '_intent': self._ok_intent,
+            }
+            self._wake.set()
+
+    def _run(self):
+        sock = self.controller.readiness._open_netlink()
+        try:
+            while not self._stop.is_set():
+                if self._pending is not None:
+                    incident, self._pending = self._pending, None
+                    self._recover(incident)
+                    continue
+                if (self.controller.state.state == ConnectionState.CONNECTED
+                        and not self.controller.login_active):
+                    # Sayaç sorgudan önce okunur: sorgu sırasında başlayan bir işlem bu sağlam sonuca sayılmaz
+                    intent = self.controller.intent
+                    # Sorgu durumu günceller; kopma varsa _on_state olayı kaydeder
+                    connected = self.controller.status_cache.get(force=True)
+                    if connected and not self.controller.probe_failures:
+                        self._last_ok = time.monotonic()
+                        self._ok_intent = intent
+                self._sleep(sock)
+        finally:
+            if sock is not None:
+                sock.close()
+
+    def _sleep(self, sock):
+        """Bir sonraki denetime kadar bekler; arayüz değişikliği ya da kopma olayı beklemeyi kısaltır."""
+        self._wake.clear()
+        if sock is None:
+            self._wake.wait(self.interval)
+            return
+        deadline = time.monotonic() + self.interval
+        while not self._wake.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            readable, _, _ = select.select([sock], [], [], min(remaining, 0.5))
+            if readable:
+                self.controller.readiness._drain(sock)
+                # Bağlıyken VPN arayüzü kaybolduysa hemen sorgula
+                if not self.controller.readiness.interface_up():
+                    return
+
+    def _recover(self, incident):
+        """Bütçe bitene, kullanıcı araya girene ya da bağlantı kurulana kadar yeniden bağlanmayı dener."""
+        location = incident['location']
+        logging.warning(f"Unexpected VPN drop detected (location: {location}), reconnecting")
+        outcome = 'gave_up'
+        while not self._stop.is_set():
+            attempt = incident['attempts']
+            if attempt >= self.attempts or time.monotonic() - incident['_detected'] >= self.budget:
+                break
+            if self._stop.wait(self.delay(attempt)):
+                break
+            incident['attempts'] += 1
+            result = self.controller.reconnect(location, incident['_intent'])
+            if result in ('connected', 'already_connected'):
+                outcome = 'recovered'
+                incident['time_to_recover'] = round(time.monotonic() - incident['_detected'], 3)
+                break
+            if result in ('superseded', 'cancelled', 'busy', 'not_signed_in'):
+                outcome = result
+                break
+            logging.info(f"Reconnect attempt {incident['attempts']} failed: {result}")
+        if outcome == 'gave_up' and self._stop.is_set():
+            outcome = 'stopped'
+        incident['outcome'] = outcome
+        for key in ('_detected', '_intent'):
+            del incident[key]
+        logging.warning(f"VPN drop incident finished: {outcome} after {incident['attempts']} attempts, "
+                        f"{incident['since_last_ok']}s since last good probe, recover {incident['time_to_recover']}s")
+        with self._lock:
+            self.incidents.append(incident)
+            del self.incidents[:-self._history]
+
+
+def _peer_uid(sock):
+    """Unix soketinin karşı ucundaki sürecin kullanıcı kimliğini döndürür; öğrenilemiyorsa None."""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', creds)[1]
+
+
+def _private_socket_dir(directory):
+    """Soket dizinini 0700 olarak oluşturur; başka birine ait ya da başkalarına açıksa hata verir."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not os.path.isdir(directory) or os.path.islink(directory) or info.st_uid != os.getuid():
+        raise RuntimeError(f"control socket directory is not owned by this user: {directory}")
+    if info.st_mode & 0o077:
+        raise RuntimeError(f"control socket directory is accessible to other users: {directory}")
+
+
+class ControlServer:
+    """Denetleyiciyi yerel bir Unix soketi üzerinden satır başına bir JSON mesajla sunar."""
+
+    def __init__(self, controller, path=None):
+        self.controller = controller
+        self.path = path or CONTROL_SOCKET_PATH
+        self._sock = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._commands = {
+            'status': self._cmd_status,
+            'connect': lambda request: self._action(
+                self.controller.connect, request.get('location')),
+            'switch': lambda request: self._action(
+                self.controller.switch, request['location']),
+            'disconnect': lambda request: self._action(self.controller.disconnect),
+            'auto_connect': lambda request: self._action(self.controller.auto_connect),
+            'cancel': lambda request: self._action(self.controller.cancel_connect),
+            'login': lambda request: self._action(
+                self.controller.login, request['username'], request['password']),
+            'log_level': lambda request: {'ok': True, 'level': set_log_level(request['level'])},
+            'metrics': lambda request: {'ok': True, 'metrics': METRICS.render()},
+            'incidents': lambda request: {
+                'ok': True,
+                'incidents': self.controller.watchdog.snapshot() if self.controller.watchdog else [],
+            },
+            'switches': lambda request: {'ok': True, 'switches': list(self.controller.switches)},
+        }
+
+    def start(self):
+        """Soketi bağlar ve bağlantıları kabul eden iş parçacığını başlatır."""
+        if os.path.dirname(self.path) == CONTROL_SOCKET_FALLBACK_DIR:
+            _private_socket_dir(CONTROL_SOCKET_FALLBACK_DIR)
+        if os.path.lexists(self.path):
+            if ControlClient(self.path, timeout=1.0).alive():
+                raise RuntimeError(f"control socket already in use: {self.path}")
+            # Önceki bir süreçten kalan bayat soket
+            os.unlink(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Dosya bağlanırken de yalnızca kullanıcıya açık olsun (chmod'dan önceki yarış penceresi)
+        umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, 0o600)
+        sock.listen(16)
+        self._sock = sock
+        self.controller.state.add_listener(self._broadcast)
+        threading.Thread(target=self._accept_loop, name='hotspot-control', daemon=True).start()
+        logging.info(f"Control socket listening on {self.path}")
+        return self
+
+    def close(self):
+        """Yeni bağlantıları durdurur, aboneleri kapatır ve soket dosyasını siler."""
+        if self._sock is None or self._closed.is_set():
+            return
+        self._closed.set()
+        self.controller.state.remove_listener(self._broadcast)
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            # Yalnızca aynı kullanıcının süreçleri denetleyebilir (giriş bilgileri bu soketten geçer)
+            try:
+                uid = _peer_uid(conn)
+            except OSError:
+                uid = -1
+            if uid is not None and uid != os.getuid():
+                logging.warning(f"Rejected control connection from uid {uid}")
+                conn.close()
+                continue
+            threading.Thread(target=self._serve, args=(conn,),
+                             name='hotspot-control-conn', daemon=True).start()
+
+    @staticmethod
+    def _send(conn, message):
+        conn.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+    def _state_reply(self):
+        state, location, error = self.controller.state.snapshot()
+        return {'ok': True, 'state': state, 'location': location, 'error': error,
+                'details': self.controller.status.to_dict()}
+
+    def _serve(self, conn):
+        """Bir istemcinin isteklerini sırayla yanıtlar; 'subscribe' bağlantıyı olay akışına çevirir."""
+        with conn:
+            try:
+                for line in conn.makefile('r', encoding='utf-8'):
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        command = request.get('cmd')
+                    except (ValueError, AttributeError):
+                        self._send(conn, {'ok': False, 'error': 'invalid request'})
+                        continue
+                    if command == 'subscribe':
+                        self._stream(conn)
+                        return
+                    handler = self._commands.get(command)
+                    if handler is None:
+                        self._send(conn, {'ok': False, 'error': f"unknown command: {command}"})
+                        continue
+                    try:
+                        reply = handler(request)
+                    except KeyError as e:
+                        reply = {'ok': False, 'error': f"missing parameter: {e.args[0]}"}
+                    except Exception as e:
+                        logging.error(f"Control command error ({command}): {str(e)}")
+                        reply = {'ok': False, 'error': str(e)}
+                    self._send(conn, reply)
+            except OSError as e:
+                logging.debug(f"Control connection closed: {str(e)}")
+
+    def _cmd_status(self, request):
+        """Önbellekteki durumu alt süreç açmadan döndürür; 'refresh' verilirse önce sorgular."""
+        if request.get('refresh') or self.controller.state.state == ConnectionState.UNKNOWN:
+            self.controller.status_cache.get(force=bool(request.get('refresh')))
+        return self._state_reply()
+
+    def _action(self, func, *args):
+        result = func(*args)
+        reply = self._state_reply()
+        reply['result'] = result
+        return reply
+
+    def _stream(self, conn):
+        """Geçerli durumu ve ardından her durum değişikliğini istemciye yazar."""
+        events = queue.Queue()
+        with self._lock:
+            self._subscribers.add(events)
+        try:
+            # Anlık durum kilit dışında alınır: _broadcast durum makinesinin kilidini tutarken
+            # self._lock'u ister. Kayıt önce yapıldığından arada olan geçişler kaybolmaz;
+            # kuyruktaki olaylar anlık durumdan sonra gönderilir.
+            self._send(conn, self._state_reply())
+            while True:
+                event = events.get()
+                if event is None:
+                    break
+                self._send(conn, event)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._subscribers.discard(events)
+
+    def _broadcast(self, old, new, location):
+        event = {'event': 'state', 'old': old, 'state': new, 'location': location,
+                 'error': self.controller.state.error,
+                 'details': self.controller.status.to_dict()}
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(event)
+
+
+class ControlClient:
+    """Denetim soketi istemcisi; her istek için kısa ömürlü bir bağlantı açar."""
+
+    def __init__(self, path=None, timeout=5.0):
+        self.path = path or CONTROL_SOCKET_PATH
+        self.timeout = timeout
+
+    def _open(self, timeout):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.path)
+            # Sunucu başka bir kullanıcıya aitse istek (ve giriş bilgileri) gönderilmez
+            uid = _peer_uid(sock)
+            if uid is None:
+                uid = os.stat(self.path).st_uid
+            if uid != os.getuid():
+                raise PermissionError(f"control socket {self.path} is owned by uid {uid}")
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def alive(self):
+        """Sunucu yanıt veriyorsa True döndürür."""
+        try:
+            return bool(self.request('status').get('ok'))
+        except (OSError, ValueError):
+            return False
+
+    def request(self, cmd, timeout=-1, **params):
+        """İsteği gönderir ve yanıtı sözlük olarak döndürür; timeout=None süresiz bekler."""
+        with self._open(self.timeout if timeout == -1 else timeout) as sock:
+            sock.sendall((json.dumps({'cmd': cmd, **params}) + '\n').encode('utf-8'))
+            reply = sock.makefile('r', encoding='utf-8').readline()
+        if not reply:
+            raise ConnectionError("control socket closed the connection")
+        return json.loads(reply)
+
+    def subscribe(self, callback):
+        """Durum olaylarını arka planda okuyup callback'e iletir; akış bitince callback(None) çağrılır.
+
+        Dönen fonksiyon aboneliği sonlandırır.
+        """
+        sock = self._open(self.timeout)
+        sock.sendall(b'{"cmd": "subscribe"}\n')
+        sock.settimeout(None)
+
+        def _read():
+            try:
+                for line in sock.makefile('r', encoding='utf-8'):
+                    callback(json.loads(line))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Control subscription error: {str(e)}")
+            finally:
+                sock.close()
+                callback(None)
+
+        def _unsubscribe():
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        threading.Thread(target=_read, name='hotspot-control-sub', daemon=True).start()
+        return _unsubscribe
+
+
+class RemoteController(VpnController):
+    """Bağlantı işlemlerini denetim soketindeki sunucuya ileten denetleyici (GUI istemci modu).
+
+    Durum makinesi sunucunun olay akışından beslenen bir aynadır; konum kataloğu,
+    gecikme ölçümleri ve internet kontrolü yerel kalır.
+    """
+
+    # Bağlantının sahibi sunucudur; istemci çıkarken bağlantı kesilmez
+    owns_connection = False
+    records_history = False
+
+    def __init__(self, client, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self._closing = False
+        self._unsubscribe = client.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        if event is None:
+            if self._closing:
+                return
+            logging.warning("Control socket subscription ended")
+            self.state.apply(ConnectionState.ERROR, error='control_socket_closed')
+            return
+        if event.get('details'):
+            self.status = VpnStatus.from_dict(event['details'])
+        self.state.apply(event['state'], event.get('location'), event.get('error'))
+
+    def _request(self, cmd, timeout=None, **params):
+        """İsteği gönderir, yanıttaki durumu aynaya uygular; hata olursa None döndürür."""
+        try:
+            reply = self.client.request(cmd, timeout=timeout, **params)
+        except (OSError, ValueError) as e:
+            logging.error(f"Control request error ({cmd}): {str(e)}")
+            return None
+        if not reply.get('ok'):
+            logging.error(f"Control request failed ({cmd}): {reply.get('error')}")
+            return None
+        if reply.get('details'):
+            self.status = VpnStatus.from_dict(reply['details'])
+        self.state.apply(reply['state'], reply.get('location'), reply.get('error'))
+        return reply
+
+    def _result(self, cmd, **params):
+        reply = self._request(cmd, **params)
+        return None if reply is None else reply.get('result')
+
+    def probe_status(self):
+        """Durumu sunucunun önbelleğinden okur; alt süreç açılmaz."""
+        reply = self._request('status', timeout=self.client.timeout)
+        return reply is not None and reply['state'] == ConnectionState.CONNECTED
+
+    def auto_connect(self):
+        return self._result('auto_connect')
+
+    def connect(self, location=None):
+        return self._result('connect', location=location)
+
+    def switch(self, location):
+        return self._result('switch', location=location)
+
+    def disconnect(self):
+        return self._result('disconnect')
+
+    def cancel_connect(self):
+        return bool(self._result('cancel', timeout=self.client.timeout))
+
+    def login(self, username, password, cancel=None):
+        return self._result('login', username=username, password=password)
+
+    def close(self):
+        """Olay aboneliğini sonlandırır."""
+        self._closing = True
+        self._unsubscribe()
+
+
+class MetricsExporter:
+    """Ölçümleri Prometheus metin dosyasına düzenli aralıklarla ve/veya 127.0.0.1 üzerindeki /metrics ucuna yazar."""
+
+    def __init__(self, registry=None, path=None, port=None, interval=None):
+        self.registry = registry or METRICS
+        self.path = METRICS_FILE if path is None else path
+        self.port = METRICS_PORT if port is None else port
+        self.interval = METRICS_FILE_INTERVAL if interval is None else interval
+        self._stop = threading.Event()
+        self._server = None
+
+    def start(self):
+        """Yapılandırılmış dışa aktarımları başlatır; hiçbiri yoksa bir şey yapmaz."""
+        if self.path:
+            threading.Thread(target=self._write_loop, name='hotspot-metrics-file', daemon=True).start()
+        if self.port:
+            registry = self.registry
+
+            class _Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ('/', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                self._server = ThreadingHTTPServer(('127.0.0.1', self.port), _Handler)
+            except OSError as e:
+                logging.error(f"Metrics endpoint error: {str(e)}")
+                return self
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name='hotspot-metrics-http',
+                             daemon=True).start()
+            logging.info(f"Metrics endpoint on http://127.0.0.1:{self._server.server_port}/metrics")
+        return self
+
+    def write(self):
+        """Metin dosyasını geçici dosya üzerinden atomik olarak yazar."""
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(self.registry.render())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.error(f"Metrics file write error: {str(e)}")
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        """Dışa aktarımları durdurur; dosya son bir kez yazılır."""
+        self._stop.set()
+        if self.path:
+            self.write()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class MainLoopMonitor:
+    """GLib zamanlayıcısının gecikmesinden GTK ana döngüsünün ne kadar takıldığını ölçer."""
+
+    def __init__(self, interval=None, threshold=None):
+        self.interval = MAINLOOP_PROBE_INTERVAL if interval is None else interval
+        self.threshold = MAINLOOP_STALL_THRESHOLD if threshold is None else threshold
+        self.max_lag = 0.0
+        self._expected = None
+        self._source = None
+
+    def start(self):
+        self._expected = time.monotonic() + self.interval
+        self._source = GLib.timeout_add(int(self.interval * 1000), self._tick)
+        return self
+
+    def stop(self):
+        if self._source is not None:
+            GLib.source_remove(self._source)
+            self._source = None
+
+    def _tick(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self._expected)
+        self._expected = now + self.interval
+        METRICS.observe('hotspot_mainloop_lag_seconds', lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.threshold:
+            METRICS.inc('hotspot_mainloop_stalls_total')
+            logging.warning(f"Main loop stalled for {lag * 1000:.0f} ms")
+        return True
+
+
+class RingBuffer:
+    """array('d') üzerinde sabit boyutlu, en eski örneğin üzerine yazan halka tampon."""
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._data = array.array('d', bytes(8 * self.capacity))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def values(self):
+        """Örnekleri eskiden yeniye doğru döndürür."""
+        start = (self._next - self._size) % self.capacity
+        if start + self._size <= self.capacity:
+            return self._data[start:start + self._size].tolist()
+        return (self._data[start:] + self._data[:self._next]).tolist()
+
+    def latest(self):
+        return self._data[self._next - 1] if self._size else None
+
+
+class ThroughputMonitor:
+    """VPN arayüzlerinin rx/tx hızını /proc/net/dev sayaçlarından örnekler ve geçmişini tutar.
+
+    Örnekleme GLib zamanlayıcısıyla ana döngüde yapılır (tek dosya okuması);
+    pencere gizliyken stop() ile durdurulur.
+    """
+
+    SPARK_BARS = '▁▂▃▄▅▆▇█'
+
+    def __init__(self, proc_path=None, prefixes=VPN_INTERFACE_PREFIXES, interval=None,
+                 history=None, on_sample=None):
+        self.proc_path = proc_path or PROC_NET_DEV
+        self.prefixes = tuple(prefixes)
+        self.interval = THROUGHPUT_INTERVAL if interval is None else interval
+        size = THROUGHPUT_HISTORY if history is None else history
+        self.rx = RingBuffer(size)
+        self.tx = RingBuffer(size)
+        self.on_sample = on_sample
+        self._previous = None
+        self._source = None
+
+    @property
+    def running(self):
+        return self._source is not None
+
+    def read_counters(self):
+        """Öneki eşleşen arayüzlerin toplam (rx, tx) bayt sayaçlarını döndürür; arayüz yoksa None."""
+        try:
+            with open(self.proc_path) as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            logging.debug(f"Throughput counters unavailable: {str(e)}")
+            return None
+        rx = tx = 0
+        found = False
+        # İlk iki satır başlıktır
+        for line in lines[2:]:
+            name, _, counters = line.partition(':')
+            if not name.strip().startswith(self.prefixes):
+                continue
+            columns = counters.split()
+            if len(columns) < 9:
+                continue
+            rx += int(columns[0])
+            tx += int(columns[8])
+            found = True
+        return (rx, tx) if found else None
+
+    def sample(self, now=None):
+        """Bir örnek alır ve (rx, tx) bayt/sn hızlarını döndürür; arayüz yoksa geçmişi sıfırlar."""
+        now = time.monotonic() if now is None else now
+        counters = self.read_counters()
+        if counters is None:
+            self._previous = None
+            self.rx.clear()
+            self.tx.clear()
+            return None
+        previous, self._previous = self._previous, (now, counters)
+        if previous is None or now <= previous[0]:
+            return None
+        elapsed = now - previous[0]
+        # Arayüz yeniden oluşturulduysa sayaçlar geriye gider; o aralık sıfır sayılır
+        rates = tuple(max(0, current - old) / elapsed
+                      for current, old in zip(counters, previous[1]))
+        self.rx.append(rates[0])
+        self.tx.append(rates[1])
+        return rates
+
+    def start(self):
+        """Örneklemeyi başlatır; zaten çalışıyorsa bir şey yapmaz."""
+        if self._source is None:
+            self._previous = None
+            self._source = GLib.timeout_add(int(self.interval * 1000), self._tick)
+        return self
+
+    def stop(self):
+        if self._source is not None:
+            GLib.source_remove(self._source)
+            self._source = None
+
+    def _tick(self):
+        rates = self.sample()
+        if self.on_sample is not None:
+            try:
+                self.on_sample(rates)
+            except Exception as e:
+                logging.error(f"Throughput display error: {str(e)}")
+        return True
+
+    @classmethod
+    def sparkline(cls, values, width=None):
+        """Değerleri blok karakterlerle küçük bir grafiğe çevirir."""
+        if width is not None:
+            values = values[-width:]
+        peak = max(values, default=0.0)
+        if peak <= 0:
+            return cls.SPARK_BARS[0] * len(values)
+        top = len(cls.SPARK_BARS) - 1
+        return ''.join(cls.SPARK_BARS[int(round(value / peak * top))] for value in values)
+
+    @staticmethod
+    def format_rate(rate):
+        """Bayt/sn hızını okunabilir birimle gösterir."""
+        for unit in ('B/s', 'KB/s', 'MB/s'):
+            if rate < 1024:
+                return f"{rate:.0f} {unit}" if unit == 'B/s' else f"{rate:.1f} {unit}"
+            rate /= 1024
+        return f"{rate:.1f} GB/s"
 
-# Logging configuration
-logging.basicConfig(
-    filename=log_file,
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
-gi.require_version('Gtk', '3.0')
-gi.require_version('AppIndicator3', '0.1')
-gi.require_version('Notify', '0.7')
-from gi.repository import Gtk, AppIndicator3, Notify, GLib
+class Event:
+    """Olay yolundan geçen olayların temel sınıfı; coalesced birleştirilen olay sayısıdır."""
+    __slots__ = ('coalesced',)
 
-class Language:
     def __init__(self):
-        """Dil sınıfı, uygulamanın dilini ve metin çevirilerini yönetir."""
-        self.current_lang = 'tr'  # Varsayılan dil
-        self.translations = {
-            'tr': {
-                'window_title': 'Hotspot Shield VPN',
-                'status': 'Durum',
-                'connect': 'Bağlan',
-                'disconnect': 'Bağlantıyı Kes',
-                'locations': 'Konumlar',
-                'quit': 'Çıkış',
-                'show_interface': 'Arayüzü Göster',
-                'status_check': 'Durum Kontrolü',
-                'connected': 'BAĞLI',
-                'not_connected': 'BAĞLI DEĞİL',
-                'login': 'Giriş Yap',
-                'logout': 'Hesaptan Çıkış',
-                'username': 'Kullanıcı Adı',
-                'password': 'Şifre',
-                'login_button': 'Giriş',
-                'cancel': 'İptal',
-                'account_status': 'Hesap Durumu',
-                'connection_failed': 'Bağlantı Başarısız',
-                'connection_error': 'Bağlantı Hatası',
-                'login_failed': 'Giriş Başarısız Oldu',
-                'logged_out': 'Çıkış Yapıldı',
-                'connecting': 'Bağlanılıyor...',
-                'disconnecting': 'Bağlantı Kesiliyor...',
-                'error': 'Hata',
-                'vpn_connection': 'VPN Bağlantısı',
-                'not_signed_in': 'Oturum Açılmadı. Giriş Yapılıyor...',
-                'logout_failed': 'Çıkış Başarısız Oldu',
-                'disconnect_error': 'Bağlantı Kesme Hatası',
-                'not_available': 'Mevcut Değil',
-                'no_internet': 'İnternet Bağlantısı Yok',
-                'no_internet_message': 'İnternet bağlantısı bulunamadı. Lütfen bağlantınızı kontrol edip tekrar deneyin.',
-                'connecting_location': 'Konuma Bağlanılıyor...',
-                'connection_successful': 'Bağlantı Başarılı',
-                'connection_failed_try_again': 'Bağlantı başarısız. Tekrar deneyin.',
-                'checking_connection': 'Bağlantı kontrol ediliyor...'
-            },
-            'en': {
-                'window_title': 'Hotspot Shield VPN',
-                'status': 'Status',
-                'connect': 'Connect',
-                'disconnect': 'Disconnect',
-                'locations': 'Locations',
-                'quit': 'Quit',
-                'show_interface': 'Show Interface',
-                'status_check': 'Status Check',
-                'connected': 'CONNECTED',
-                'not_connected': 'NOT CONNECTED',
-                'login': 'Login',
-                'logout': 'Logout',
-                'username': 'Username',
-                'password': 'Password',
-                'login_button': 'Login',
-                'cancel': 'Cancel',
-                'account_status': 'Account Status',
-                'connection_failed': 'Connection Failed',
-                'connection_error': 'Connection Error',
-                'login_failed': 'Login Failed',
-                'logged_out': 'Logged Out',
-                'connecting': 'Connecting...',
-                'disconnecting': 'Disconnecting...',
-                'error': 'Error',
-                'vpn_connection': 'VPN Connection',
-                'not_signed_in': 'Not Signed In. Logging In...',
-                'logout_failed': 'Logout Failed',
-                'disconnect_error': 'Disconnect Error',
-                'not_available': 'Not Available',
-                'no_internet': 'No Internet Connection',
-                'no_internet_message': 'No internet connection found. Please check your connection and try again.',
-                'connecting_location': 'Connecting to Location...',
-                'connection_successful': 'Connection Successful',
-                'connection_failed_try_again': 'Connection failed. Please try again.',
-                'checking_connection': 'Checking connection...'
-            }
-        }
+        self.coalesced = 1
 
-    def get_text(self, key):
-        """Belirtilen anahtar için çeviri metnini döndürür."""
-        return self.translations[self.current_lang].get(key, key)
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
 
-    def switch_language(self):
-        """Uygulama dilini değiştirir."""
-        self.current_lang = 'en' if self.current_lang == 'tr' else 'tr'
 
-class HotspotShieldApp:
-    def check_internet_connection(self):
-        """İnternet bağlantısını kontrol eder."""
-        try:
-            # 1.1.1.1 (Cloudflare DNS) ping atarak internet kontrolü
-            result = subprocess.run(
-                ['ping', '-c', '1', '1.1.1.1'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=5  # 5 saniye timeout
-            )
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError):
+class StateChanged(Event):
+    """Bağlantı durumu değişti; path birleştirilen geçişlerin uğradığı durumlardır."""
+    __slots__ = ('old', 'new', 'location', 'old_location', 'path')
+
+    def __init__(self, old, new, location, old_location=None, path=None):
+        super().__init__()
+        self.old = old
+        self.new = new
+        self.location = location
+        self.old_location = old_location
+        self.path = path or (old, new)
+
+    @property
+    def unchanged(self):
+        """Birleştirilen geçişler başladığı duruma ve konuma geri döndüyse True."""
+        return (self.old, self.old_location) == (self.new, self.location)
+
+    @staticmethod
+    def merge(previous, event):
+        """Pencerenin ilk eski durumunu ve son yeni durumunu koruyan birleştirme."""
+        merged = StateChanged(previous.old, event.new, event.location, previous.old_location,
+                              previous.path + (event.new,))
+        merged.coalesced = previous.coalesced + 1
+        return merged
+
+
+class LocationsUpdated(Event):
+    """Konum kataloğu yenilendi; diff (eklenen, silinen, değişen) ya da değişiklik yoksa None."""
+    __slots__ = ('diff',)
+
+    def __init__(self, diff):
+        super().__init__()
+        self.diff = diff
+
+
+class ErrorRaised(Event):
+    """Kullanıcıya gösterilecek bir hata."""
+    __slots__ = ('title', 'message')
+
+    def __init__(self, title, message):
+        super().__init__()
+        self.title = title
+        self.message = message
+
+
+class _Subscription:
+    __slots__ = ('bus', 'event_type', 'callback', 'window', 'merge', 'name', 'pending',
+                 'received', 'delivered')
+
+    def __init__(self, bus, event_type, callback, window, merge, name):
+        self.bus = bus
+        self.event_type = event_type
+        self.callback = callback
+        self.window = window
+        self.merge = merge
+        self.name = name
+        self.pending = None
+        self.received = 0
+        self.delivered = 0
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """Süreç içi, türlü olay yolu.
+
+    publish() herhangi bir iş parçacığından çağrılabilir; abonelere ana döngüde
+    ulaştırılır. Her abone bir pencere (saniye) bildirir: ilk olaydan sonra
+    pencere dolana kadar gelen olaylar merge ile birleştirilir (varsayılan: en
+    sonuncusu kalır) ve abone pencere başına en fazla bir kez çağrılır.
+    """
+
+    def __init__(self, schedule=None):
+        # schedule(gecikme, fonksiyon): fonksiyonu ana döngüde gecikmeyle çalıştırır
+        self._schedule = schedule or self._glib_schedule
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    @staticmethod
+    def _glib_schedule(delay, func):
+        if GLib is None:
+            func()
+            return
+
+        def _run():
+            func()
             return False
+        if delay > 0:
+            GLib.timeout_add(int(delay * 1000), _run)
+        else:
+            GLib.idle_add(_run)
 
-    def __init__(self):
+    @staticmethod
+    def keep_last(previous, event):
+        event.coalesced = previous.coalesced + 1
+        return event
+
+    def subscribe(self, event_type, callback, window=0.0, merge=None, name=None):
+        """callback(olay) abonesi ekler; pencere içindeki olaylar tek çağrıda birleştirilir."""
+        subscription = _Subscription(self, event_type, callback, window, merge or self.keep_last,
+                                     name or getattr(callback, '__name__', event_type.__name__))
+        with self._lock:
+            self._subscriptions.setdefault(event_type, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.event_type, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            subscription.pending = None
+
+    def publish(self, event):
+        """Olayı türüne (ve üst türlerine) abone olanlara iletir."""
+        due = []
+        with self._lock:
+            for event_type in type(event).__mro__:
+                for subscription in self._subscriptions.get(event_type, ()):
+                    subscription.received += 1
+                    if subscription.pending is None:
+                        subscription.pending = event
+                        due.append(subscription)
+                    else:
+                        subscription.pending = subscription.merge(subscription.pending, event)
+        for subscription in due:
+            self._schedule(subscription.window, partial(self._deliver, subscription))
+
+    def _deliver(self, subscription):
+        with self._lock:
+            event, subscription.pending = subscription.pending, None
+            if event is None:
+                return
+            subscription.delivered += 1
+        try:
+            subscription.callback(event)
+        except Exception as e:
+            logging.error(f"Event handler error ({subscription.name}): {str(e)}")
+
+    def stats(self):
+        """Abone başına alınan ve iletilen olay sayılarını döndürür."""
+        with self._lock:
+            return {subscription.name: {'received': subscription.received,
+                                        'delivered': subscription.delivered}
+                    for subscriptions in self._subscriptions.values()
+                    for subscription in subscriptions}
+
+
+class StartupTrace:
+    """--startup-trace etkinse başlangıç aşamalarının sürelerini stderr'e yazar."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._stages = {}
+
+    def mark(self, event):
+        """Süreç başlangıcından bu yana geçen süreyi yazar."""
+        if self.enabled:
+            elapsed = (time.monotonic() - _PROCESS_START) * 1000
+            print(f"[startup] {event}: {elapsed:.1f} ms since process start", file=sys.stderr)
+
+    def begin(self, stage):
+        """Bir aşamanın başladığını kaydeder."""
+        if self.enabled:
+            self._stages[stage] = time.monotonic()
+
+    def end(self, stage):
+        """Başlamış bir aşamanın süresini yazar; aşama zaten bittiyse bir şey yapmaz."""
+        started = self._stages.pop(stage, None)
+        if started is not None:
+            duration = (time.monotonic() - started) * 1000
+            print(f"[startup] {stage}: {duration:.1f} ms", file=sys.stderr)
+            self.mark(f"{stage} done")
+
+
+class HotspotShieldApp:
+    def __init__(self, trace=None, controller=None):
         """Uygulamanın ana sınıfı, GUI ve işlevselliği yönetir."""
         self.lang = Language()
-
-        # İnternet bağlantısını kontrol et
-        if not self.check_internet_connection():
-            dialog = Gtk.MessageDialog(
-                parent=None,
-                flags=0,
-                message_type=Gtk.MessageType.ERROR,
-                buttons=Gtk.ButtonsType.OK,
-                text=self.lang.get_text('no_internet')
-            )
-            dialog.format_secondary_text(self.lang.get_text('no_internet_message'))
-            dialog.run()
-            dialog.destroy()
-            sys.exit(1)
+        self.trace = trace or StartupTrace()
+        # Bağlantı mantığı GTK'dan bağımsız denetleyicide çalışır
+        self.controller = controller or VpnController()
+        self.executor = self.controller.executor
+        self.status_cache = self.controller.status_cache
+        # Konumlar önce disk önbelleğinden gösterilir, arka planda yenilenir
+        self.catalog = self.controller.catalog
+        self.location_index = LocationIndex(self.catalog)
+        self.latency = self.controller.latency
+        self._location_iters = {}
+        self._visible_codes = set()
+        # Sistem tepsisi ilk çizimden sonra kurulur
+        self.indicator = None
+        self._tray_update_pending = False
+        self.exit_code = 0
+        # Kapanış bir kez başlar ve bir kez tamamlanır
+        self.quitting = False
+        self._quit_started = None
+        self._quit_finished = False
+        # Betiklerin bu süreçteki denetleyiciyi kullanabilmesi için main() tarafından kurulur
+        self.control_server = None
+        self.metrics_exporter = None
+        self.loop_monitor = None
+        # Tünel trafiği yalnızca pencere görünürken örneklenir
+        self.throughput = ThroughputMonitor(on_sample=self._render_throughput)
+        # Durum değişiklikleri ana döngüde işlenir; düğmeler ve etiketler yalnızca buradan güncellenir
+        self.state = self.controller.state
+        self._notification = None
+        # Durum, konum ve hata olayları tek yoldan geçer; her abone kendi penceresinde birleştirilir
+        self.bus = EventBus()
+        self.bus.subscribe(StateChanged, lambda event: self._render_status(), name='status')
+        self.bus.subscribe(StateChanged, lambda event: self.indicator and self.update_tray_menu(),
+                           window=self.TRAY_DEBOUNCE, name='tray')
+        self.bus.subscribe(StateChanged, self._notify_state, window=NOTIFY_DEBOUNCE,
+                           merge=StateChanged.merge, name='notification')
+        self.bus.subscribe(LocationsUpdated, self._on_locations_updated, name='locations')
+        self.bus.subscribe(ErrorRaised, self._show_error_dialog, window=self.ERROR_DEBOUNCE,
+                           name='error_dialog')
+        self._published_location = self.state.location
+        self.state.add_listener(self._publish_state)
 
         # Create the main window
-        self.window = Gtk.Window(title=self.lang.get_text('window_title'))
+        self.window = Gtk.Window()
+        self.lang.bind('window_title', self.window.set_title)
         self.window.set_border_width(10)
         self.window.set_default_size(400, 500)
         self.window.set_position(Gtk.WindowPosition.CENTER)
         self.window.connect("delete-event", self.on_window_close)
+        self.window.connect("map", lambda window: self.throughput.start())
+        self.window.connect("unmap", self._on_window_unmap)
+        self._first_draw_handler = self.window.connect("draw", self._on_first_draw)
+
+        # Create the main UI
+        self.create_main_ui()
+        self.trace.mark("window built")
+
+    def _on_first_draw(self, widget, cr):
+        """Pencere ilk kez çizildiğinde arka plan başlangıç aşamalarını başlatır."""
+        self.window.disconnect(self._first_draw_handler)
+        self.trace.mark("first paint")
+        GLib.idle_add(self._start_background)
+        return False
+
+    def _start_background(self):
+        """Tepsi, erişilebilirlik, konum ve durum aşamalarını başlatır."""
+        self.loop_monitor = MainLoopMonitor().start()
+        self.trace.begin('tray')
+        self.setup_tray()
+        self.trace.end('tray')
 
-        # Initialize Notify
-        if not Notify.is_initted():
-            Notify.init("Hotspot Shield VPN")
+        self.trace.begin('reachability')
+        self.executor.call(self.controller.check_internet, callback=self._on_reachability_checked)
+        self.trace.begin('locations')
+        self.load_locations()
+        self.trace.begin('status')
+        self.update_status_display()
+        return False
 
-        # Set up the system tray indicator
+    def setup_tray(self):
+        """Sistem tepsisi göstergesini oluşturur."""
+        AppIndicator3 = _gi_module('AppIndicator3')
         self.indicator = AppIndicator3.Indicator.new(
             "hotspot-shield",
             "network-vpn",
             AppIndicator3.IndicatorCategory.APPLICATION_STATUS
         )
         self.indicator.set_status(AppIndicator3.IndicatorStatus.ACTIVE)
-        self.indicator.set_menu(self.build_tray_menu())
-
-        # Create the main UI
-        self.create_main_ui()
+        self.tray_menu = self.build_tray_menu()
+        self.indicator.set_menu(self.tray_menu)
 
+    def _on_reachability_checked(self, online):
+        """İnternet kontrolünün sonucunu işler; bağlantı varsa otomatik bağlanır."""
+        self.trace.end('reachability')
+        if not online:
+            # Çıkıştan önce gösterilmesi gerektiğinden olay yolunu beklemeden açılır
+            self._show_error_dialog(ErrorRaised(
+                self.lang.get_text('no_internet'),
+                self.lang.get_text('no_internet_message')
+            ))
+            self.exit_code = 1
+            self.quit(None)
+            return
         # Attempt to connect automatically
+        self.trace.begin('auto_connect')
         self.auto_connect()
 
     def on_window_close(self, window, event):
@@ -187,38 +3622,23 @@ class HotspotShieldApp:
             logging.error(f"Show window error: {str(e)}")
 
     def auto_connect(self):
-        """Uygulama başladığında otomatik olarak bağlanmaya çalışır."""
-        try:
-            # Direkt bağlanmayı dene
-            result = subprocess.run(
-                ['hotspotshield', 'connect'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
+        """Uygulama başladığında arka planda otomatik olarak bağlanmaya çalışır."""
+        self.executor.call(self.controller.auto_connect, callback=self._on_auto_connect_done)
+
+    def _on_auto_connect_done(self, outcome):
+        """Otomatik bağlantı sonucunu ana döngüde işler; ekran durum değişikliğiyle güncellenir."""
+        self.trace.end('auto_connect')
+        if outcome in ('cancelled', 'connected', 'busy'):
+            return
+        if outcome == 'failed':
+            self.connect_vpn()
+        elif outcome == 'not_signed_in':
+            self.show_login_dialog(
+                lambda success: self.connect_vpn() if success else self.quit(None)
             )
-            # Eğer giriş yapılmamışsa
-            if 'not signed in' in result.stderr.lower() or 'not signed in' in result.stdout.lower():
-                if self.show_login_dialog():
-                    self.connect_vpn()
-                else:
-                    sys.exit(1)
-            else:
-                # Bağlantı başarılı mı kontrol et
-                import time
-                time.sleep(2)
-                if self.is_connected():
-                    self.show_notification(
-                        self.lang.get_text('vpn_connection'),
-                        self.lang.get_text('connection_successful')
-                    )
-                    self.update_status_display()
-                else:
-                    self.connect_vpn()
-        except Exception as e:
-            logging.error(f"Auto connect error: {str(e)}")
-            if self.show_login_dialog():
-                self.connect_vpn()
+        else:
+            # None: denetim soketi koptu ya da iş hata verdi; giriş penceresi (ve iptalde çıkış) değil hata gösterilir
+            self._on_connect_done(outcome)
 
     def create_main_ui(self):
         """Ana kullanıcı arayüzünü oluşturur."""
@@ -232,48 +3652,96 @@ class HotspotShieldApp:
         self.logo.set_from_icon_name("network-vpn", Gtk.IconSize.DIALOG)
         self.header_box.pack_start(self.logo, True, True, 0)
         self.title_label = Gtk.Label()
-        self.title_label.set_markup("<span size='x-large'><b>Hotspot Shield VPN</b></span>")
+        self.lang.bind('window_title', self.title_label.set_markup,
+                       "<span size='x-large'><b>{}</b></span>")
         self.header_box.pack_start(self.title_label, True, True, 0)
         self.main_box.pack_start(self.header_box, False, True, 10)
 
         # Status display
-        self.status_frame = Gtk.Frame(label=self.lang.get_text('status'))
+        self.status_frame = Gtk.Frame()
+        self.lang.bind('status', self.status_frame.set_label)
         self.status_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
         self.status_frame.add(self.status_box)
         self.status_label = Gtk.Label()
-        self.status_label.set_markup(f"<span>{self.lang.get_text('checking_connection')}</span>")
+        self.status_label.set_markup(f"<span>{GLib.markup_escape_text(self.get_last_known_text())}</span>")
         self.status_box.pack_start(self.status_label, True, True, 5)
+        # Konum, IP ve oturum süresi aynı durum sorgusunun kaydından gösterilir
+        self.status_details_label = Gtk.Label()
+        self.status_box.pack_start(self.status_details_label, False, False, 0)
+        # Tünel hızı ve son örneklerin küçük grafiği
+        self.throughput_label = Gtk.Label()
+        self.status_box.pack_start(self.throughput_label, False, False, 0)
+        self.sparkline_label = Gtk.Label()
+        self.status_box.pack_start(self.sparkline_label, False, False, 0)
         self.main_box.pack_start(self.status_frame, False, True, 0)
 
         # Action buttons
         self.button_box = Gtk.Box(spacing=6)
-        self.connect_button = Gtk.Button(label=self.lang.get_text('connect'))
+        self.connect_button = Gtk.Button()
+        self.lang.bind('connect', self.connect_button.set_label)
         self.connect_button.connect("clicked", self.on_connect_clicked)
         self.button_box.pack_start(self.connect_button, True, True, 0)
-        self.disconnect_button = Gtk.Button(label=self.lang.get_text('disconnect'))
+        self.disconnect_button = Gtk.Button()
+        self.lang.bind('disconnect', self.disconnect_button.set_label)
         self.disconnect_button.connect("clicked", self.on_disconnect_clicked)
         self.button_box.pack_start(self.disconnect_button, True, True, 0)
+        self.fastest_button = Gtk.Button()
+        self.lang.bind('fastest_location', self.fastest_button.set_label)
+        self.fastest_button.connect("clicked", self.on_fastest_clicked)
+        # Uç nokta şablonu ayarlanmadıysa gecikme ölçülemez
+        self.fastest_button.set_no_show_all(not self.latency.enabled)
+        self.button_box.pack_start(self.fastest_button, True, True, 0)
+        # Yalnızca bir bağlantı girişimi sürerken görünür
+        self.cancel_button = Gtk.Button()
+        self.lang.bind('cancel', self.cancel_button.set_label)
+        self.cancel_button.connect("clicked", self.on_cancel_clicked)
+        self.cancel_button.set_no_show_all(True)
+        self.button_box.pack_start(self.cancel_button, True, True, 0)
+        # Durum bilinene kadar düğmeler pasif kalır
+        self.connect_button.set_sensitive(False)
+        self.disconnect_button.set_sensitive(False)
         self.main_box.pack_start(self.button_box, False, True, 0)
 
         # Locations list
-        self.locations_frame = Gtk.Frame(label=self.lang.get_text('locations'))
+        self.locations_frame = Gtk.Frame()
+        self.lang.bind('locations', self.locations_frame.set_label)
         self.locations_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
         self.locations_frame.add(self.locations_box)
-        self.locations_list = Gtk.ListBox()
-        self.locations_list.set_selection_mode(Gtk.SelectionMode.SINGLE)
-        self.locations_list.connect('row-activated', self.on_location_selected)
+        self.search_entry = Gtk.SearchEntry()
+        self.lang.bind('search_locations', self.search_entry.set_placeholder_text)
+        self.search_entry.connect('search-changed', self.on_search_changed)
+        self.locations_box.pack_start(self.search_entry, False, False, 0)
+        # Model sütunları: konum kodu, görünen metin, görünürlük, gecikme
+        self.locations_store = Gtk.ListStore(str, str, bool, str)
+        self.locations_filter = self.locations_store.filter_new()
+        self.locations_filter.set_visible_column(2)
+        self.locations_view = Gtk.TreeView(model=self.locations_filter)
+        self.locations_view.set_headers_visible(False)
+        self.locations_view.set_enable_search(False)
+        location_column = Gtk.TreeViewColumn(None, Gtk.CellRendererText(), text=1)
+        location_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        location_column.set_expand(True)
+        self.locations_view.append_column(location_column)
+        latency_renderer = Gtk.CellRendererText(xalign=1.0)
+        latency_column = Gtk.TreeViewColumn(None, latency_renderer, text=3)
+        latency_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        latency_column.set_fixed_width(70)
+        latency_column.set_visible(self.latency.enabled)
+        self.locations_view.append_column(latency_column)
+        # Sabit satır yüksekliği yalnızca görünen satırların ölçülmesini sağlar
+        self.locations_view.set_fixed_height_mode(True)
+        self.locations_view.connect('row-activated', self.on_location_selected)
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        scrolled.add(self.locations_list)
+        scrolled.add(self.locations_view)
         self.locations_box.pack_start(scrolled, True, True, 0)
         self.main_box.pack_start(self.locations_frame, True, True, 0)
 
         # Footer with language switch and link
         self.main_box.pack_start(self.create_footer(), False, False, 10)
 
-        # Load locations and update status
-        self.load_locations()
-        self.update_status_display()
+        # Önbellekteki konumları hemen göster
+        self._apply_location_diff(list(self.catalog), [], [])
 
     def create_footer(self):
         """Alt bilgi bölümünü oluşturur."""
@@ -284,54 +3752,173 @@ class HotspotShieldApp:
             "furkanyildirim.com"
         )
         # Language switch button
-        lang_button = Gtk.Button(label="EN/TR")
+        lang_button = Gtk.Button(label='/'.join(code.upper() for code in self.lang.available))
         lang_button.connect("clicked", self.switch_language)
         footer_box.pack_start(link_button, False, False, 0)
         footer_box.pack_start(lang_button, False, False, 0)
         return footer_box
 
     def build_tray_menu(self):
-        """Sistem tepsisi menüsünü oluşturur."""
+        """Sistem tepsisi menüsünü bir kez oluşturur; sonraki değişiklikler update_tray_menu ile yapılır."""
         menu = Gtk.Menu()
 
         # Connection status display
-        connection_status = Gtk.MenuItem(label=f"{self.lang.get_text('status')}: {self.get_connection_status_text()}")
-        connection_status.set_sensitive(False)
-        menu.append(connection_status)
+        self.tray_status_item = Gtk.MenuItem(label='')
+        self.tray_status_item.set_sensitive(False)
+        menu.append(self.tray_status_item)
+        self.tray_throughput_item = Gtk.MenuItem(label='')
+        self.tray_throughput_item.set_sensitive(False)
+        menu.append(self.tray_throughput_item)
         menu.append(Gtk.SeparatorMenuItem())
 
-        show_item = Gtk.MenuItem(label=self.lang.get_text('show_interface'))
-        show_item.connect('activate', self.show_window)
-        menu.append(show_item)
+        self.tray_show_item = Gtk.MenuItem()
+        self.lang.bind('show_interface', self.tray_show_item.set_label)
+        self.tray_show_item.connect('activate', self.show_window)
+        menu.append(self.tray_show_item)
         menu.append(Gtk.SeparatorMenuItem())
 
-        status_item = Gtk.MenuItem(label=self.lang.get_text('status_check'))
-        status_item.connect('activate', self.check_status)
-        menu.append(status_item)
+        self.tray_check_item = Gtk.MenuItem()
+        self.lang.bind('status_check', self.tray_check_item.set_label)
+        self.tray_check_item.connect('activate', self.check_status)
+        menu.append(self.tray_check_item)
         menu.append(Gtk.SeparatorMenuItem())
 
-        connect_item = Gtk.MenuItem(label=self.lang.get_text('connect'))
-        connect_item.connect('activate', self.on_connect_clicked)
-        connect_item.set_sensitive(not self.is_connected())
-        menu.append(connect_item)
+        self.tray_connect_item = Gtk.MenuItem()
+        self.lang.bind('connect', self.tray_connect_item.set_label)
+        self.tray_connect_item.connect('activate', self.on_connect_clicked)
+        menu.append(self.tray_connect_item)
 
-        disconnect_item = Gtk.MenuItem(label=self.lang.get_text('disconnect'))
-        disconnect_item.connect('activate', self.on_disconnect_clicked)
-        disconnect_item.set_sensitive(self.is_connected())
-        menu.append(disconnect_item)
+        self.tray_disconnect_item = Gtk.MenuItem()
+        self.lang.bind('disconnect', self.tray_disconnect_item.set_label)
+        self.tray_disconnect_item.connect('activate', self.on_disconnect_clicked)
+        menu.append(self.tray_disconnect_item)
+
+        self.tray_fastest_item = Gtk.MenuItem()
+        self.lang.bind('fastest_location', self.tray_fastest_item.set_label)
+        self.tray_fastest_item.connect('activate', self.on_fastest_clicked)
+        self.tray_fastest_item.set_no_show_all(not self.latency.enabled)
+        menu.append(self.tray_fastest_item)
 
         menu.append(Gtk.SeparatorMenuItem())
 
-        quit_item = Gtk.MenuItem(label=self.lang.get_text('quit'))
-        quit_item.connect('activate', self.quit)
-        menu.append(quit_item)
+        self.tray_quit_item = Gtk.MenuItem()
+        self.lang.bind('quit', self.tray_quit_item.set_label)
+        self.tray_quit_item.connect('activate', self.quit)
+        menu.append(self.tray_quit_item)
 
         menu.show_all()
+        self.update_tray_menu()
         return menu
 
+    def update_tray_menu(self):
+        """Durum etiketini ve bağlan/kes duyarlılığını durum makinesine göre günceller."""
+        state = self.state.state
+        label = f"{self.lang.get_text('status')}: {self.get_connection_status_text()}"
+        status = self.controller.status
+        if status.ip and status.connected and state == ConnectionState.CONNECTED:
+            label = f"{label} · {status.ip}"
+        self.tray_status_item.set_label(label)
+        self.tray_connect_item.set_sensitive(
+            state in (ConnectionState.DISCONNECTED, ConnectionState.ERROR)
+        )
+        self.tray_disconnect_item.set_sensitive(state == ConnectionState.CONNECTED)
+        self._render_tray_throughput()
+
+    def get_throughput_text(self):
+        """Son örneğin hızlarını ve geçmişin küçük grafiğini döndürür; örnek yoksa None."""
+        # Örnekleme durmuşsa son değerler eskidir; gösterilmez
+        if (self.state.state != ConnectionState.CONNECTED or not self.throughput.running
+                or not len(self.throughput.rx)):
+            return None
+        rates = (f"↓ {ThroughputMonitor.format_rate(self.throughput.rx.latest())}  "
+                 f"↑ {ThroughputMonitor.format_rate(self.throughput.tx.latest())}")
+        totals = [rx + tx for rx, tx in zip(self.throughput.rx.values(), self.throughput.tx.values())]
+        return rates, ThroughputMonitor.sparkline(totals, width=30)
+
+    def _render_throughput(self, rates=None):
+        """Pencere ve tepsideki hız etiketlerini son örneğe göre günceller."""
+        text = self.get_throughput_text()
+        self.throughput_label.set_text(text[0] if text else '')
+        self.throughput_label.set_visible(bool(text))
+        self.sparkline_label.set_text(text[1] if text else '')
+        self.sparkline_label.set_visible(bool(text))
+        if self.indicator is not None:
+            self._render_tray_throughput(text)
+
+    def _on_window_unmap(self, window):
+        """Pencere gizlenince örneklemeyi durdurur ve tepsideki eskiyen hız satırını gizler."""
+        self.throughput.stop()
+        if self.indicator is not None:
+            self._render_tray_throughput()
+
+    def _render_tray_throughput(self, text=None):
+        text = text or self.get_throughput_text()
+        self.tray_throughput_item.set_label(f"{text[0]}  {text[1][-10:]}" if text else '')
+        self.tray_throughput_item.set_visible(bool(text))
+
+    def schedule_tray_update(self):
+        """Tepsi güncellemesini bir sonraki boşta döngüye erteler; aradaki istekler birleştirilir."""
+        if self.indicator is None or self._tray_update_pending:
+            return
+        self._tray_update_pending = True
+        GLib.idle_add(self._run_tray_update)
+
+    def _run_tray_update(self):
+        self._tray_update_pending = False
+        try:
+            self.update_tray_menu()
+        except Exception as e:
+            logging.error(f"Tray update error: {str(e)}")
+        return False
+
+    # Olay yolu pencereleri (saniye): tepsi menüsü ve hata iletişim kutusu
+    TRAY_DEBOUNCE = 0.25
+    ERROR_DEBOUNCE = 0.5
+
+    # Her durum için gösterilecek metin anahtarı ve renk
+    STATE_LABELS = {
+        ConnectionState.UNKNOWN: ('checking_connection', None),
+        ConnectionState.DISCONNECTED: ('not_connected', 'red'),
+        ConnectionState.CONNECTING: ('connecting', None),
+        ConnectionState.CONNECTED: ('connected', 'green'),
+        ConnectionState.DISCONNECTING: ('disconnecting', None),
+        ConnectionState.SWITCHING: ('connecting_location', None),
+        ConnectionState.ERROR: ('error', 'red'),
+    }
+
     def get_connection_status_text(self):
         """Bağlantı durum metnini alır."""
-        return self.lang.get_text('connected') if self.is_connected() else self.lang.get_text('not_connected')
+        state, location, _ = self.state.snapshot()
+        text = self.lang.get_text(self.STATE_LABELS[state][0])
+        if location and state in (ConnectionState.CONNECTED, ConnectionState.SWITCHING):
+            text = f"{text} ({location})"
+        return text
+
+    def get_last_known_text(self):
+        """İlk sorgu bitene kadar gösterilecek metin: geçmişteki son durum ve 'kontrol ediliyor'."""
+        checking = self.lang.get_text('checking_connection')
+        last = self.controller.history.last_state() if self.controller.history is not None else None
+        if not last or last['state'] not in self.STATE_LABELS:
+            return checking
+        text = self.lang.get_text(self.STATE_LABELS[last['state']][0])
+        if last['location'] and last['state'] == ConnectionState.CONNECTED:
+            text = f"{text} ({last['location']})"
+        return f"{text} · {checking}"
+
+    def get_status_details_text(self):
+        """Son durum kaydından konum, IP ve oturum süresi satırını üretir; bağlı değilse boş döner."""
+        status = self.controller.status
+        if not status.connected or self.state.state != ConnectionState.CONNECTED:
+            return ''
+        parts = []
+        if status.location:
+            parts.append(f"{self.lang.get_text('location')}: {status.location}")
+        if status.ip:
+            parts.append(f"{self.lang.get_text('ip_address')}: {status.ip}")
+        session = status.session_now()
+        if session is not None:
+            parts.append(f"{self.lang.get_text('session')}: {VpnStatus.format_duration(session)}")
+        return '  ·  '.join(parts)
 
     def check_status(self, widget=None):
         """VPN durumunu kontrol eder."""
@@ -360,253 +3947,183 @@ class HotspotShieldApp:
             )
 
     def _update_ui_texts_safe(self):
-        """UI öğelerini güvenli bir şekilde günceller."""
-        try:
-            # Önce mevcut menüyü temizle
-            self.indicator.set_menu(None)
-            # Window ve label'ları güncelle
-            self.window.set_title(self.lang.get_text('window_title'))
-            self.connect_button.set_label(self.lang.get_text('connect'))
-            self.disconnect_button.set_label(self.lang.get_text('disconnect'))
-            self.status_frame.set_label(self.lang.get_text('status'))
-            self.locations_frame.set_label(self.lang.get_text('locations'))
-            self.title_label.set_markup(
-                f"<span size='x-large'><b>{self.lang.get_text('window_title')}</b></span>"
-            )
-            # Yeni menüyü oluştur
-            new_menu = self.build_tray_menu()
-            self.indicator.set_menu(new_menu)
-            # Durumu güncelle
-            self.update_status_display()
-            return False  # GLib.idle_add için False döndür
+        """Dile bağlı metinleri yeniden etiketler; durum bilinen durumdan çizilir, CLI sorgusu yapılmaz."""
+        try:
+            self.lang.relabel()
+            if self.indicator is not None:
+                self.schedule_tray_update()
+            self._render_status()
         except Exception as e:
             logging.error(f"Safe UI update error: {str(e)}")
-            return False
+        return False  # GLib.idle_add için False döndür
 
     def load_locations(self):
-        """VPN konumlarını listeye yükler."""
-        try:
-            locations_output = subprocess.check_output(['hotspotshield', 'locations']).decode()
-            locations = locations_output.strip().split('\n')
-            # İlk iki satırı atla ve boş olmayan satırları al
-            filtered_locations = [loc for loc in locations[2:] if loc.strip()]
-            for location in filtered_locations:
-                if location.strip():
-                    row = Gtk.ListBoxRow()
-                    hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-                    row.add(hbox)
-                    label = Gtk.Label(label=location, xalign=0)
-                    hbox.pack_start(label, True, True, 0)
-                    self.locations_list.add(row)
-        except Exception as e:
-            logging.error(f"Locations loading error: {str(e)}")
-            row = Gtk.ListBoxRow()
-            label = Gtk.Label(label=self.lang.get_text('locations') + ' ' +
-                              self.lang.get_text('not_available'), xalign=0)
-            row.add(label)
-            self.locations_list.add(row)
+        """Konum kataloğunun süresi dolmuşsa arka planda yeniler."""
+        if not self.catalog.is_stale():
+            self.trace.end('locations')
+            self.refresh_latencies()
+            return
+        self.executor.call(self.controller.refresh_locations,
+                           callback=lambda diff: self.bus.publish(LocationsUpdated(diff)))
 
-    def connect_vpn(self):
-        """VPN'e bağlanmayı dener."""
-        try:
-            # İnternet bağlantısını kontrol et
-            if not self.check_internet_connection():
-                self.show_error_message(
-                    self.lang.get_text('no_internet'),
-                    self.lang.get_text('no_internet_message')
-                )
-                return False
+    def _on_locations_updated(self, event):
+        """Yenilenen konum kataloğunun farkını listeye uygular."""
+        self.trace.end('locations')
+        diff = event.diff
+        if diff is not None:
+            self._apply_location_diff(*diff)
+            self.refresh_latencies()
+        elif not len(self.catalog) and '' not in self._location_iters:
+            self._location_iters[''] = self.locations_store.append([
+                '',
+                self.lang.get_text('locations') + ' ' + self.lang.get_text('not_available'),
+                True,
+                ''
+            ])
 
-            # Bağlantı durumunu kontrol et
-            if self.is_connected():
-                logging.info("Already connected, skipping connection attempt")
-                self.update_status_display()
-                return True
+    def _apply_location_diff(self, added, removed, changed):
+        """Konum modeline yalnızca eklenen, silinen ve değişen satırları uygular."""
+        if added or changed:
+            placeholder = self._location_iters.pop('', None)
+            if placeholder is not None:
+                self.locations_store.remove(placeholder)
+        for record in removed:
+            tree_iter = self._location_iters.pop(record.code, None)
+            if tree_iter is not None:
+                self.locations_store.remove(tree_iter)
+            self._visible_codes.discard(record.code)
+        for record in changed:
+            tree_iter = self._location_iters.get(record.code)
+            if tree_iter is not None:
+                self.locations_store.set_value(tree_iter, 1, record.label)
+        for record in added:
+            self._location_iters[record.code] = self.locations_store.append(
+                [record.code, record.label, False, self._latency_text(record.code)]
+            )
+        self.location_index = LocationIndex(self.catalog)
+        self.apply_location_filter()
 
-            # Bağlanma işlemini başlat
-            self.status_label.set_markup(f"<span>{self.lang.get_text('connecting')}</span>")
-            self.connect_button.set_sensitive(False)
-            self.disconnect_button.set_sensitive(False)
-            while Gtk.events_pending():
-                Gtk.main_iteration()
+    def refresh_latencies(self):
+        """Konum gecikmeleri eskiyse arka planda yeniden ölçer; ölçüm kapalıysa bir şey yapmaz."""
+        records = list(self.catalog)
+        if records and self.latency.enabled and not self.latency.is_fresh(records):
+            self.executor.call(self.latency.rank, records,
+                               callback=lambda ranked: self._render_latencies())
 
-            result = subprocess.run(
-                ['hotspotshield', 'connect'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
+    def _latency_text(self, code):
+        rtt = self.latency.cached(code)
+        return f"{rtt * 1000:.0f} ms" if rtt is not None else ''
 
-            # Bağlantı sonucunu kontrol et
-            if result.returncode == 0:
-                import time
-                time.sleep(2)  # Bağlantının kurulmasını bekle
-                if self.is_connected():
-                    self.show_notification(
-                        self.lang.get_text('vpn_connection'),
-                        self.lang.get_text('connection_successful')
-                    )
-                    self.update_status_display()
-                    return True
-
-            # Bağlantı başarısız olduysa
-            if 'not signed in' in result.stderr.lower():
-                self.show_notification(
-                    self.lang.get_text('vpn_connection'),
-                    self.lang.get_text('not_signed_in')
-                )
-                if self.show_login_dialog():
-                    return self.connect_vpn()
-            else:
-                self.show_error_message(
-                    self.lang.get_text('connection_error'),
-                    self.lang.get_text('connection_failed_try_again')
-                )
+    def _render_latencies(self):
+        """Gecikme sütununu önbellekteki ölçümlerle günceller."""
+        for code, tree_iter in self._location_iters.items():
+            if code:
+                self.locations_store.set_value(tree_iter, 3, self._latency_text(code))
 
-            self.update_status_display()
-            return False
-        except Exception as e:
-            logging.error(f"Connect error: {str(e)}")
+    def on_fastest_clicked(self, widget):
+        """En hızlı konumu bulur ve o konuma bağlanır."""
+        self.status_label.set_markup(f"<span>{self.lang.get_text('finding_fastest')}</span>")
+        self.executor.call(self.latency.fastest, list(self.catalog),
+                           callback=self._on_fastest_found)
+
+    def _on_fastest_found(self, record):
+        """En hızlı konum bulunduğunda bağlantıyı başlatır."""
+        self._render_latencies()
+        if record is None:
             self.show_error_message(
                 self.lang.get_text('error'),
-                self.lang.get_text('connection_failed')
+                self.lang.get_text('latency_unavailable')
             )
-            self.update_status_display()
-            return False
-
-    def disconnect_vpn(self):
-        """VPN bağlantısını keser."""
-        try:
-            # Bağlantı durumunu kontrol et
-            if not self.is_connected():
-                logging.info("Already disconnected, skipping disconnection attempt")
-                self.update_status_display()
-                return True
+            self._render_status()
+            return
+        self.connect_to_location(None, record.code)
 
-            # Bağlantı kesme işlemini başlat
-            self.status_label.set_markup(f"<span>{self.lang.get_text('disconnecting')}</span>")
-            self.connect_button.set_sensitive(False)
-            self.disconnect_button.set_sensitive(False)
-            while Gtk.events_pending():
-                Gtk.main_iteration()
+    def on_search_changed(self, entry):
+        """Arama metni değiştiğinde konum filtresini uygular."""
+        self.apply_location_filter()
 
-            # 'hotspotshield disconnect' komutunu çalıştır
-            result = subprocess.run(
-                ['hotspotshield', 'disconnect'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=30  # 30 saniye timeout
-            )
+    def apply_location_filter(self):
+        """Yalnızca görünürlüğü değişen satırları güncelleyerek filtreyi uygular."""
+        matches = {r.code for r in self.location_index.search(self.search_entry.get_text())}
+        for code in self._visible_codes - matches:
+            tree_iter = self._location_iters.get(code)
+            if tree_iter is not None:
+                self.locations_store.set_value(tree_iter, 2, False)
+        for code in matches - self._visible_codes:
+            tree_iter = self._location_iters.get(code)
+            if tree_iter is not None:
+                self.locations_store.set_value(tree_iter, 2, True)
+        self._visible_codes = matches
 
-            # Kısa bir bekleme süresi
-            import time
-            time.sleep(2)
+    def connect_vpn(self):
+        """VPN'e bağlanmayı arka planda başlatır."""
+        self.executor.call(self.controller.connect, callback=self._on_connect_done)
 
-            # Bağlantının kesilip kesilmediğini kontrol et
-            if not self.is_connected():
-                self.show_notification(
-                    self.lang.get_text('vpn_connection'),
-                    self.lang.get_text('not_connected')
-                )
-                self.update_status_display()
-                return True
-            else:
-                logging.error("Disconnect command executed but VPN is still connected.")
-                self.show_error_message(
-                    self.lang.get_text('disconnect_error'),
-                    self.lang.get_text('disconnect_error')
-                )
-                self.update_status_display()
-                return False
-        except subprocess.TimeoutExpired:
-            logging.error("Disconnect command timed out.")
-            self.show_error_message(
-                self.lang.get_text('disconnect_error'),
-                self.lang.get_text('disconnect_error')
-            )
-            self.update_status_display()
-            return False
-        except Exception as e:
-            logging.error(f"Disconnect error: {str(e)}")
+    def _on_connect_done(self, outcome, location=None):
+        """Bağlantı hatalarını ana döngüde kullanıcıya bildirir; başarı bildirimi durum değişikliğinden gelir."""
+        if outcome != 'connected':
+            # already_connected / busy gibi sonuçlarda durum değişmez; "aranıyor" gibi geçici metni geri al
+            self._render_status()
+        if outcome == 'no_internet':
             self.show_error_message(
-                self.lang.get_text('error'),
-                self.lang.get_text('disconnect_error')
-            )
-            self.update_status_display()
-            return False
-
-    def connect_to_location(self, widget, location):
-        """Belirli bir VPN konumuna bağlanır."""
-        try:
-            # İnternet bağlantısını kontrol et
-            if not self.check_internet_connection():
-                self.show_error_message(
-                    self.lang.get_text('no_internet'),
-                    self.lang.get_text('no_internet_message')
-                )
-                return False
-
-            # Bağlantı durumunu güncelle
-            self.status_label.set_markup(
-                f"<span>{self.lang.get_text('connecting_location')} {location}...</span>"
+                self.lang.get_text('no_internet'),
+                self.lang.get_text('no_internet_message')
             )
-            self.connect_button.set_sensitive(False)
-            self.disconnect_button.set_sensitive(False)
-            while Gtk.events_pending():
-                Gtk.main_iteration()
-
-            # Önce mevcut bağlantıyı kes
-            if self.is_connected():
-                self.disconnect_vpn()
-
-            # Yeni konuma bağlan
-            result = subprocess.run(
-                ['hotspotshield', 'connect', location],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
+        elif outcome == 'not_signed_in':
+            self.show_notification(
+                self.lang.get_text('vpn_connection'),
+                self.lang.get_text('not_signed_in')
             )
-
-            # Bağlantı sonucunu kontrol et
-            if result.returncode == 0:
-                import time
-                time.sleep(3)  # Bağlantının kurulmasını bekle
-                if self.is_connected():
-                    self.show_notification(
-                        self.lang.get_text('vpn_connection'),
-                        f"{location} {self.lang.get_text('connected')}"
-                    )
-                    self.update_status_display()
-                    return True
-
+            self.show_login_dialog(lambda success: success and self.connect_vpn())
+        elif outcome == 'failed':
             self.show_error_message(
-                self.lang.get_text('error'),
+                self.lang.get_text('error' if location else 'connection_error'),
                 self.lang.get_text('connection_failed_try_again')
             )
-            self.update_status_display()
-            return False
-        except Exception as e:
-            logging.error(f"Location connect error: {str(e)}")
+        elif outcome is None:
             self.show_error_message(
                 self.lang.get_text('error'),
                 self.lang.get_text('connection_failed')
             )
-            self.update_status_display()
-            return False
 
-    def on_location_selected(self, listbox, row):
+    def disconnect_vpn(self):
+        """VPN bağlantısını arka planda keser."""
+        self.executor.call(self.controller.disconnect, callback=self._on_disconnect_done)
+
+    def _on_disconnect_done(self, outcome):
+        """Bağlantı kesme hatalarını ana döngüde kullanıcıya bildirir."""
+        if outcome not in ('disconnected', 'already_disconnected', 'busy'):
+            self.show_error_message(
+                self.lang.get_text('error' if outcome is None else 'disconnect_error'),
+                self.lang.get_text('disconnect_error')
+            )
+
+    def connect_to_location(self, widget, location):
+        """Belirli bir VPN konumuna arka planda bağlanır; bağlıysa konum değiştirir."""
+        self.executor.call(
+            self.controller.connect, location,
+            callback=partial(self._on_connect_done, location=location)
+        )
+
+    def on_cancel_clicked(self, widget):
+        """Süren bağlantı girişimini iptal eder."""
+        self.controller.cancel_connect()
+
+    def on_location_selected(self, view, path, column):
         """Listeden bir konum seçildiğinde çağrılır."""
         try:
-            location = row.get_children()[0].get_children()[0].get_text().split()[0]
-            self.connect_to_location(None, location)
+            model = view.get_model()
+            record = self.catalog.get(model[model.get_iter(path)][0])
+            if record is not None:
+                self.connect_to_location(None, record.code)
         except Exception as e:
             logging.error(f"Location selection error: {str(e)}")
 
-    def show_login_dialog(self):
-        """Giriş iletişim kutusunu gösterir."""
+    def show_login_dialog(self, callback):
+        """Giriş iletişim kutusunu gösterir ve sonucu callback'e bildirir.
+
+        Giriş arka planda yapılır; başarısız denemeler aynı pencerede tekrarlanır.
+        """
         dialog = Gtk.Dialog(
             title=self.lang.get_text('login'),
             parent=self.window,
@@ -618,6 +4135,7 @@ class HotspotShieldApp:
             self.lang.get_text('login_button'),
             Gtk.ResponseType.OK
         )
+        dialog.set_default_response(Gtk.ResponseType.OK)
         box = dialog.get_content_area()
         grid = Gtk.Grid()
         grid.set_row_spacing(10)
@@ -632,178 +4150,355 @@ class HotspotShieldApp:
         password_label = Gtk.Label(label=self.lang.get_text('password'))
         password_entry = Gtk.Entry()
         password_entry.set_visibility(False)
+        password_entry.set_activates_default(True)
         grid.attach(password_label, 0, 1, 1, 1)
         grid.attach(password_entry, 1, 1, 1, 1)
 
-        dialog.show_all()
-        response = dialog.run()
-        if response == Gtk.ResponseType.OK:
-            username = username_entry.get_text()
-            password = password_entry.get_text()
-            success = self.login_to_hotspot(username, password)
-            dialog.destroy()
-            if not success:
-                self.show_error_message(
-                    self.lang.get_text('login_failed'),
-                    self.lang.get_text('connection_failed')
+        # İlerleme göstergesi ve hata satırı
+        progress_box = Gtk.Box(spacing=6)
+        spinner = Gtk.Spinner()
+        message_label = Gtk.Label()
+        progress_box.pack_start(spinner, False, False, 0)
+        progress_box.pack_start(message_label, False, False, 0)
+        grid.attach(progress_box, 0, 2, 2, 1)
+        pending = {'token': None}
+
+        def set_busy(busy, message):
+            username_entry.set_sensitive(not busy)
+            password_entry.set_sensitive(not busy)
+            dialog.set_response_sensitive(Gtk.ResponseType.OK, not busy)
+            if busy:
+                spinner.start()
+            else:
+                spinner.stop()
+            message_label.set_text(message)
+
+        def on_done(outcome, token):
+            if token is not pending['token']:
+                return  # İptal edilmiş bir denemenin sonucu
+            pending['token'] = None
+            if outcome in ('signed_in', 'already_signed_in'):
+                dialog.destroy()
+                callback(True)
+                return
+            set_busy(False, self.lang.get_text('login_timeout' if outcome == 'timeout' else 'login_failed'))
+            password_entry.grab_focus()
+
+        def on_response(widget, response):
+            if response == Gtk.ResponseType.OK:
+                token = pending['token'] = CancelToken()
+                set_busy(True, self.lang.get_text('signing_in'))
+                self.executor.call(
+                    self.controller.login, username_entry.get_text(), password_entry.get_text(), token,
+                    callback=lambda outcome: on_done(outcome, token)
                 )
-                return self.show_login_dialog()  # Başarısızsa tekrar göster
-            return success
-        dialog.destroy()
-        return False
+                return
+            # İptal ya da pencereyi kapatma: süren denemeyi de iptal et
+            if pending['token'] is not None:
+                pending['token'].cancel()
+                pending['token'] = None
+            dialog.destroy()
+            callback(False)
 
-    def login_to_hotspot(self, username, password):
-        """Hotspot Shield hesabına giriş yapmayı dener."""
-        try:
-            # Önce mevcut oturumu kontrol et ve gerekirse çıkış yap
-            subprocess.run(
-                ['hotspotshield', 'account', 'signout'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=False
-            )
-            # Giriş komutunu çalıştır
-            login_process = subprocess.Popen(
-                ['hotspotshield', 'account', 'signin'],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            # Kullanıcı adı ve şifreyi gönder
-            stdout, stderr = login_process.communicate(input=f"{username}\n{password}\n")
-            # Giriş durumunu kontrol et
-            status_check = subprocess.run(
-                ['hotspotshield', 'account', 'status'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
-            # Eğer çıktıda e-posta adresi varsa giriş başarılıdır
-            if username.lower() in status_check.stdout.lower():
-                logging.info("Login successful")
-                logging.info(f"Account status: {status_check.stdout}")
-                return True
-            # Hata durumunda log kaydet
-            logging.error(f"Login failed. Status output: {status_check.stdout}")
-            logging.error(f"Login stderr: {status_check.stderr}")
-            return False
-        except Exception as e:
-            logging.error(f"Login exception: {str(e)}")
-            return False
+        dialog.connect('response', on_response)
+        dialog.show_all()
 
-    def check_login_status(self):
-        """Kullanıcının oturum açıp açmadığını kontrol eder."""
-        try:
-            # Direkt bağlantı denemesi yap
-            result = subprocess.run(
-                ['hotspotshield', 'connect'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
-            # Eğer "not signed in" mesajı varsa False döndür
-            if 'not signed in' in result.stderr.lower() or 'not signed in' in result.stdout.lower():
-                return False
-            return True
-        except Exception as e:
-            logging.error(f"Login status check error: {str(e)}")
-            return False
+    def update_status_display(self):
+        """Durumu arka planda sorgular, ardından ekranı ve düğmeleri günceller."""
+        self.executor.call(self.status_cache.get, callback=self._render_status)
 
-    def is_connected(self):
-        """VPN'in bağlı olup olmadığını kontrol eder."""
+    def _render_status(self, is_connected=None):
+        """Durum ekranını ve düğmeleri durum makinesindeki geçerli duruma göre günceller."""
+        self.trace.end('status')
         try:
-            result = subprocess.run(
-                ['hotspotshield', 'status'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=10,  # 10 saniye timeout
-                check=False
+            state = self.state.state
+            color = self.STATE_LABELS[state][1]
+            text = (self.get_last_known_text() if state == ConnectionState.UNKNOWN
+                    else self.get_connection_status_text())
+            # Konum adı CLI'den gelir; Pango işaretlemesi olarak yorumlanmamalı
+            text = GLib.markup_escape_text(text)
+            self.status_label.set_markup(
+                f'<span foreground="{color}">{text}</span>' if color else f"<span>{text}</span>"
             )
-            # Durum çıktısını kontrol et
-            status_output = result.stdout.strip()
-            logging.info(f"VPN Status Output: {status_output}")
-            # Bağlantı durumunu kontrol et
-            if "Connected" in status_output:
-                return True
-            elif "Not connected" in status_output:
-                return False
-            else:
-                # Beklenmeyen bir çıktı varsa logla
-                logging.warning(f"Unexpected status output: {status_output}")
-                return False
-        except Exception as e:
-            logging.error(f"Connection status check error: {str(e)}")
-            return False
-
-    def update_status_display(self):
-        """Durum ekranını ve düğmeleri günceller."""
-        try:
-            is_connected = self.is_connected()
-            # Log kaydı ekle
-            logging.info(f"Connection status: {'Connected' if is_connected else 'Not Connected'}")
-            if is_connected:
-                status_text = f'<span foreground="green">{self.lang.get_text("connected")}</span>'
-                self.connect_button.set_sensitive(False)
-                self.disconnect_button.set_sensitive(True)
+            details = self.get_status_details_text()
+            self.status_details_label.set_text(details)
+            self.status_details_label.set_visible(bool(details))
+            self._render_throughput()
+            idle = state in (ConnectionState.DISCONNECTED, ConnectionState.ERROR)
+            self.connect_button.set_sensitive(idle)
+            self.disconnect_button.set_sensitive(state == ConnectionState.CONNECTED)
+            self.fastest_button.set_sensitive(state not in ConnectionState.TRANSITIONAL)
+            if state in (ConnectionState.CONNECTING, ConnectionState.SWITCHING):
+                self.cancel_button.show()
             else:
-                status_text = f'<span foreground="red">{self.lang.get_text("not_connected")}</span>'
-                self.connect_button.set_sensitive(True)
-                self.disconnect_button.set_sensitive(False)
-            self.status_label.set_markup(status_text)
-            # Tray menüsünü güncelle
-            GLib.idle_add(lambda: self.indicator.set_menu(self.build_tray_menu()))
+                self.cancel_button.hide()
         except Exception as e:
             logging.error(f"Status display update error: {str(e)}")
 
+    def _publish_state(self, old, new, location):
+        """Durum geçişini olay yoluna verir; dinleyiciler sırayla çağrıldığından önceki konum burada izlenir."""
+        old_location, self._published_location = self._published_location, location
+        self.bus.publish(StateChanged(old, new, location, old_location))
+
+    def _notify_state(self, event):
+        """Pencere içinde birleştirilmiş geçişi tek bildirimle duyurur.
+
+        Olay pencerenin ilk eski durumunu ve son yeni durumunu taşır; kopup hemen
+        geri gelen bağlantı gibi başladığı yere dönen geçişler bildirilmez.
+        """
+        if event.unchanged:
+            return
+        old, new, location = event.old, event.new, event.location
+        # Son adımdan önceki durum: bağlanma ya da konum değiştirme ile mi bitti
+        last = event.path[-2]
+        if new == ConnectionState.CONNECTED and last in (
+                ConnectionState.CONNECTING, ConnectionState.SWITCHING):
+            message = (f"{location} {self.lang.get_text('connected')}" if location
+                       else self.lang.get_text('connection_successful'))
+            self.show_notification(self.lang.get_text('vpn_connection'), message)
+        elif new == ConnectionState.DISCONNECTED and ConnectionState.DISCONNECTING in event.path:
+            self.show_notification(
+                self.lang.get_text('vpn_connection'),
+                self.lang.get_text('not_connected')
+            )
+        elif old == ConnectionState.CONNECTED and new in (
+                ConnectionState.DISCONNECTED, ConnectionState.ERROR):
+            # Kullanıcı isteği olmadan kopma; watchdog açıksa yeniden bağlanmayı dener
+            self.show_notification(
+                self.lang.get_text('vpn_connection'),
+                self.lang.get_text('connection_lost')
+            )
+
     def show_notification(self, title, message):
-        """Sistem bildirimi gösterir."""
+        """Sistem bildirimi gösterir; tek bildirim nesnesi güncellenerek yeniden kullanılır."""
+        if self.quitting:
+            return
         try:
+            Notify = _gi_module('Notify')
             if not Notify.is_initted():
                 Notify.init("Hotspot Shield VPN")
-            notification = Notify.Notification.new(title, message, "network-vpn")
-            notification.show()
+            if self._notification is None:
+                self._notification = Notify.Notification.new(title, message, "network-vpn")
+            else:
+                self._notification.update(title, message, "network-vpn")
+            self._notification.show()
         except Exception as e:
             logging.error(f"Notification error: {str(e)}")
 
     def show_error_message(self, title, message):
-        """Hata mesajı iletişim kutusu gösterir."""
+        """Hatayı olay yoluna verir; aynı pencerede gelen hatalardan yalnızca sonuncusu gösterilir."""
+        self.bus.publish(ErrorRaised(title, message))
+
+    def _show_error_dialog(self, event):
+        """Hata mesajı iletişim kutusu gösterir; kapanış sırasında gösterilmez."""
+        if self.quitting:
+            return
         try:
             dialog = Gtk.MessageDialog(
                 parent=self.window,
                 flags=0,
                 message_type=Gtk.MessageType.ERROR,
                 buttons=Gtk.ButtonsType.OK,
-                text=title
+                text=event.title
             )
-            dialog.format_secondary_text(message)
+            dialog.format_secondary_text(event.message)
             dialog.run()
             dialog.destroy()
         except Exception as e:
             logging.error(f"Error message display error: {str(e)}")
 
     def quit(self, _):
-        """Uygulamadan çıkar."""
+        """Arayüzü hemen gizler; bekleyen işleri iptal edip bağlantıyı süre sınırı içinde keser ve çıkar."""
+        if self.quitting:
+            return
+        self.quitting = True
+        self._quit_started = time.monotonic()
+        try:
+            self.window.hide()
+            if self.indicator is not None:
+                AppIndicator3 = _gi_module('AppIndicator3')
+                self.indicator.set_status(AppIndicator3.IndicatorStatus.PASSIVE)
+            self.throughput.stop()
+        except Exception as e:
+            logging.error(f"Quit error: {str(e)}")
+        # Bağlantı arka plan servisine aitse yalnızca yerel işler iptal edilir.
+        # Havuz meşgul olabileceğinden kapanış kendi iş parçacığında çalışır.
+        threading.Thread(target=self._run_shutdown, name='hotspot-shutdown', daemon=True).start()
+        # Kapanış takılsa bile uygulama süre sonunda çıkar
+        GLib.timeout_add(int((SHUTDOWN_TIMEOUT + 1.0) * 1000), self._finish_quit, 'deadline')
+
+    def _run_shutdown(self):
+        try:
+            outcome = self.controller.shutdown(disconnect=self.controller.owns_connection)
+        except Exception as e:
+            logging.error(f"Shutdown error: {str(e)}")
+            outcome = None
+        GLib.idle_add(self._finish_quit, outcome)
+
+    def _on_signal(self, signum):
+        """SIGTERM/SIGINT: ilk sinyal düzenli kapanışı başlatır, ikincisi beklemeden çıkarır."""
+        logging.info(f"Received signal {signal.Signals(signum).name}")
+        if self.quitting:
+            self._finish_quit('signal')
+        else:
+            self.quit(None)
+        return True
+
+    def install_signal_handlers(self):
+        """Sinyalleri ana döngüde işlenmek üzere GLib'e bağlar."""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            GLib.unix_signal_add(GLib.PRIORITY_HIGH, signum, self._on_signal, signum)
+
+    def _finish_quit(self, outcome=None):
+        """Kaynakları serbest bırakır ve ana döngüyü sonlandırır; yalnızca ilk çağrı etkilidir."""
+        if self._quit_finished:
+            return False
+        self._quit_finished = True
+        if self._quit_started is not None:
+            logging.info(f"Shutdown finished ({outcome}) in {time.monotonic() - self._quit_started:.2f}s")
         try:
-            if self.is_connected():
-                self.disconnect_vpn()
-            if Notify.is_initted():
-                Notify.uninit()
-            Gtk.main_quit()
+            # Notify hiç yüklenmediyse yüklemeye gerek yok
+            if 'gi.repository.Notify' in sys.modules:
+                Notify = _gi_module('Notify')
+                if Notify.is_initted():
+                    Notify.uninit()
+            if self.controller.watchdog is not None:
+                self.controller.watchdog.stop()
+            if self.control_server is not None:
+                self.control_server.close()
+            if self.loop_monitor is not None:
+                self.loop_monitor.stop()
+            self.throughput.stop()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
+            if isinstance(self.controller, RemoteController):
+                self.controller.close()
+            self.executor.shutdown()
+            if self.controller.history is not None:
+                self.controller.history.close()
         except Exception as e:
             logging.error(f"Quit error: {str(e)}")
-            Gtk.main_quit()
+        Gtk.main_quit()
+        return False
+
+
+def _exit_now(code):
+    """Kayıtları boşaltıp süreci hemen sonlandırır.
+
+    Kaynaklar bu noktada kapatılmıştır; sys.exit iş havuzlarında hâlâ süren
+    (DNS ya da gecikme) testlerini bekleyeceğinden çıkış süre sınırını aşardı.
+    """
+    logging.shutdown()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def run_daemon(socket_path=None):
+    """Denetleyiciyi GTK olmadan çalıştırır ve denetim soketini sinyal gelene kadar sunar."""
+    # Ana döngü yok; arka plan callback'leri çağıran iş parçacığında çalışır
+    controller = VpnController(executor=CommandExecutor(dispatch=lambda callback, *args: callback(*args)))
+    server = ControlServer(controller, socket_path).start()
+    # Durum makinesini ilk sorguyla doldur; sonraki durum istekleri alt süreç açmaz
+    controller.status_cache.get()
+    if WATCHDOG_ENABLED:
+        controller.enable_watchdog()
+    exporter = MetricsExporter().start()
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    logging.info("Daemon started")
+    while not stop.wait(1.0):
+        pass
+    logging.info("Daemon stopping")
+    started = time.monotonic()
+    # Yeni istek alınmasın; bekleyen işler iptal edilir ve bağlantı süre sınırı içinde kesilir
+    server.close()
+    outcome = []
+    worker = threading.Thread(target=lambda: outcome.append(controller.shutdown()),
+                              name='hotspot-shutdown', daemon=True)
+    worker.start()
+    worker.join(SHUTDOWN_TIMEOUT + 1.0)
+    logging.info(f"Daemon shutdown finished ({outcome[0] if outcome else 'deadline'}) "
+                 f"in {time.monotonic() - started:.2f}s")
+    exporter.stop()
+    controller.executor.shutdown()
+    if controller.history is not None:
+        controller.history.close()
+    return 0
+
+
+def run_control(command, socket_path=None):
+    """Çalışan servise tek bir komut gönderir ve yanıtı JSON olarak yazdırır."""
+    client = ControlClient(socket_path)
+    name, rest = command[0], command[1:]
+    try:
+        if name == 'subscribe':
+            finished = threading.Event()
+            client.subscribe(
+                lambda event: print(json.dumps(event), flush=True) if event else finished.set()
+            )
+            try:
+                while not finished.wait(1.0):
+                    pass
+            except KeyboardInterrupt:
+                pass
+            return 0
+        if name == 'metrics':
+            reply = client.request(name)
+            print(reply.get('metrics', ''), end='')
+            return 0 if reply.get('ok') else 1
+        params = {'location': rest[0]} if name in ('connect', 'switch') and rest else {}
+        if name == 'log_level' and rest:
+            params['level'] = rest[0]
+        if name == 'status' and '--refresh' in rest:
+            params['refresh'] = True
+        reply = client.request(name, timeout=None, **params)
+    except (OSError, ValueError) as e:
+        print(f"control socket error: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(reply))
+    return 0 if reply.get('ok') else 1
+
 
 def main():
     """Ana fonksiyon, uygulamayı başlatır."""
+    parser = argparse.ArgumentParser(description="Hotspot Shield VPN GUI")
+    parser.add_argument('--startup-trace', action='store_true',
+                        help="print time-to-first-paint and per-stage startup timings to stderr")
+    parser.add_argument('--daemon', action='store_true',
+                        help="run the connection controller without GTK and serve the control socket")
+    parser.add_argument('--control', nargs='+', metavar='COMMAND',
+                        help="send a command to the running daemon or GUI "
+                             "(status [--refresh], connect [LOC], switch LOC, disconnect, subscribe, "
+                             "log_level LEVEL, incidents, switches, metrics)")
+    parser.add_argument('--socket', default=None,
+                        help=f"control socket path (default: {CONTROL_SOCKET_PATH})")
+    args = parser.parse_args()
+    if args.control:
+        sys.exit(run_control(args.control, args.socket))
+    if args.daemon:
+        _exit_now(run_daemon(args.socket))
+    if Gtk is None:
+        parser.error("PyGObject (GTK 3) is required for the graphical interface")
     try:
         logging.info("Starting application...")
-        app = HotspotShieldApp()
+        # Bir servis zaten çalışıyorsa GUI onun istemcisi olur
+        client = ControlClient(args.socket, timeout=1.0)
+        controller = RemoteController(client) if client.alive() else None
+        app = HotspotShieldApp(trace=StartupTrace(args.startup_trace), controller=controller)
+        if controller is None:
+            try:
+                app.control_server = ControlServer(app.controller, args.socket).start()
+            except (OSError, RuntimeError) as e:
+                logging.error(f"Control socket error: {str(e)}")
+            if WATCHDOG_ENABLED:
+                app.controller.enable_watchdog()
+        app.metrics_exporter = MetricsExporter().start()
+        app.install_signal_handlers()
         app.window.show_all()
         Gtk.main()
+        _exit_now(app.exit_code)
     except Exception as e:
         logging.error(f"Application start error: {str(e)}")
         raise